@@ -13,11 +13,24 @@ from relic_check.relic_commands import setup as setup_relic
 from reminder.cycle_reminder import setup as setup_cycle_reminder
 from reminder.reminder_cancel import setup as setup_reminder_cancel
 from reminder.reminder_showList import setup as setup_show_list
+from reminder.reminder_retention import setup as setup_reminder_stats
 from wf_market.market_reminder_command import setup as setup_market_reminder
+from wf_market.market_watchlist_command import setup as setup_watchlist
+from wf_market.price_trend_command import setup as setup_price_trend
+from wf_market.arbitrage_command import setup as setup_arbitrage_cmd
+from wf_market.ducat_command import setup as setup_ducat_cmd
+from wf_market.market_stats_command import setup as setup_market_stats
 
 # 3. 后台监控模块
 from reminder.cycle_monitor import setup_time_monitor  # 监控 Type 1
 from wf_market.market_monitor import setup_monitor        # 监控 Type 2
+from wf_market.market_stream import setup_stream          # Type 2 推送模式 (可选)
+from wf_market.market_api import client_v2
+from reminder.reminder_retention import setup_retention    # 归档/回收已失效提醒
+from wf_market.price_history import setup_price_history     # 价格样本落盘与降采样
+from relic_check.relic_ev import setup_relic_ev             # 核桃期望收益定期估价
+from wf_market.arbitrage import setup_arbitrage              # Prime 套装差价定期扫描
+from wf_market.ducat_table import setup_ducat_table          # Prime 部件杜卡特/白金表
 
 from fissure.fissure_commands import setup as setup_fissure
 from fissure.fissure_reminder_command import setup as setup_fissure_remind
@@ -34,25 +47,51 @@ class Client(discord.Client):
         setup_plains(self.tree)
         setup_relic(self.tree)
         setup_market(self.tree)
+        setup_price_trend(self.tree)
+        setup_arbitrage_cmd(self.tree)
+        setup_ducat_cmd(self.tree)
+        setup_market_stats(self.tree)       # 市场请求/监控统计 (管理员)
         
         # --- 挂载提醒系列功能 ---
         setup_cycle_reminder(self.tree, self)    # 设置平原提醒 (Type 1)
         setup_market_reminder(self.tree)         # 设置市场提醒 (Type 2)
+        setup_watchlist(self.tree)               # 市场提醒批量导入/导出
         setup_show_list(self.tree)               # 查看提醒列表
         setup_reminder_cancel(self.tree)         # 取消提醒
+        setup_reminder_stats(self.tree)          # 提醒存储统计 (管理员)
         
         setup_fissure(self.tree)
         setup_fissure_remind(self.tree)
 
+        # --- 后台同步物品目录 (先读本地文件，版本变化才重新下载) ---
+        client_v2.start_catalog_sync()
+
         # --- 启动并行监控任务 ---
-        # 启动时间轮询监控 (Type 1)
+        # 启动定时提醒调度器 (Type 1)
         self.time_monitor = setup_time_monitor(self)
         
         # 启动市场价格监控 (Type 2)
         self.market_monitor = setup_monitor(self)
+        # MARKET_STREAM=1 时开启 websocket 推送：新挂单实时触发，REST 扫描照常进行
+        self.market_stream = setup_stream(self.market_monitor)
         
         self.fissure_monitor = setup_fissure_monitor(self)
 
+        # 定期归档已触发/已取消的提醒
+        self.reminder_retention = setup_retention(self)
+
+        # 每分钟写入价格样本并汇总 5 分钟 / 小时 / 天
+        self.price_history = setup_price_history(self)
+
+        # 定期给核桃奖励估价，供 /核桃价值 使用
+        self.relic_ev = setup_relic_ev(self)
+
+        # 定期扫描 Prime 套装与部件的差价，供 /套利 使用
+        self.arbitrage = setup_arbitrage(self)
+
+        # Prime 部件杜卡特表：订单拉取时顺带更新，后台慢慢补全，供 /杜卡特 使用
+        self.ducat_table = setup_ducat_table(self)
+
         print("🚀 正在同步 Discord 命令菜单...")
         await self.tree.sync()
         print("✅ 所有功能加载完毕，监控服务已上线！")
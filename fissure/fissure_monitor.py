@@ -3,7 +3,9 @@ from discord.ext import tasks
 import requests
 import re
 from datetime import datetime
-from reminder.reminder_core import load_items, save_items
+from reminder.reminder_core import list_active
+from reminder.reminder_records import Difficulty, mission_code
+from reminder.reminder_store import store
 from fissure.fissure_core import TRANSLATION
 from fissure.fissure_core import PLANETS
 
@@ -16,8 +18,7 @@ class FissureMonitor:
     async def check_fissures(self):
         if not self.bot.is_ready(): return
 
-        all_items = load_items()
-        active_tasks = [it for it in all_items if it.enabled and it.reminder_type == 3]
+        active_tasks = list_active(3)
         if not active_tasks: return
 
         try:
@@ -28,24 +29,28 @@ class FissureMonitor:
             print(f"裂缝 API 异常: {e}")
             return
 
-        triggered = False
+        fired_ids = []
         for item in active_tasks:
             match = None
-            # 从指令存入的 trade_type 中读取难度限制
-            target_diff = getattr(item, 'trade_type', 'all')
+            target_diff = item.difficulty
             
+            # 旧数据里不认识的任务类型编码为 0，名字保存在 extra 里，这类只能按名字比较
+            target_name = None if item.mission else (item.target_mission or "").lower()
             for f in current_fissures:
-                # 1. 任务类型匹配
-                if f.get('missionType', '').lower() != item.target_mission.lower():
+                # 1. 任务类型匹配 (整数编码比较；编码未知时比较任务名)
+                if target_name is not None:
+                    if not target_name or (f.get("missionType") or "").lower() != target_name:
+                        continue
+                elif mission_code(f.get("missionType")) != item.mission:
                     continue
                 
                 # 2. 难度逻辑过滤
                 f_is_hard = f.get('isHard', False)
                 f_is_storm = f.get('isStorm', False)
                 
-                if target_diff == "normal" and (f_is_hard or f_is_storm): continue
-                if target_diff == "hard" and not f_is_hard: continue
-                if target_diff == "storm" and not f_is_storm: continue
+                if target_diff == Difficulty.NORMAL and (f_is_hard or f_is_storm): continue
+                if target_diff == Difficulty.HARD and not f_is_hard: continue
+                if target_diff == Difficulty.STORM and not f_is_storm: continue
                 
                 if not f.get('expired'):
                     match = f
@@ -88,12 +93,11 @@ class FissureMonitor:
                     
                     try:
                         await channel.send(content=f"🔔 <@{item.user_id}> 匹配裂缝出现！", embed=embed)
-                        item.enabled = False 
-                        triggered = True
+                        fired_ids.append(item.id)
                     except: pass
 
-        if triggered:
-            save_items(all_items)
+        if fired_ids:
+            await store.trigger(fired_ids)
 
 def setup_fissure_monitor(bot):
     return FissureMonitor(bot)
\ No newline at end of file
@@ -1,6 +1,8 @@
 import discord
 from discord import app_commands
-from reminder.reminder_core import ReminderItem, add_item
+from reminder.reminder_records import FissureReminder, Difficulty, mission_code
+from reminder.reminder_store import store
+from reminder.reminder_quota import check_admission
 from fissure.fissure_core import TRANSLATION
 
 COLOR_MARKET_GREEN = 0x2ECC71 
@@ -39,19 +41,28 @@ def setup(tree: app_commands.CommandTree):
         diff_map = {"normal": "普通", "hard": "钢铁", "storm": "虚空风暴", "all": "全部"}
         diff_zh = diff_map.get(difficulty)
         
-        # 2. 创建条目 - 借用 trade_type 存储难度，避免 AttributeError
-        new_item = ReminderItem(
+        # 只接受能编码的任务类型，否则监控无从比较
+        if not mission_code(mission):
+            await interaction.response.send_message(f"❌ 不支持的任务类型：{mission}", ephemeral=True)
+            return
+
+        admission = check_admission(3, user_id, interaction.guild_id)
+        if not admission.ok:
+            await interaction.response.send_message(f"🚫 {admission.reason}", ephemeral=True)
+            return
+
+        # 2. 创建条目 - 任务类型与难度均以整数编码保存
+        new_item = FissureReminder(
             user_id=user_id,
             channel_id=channel_id,
+            guild_id=interaction.guild_id,
             item_name=f"裂缝提醒: {mission_zh} ({diff_zh})",
-            reminder_type=3,
-            target_mission=mission,
-            trade_type=difficulty,  # trade_type will be difficulty
-            enabled=True
+            mission=mission_code(mission),
+            difficulty=Difficulty[difficulty.upper()]
         )
         
         try:
-            add_item(new_item)
+            await store.add(new_item)
             embed = discord.Embed(
                 title="✅ 裂缝提醒任务已创建",
                 color=COLOR_MARKET_GREEN
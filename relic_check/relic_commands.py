@@ -9,6 +9,8 @@ from typing import Optional, Tuple
 import discord
 from discord import app_commands
 
+from relic_check.relic_ev import REFINEMENTS, REFINEMENT_NAMES, engine
+
 
 # -----------------------------
 # 配置
@@ -32,8 +34,13 @@ RELIC_CONFIG = {
     3: {"label": "回归中 (Resurgence)", "color": 0x3498DB, "icon": "🔵"},
 }
 
+REFINEMENT_CHOICES = [
+    app_commands.Choice(name=f"{REFINEMENT_NAMES[r]} ({r.capitalize()})", value=r) for r in REFINEMENTS
+]
+
 COLOR_ERR = 0xE74C3C
 COLOR_INFO = 0x2ECC71
+COLOR_VALUE = 0x9B59B6
 
 
 # -----------------------------
@@ -119,6 +126,35 @@ def build_embed(era: str, code: str, result: RelicRow) -> discord.Embed:
     return embed
 
 
+def build_value_embed(relic_name: str, refinement: str) -> Optional[discord.Embed]:
+    """单个核桃：四种精炼度的期望收益 + 奖励明细"""
+    v = engine.values
+    r = v.index(relic_name) if v else None
+    if r is None:
+        return None
+
+    embed = discord.Embed(title=f"💎 {relic_name} 开启价值", color=COLOR_VALUE)
+    lines = []
+    for i, ref in enumerate(REFINEMENTS):
+        mark = "▶ " if ref == refinement else ""
+        lines.append(
+            f"{mark}**{REFINEMENT_NAMES[ref]}**：单人 {v.plat_solo[i, r]:.1f} Pt / {v.ducat_solo[i, r]:.0f} 杜卡特"
+            f" · 4 人车 {v.plat_share[i, r]:.1f} Pt / {v.ducat_share[i, r]:.0f} 杜卡特"
+        )
+    embed.add_field(name="期望收益", value="\n".join(lines), inline=False)
+
+    rarity_icon = {0: "🟤", 1: "⚪", 2: "🟡"}
+    rewards = []
+    for k, (item, slug) in enumerate(v.table.items[r]):
+        s = v.table.slot[r, k]
+        price = f"{v.prices[s]:g} Pt" if v.prices[s] else "无价"
+        duc = f" / {v.ducats[s]:.0f} 杜卡特" if v.ducats[s] else ""
+        rewards.append(f"{rarity_icon.get(int(v.table.rarity[r, k]), '')} {item}：{price}{duc}")
+    embed.add_field(name="奖励 (卖单前 5 中位价)", value="\n".join(rewards)[:1024], inline=False)
+    embed.set_footer(text="4 人车：每人都能挑 4 件里最好的一件。价格来自 warframe.market，定期刷新。")
+    return embed
+
+
 def build_error(title: str, msg: str) -> discord.Embed:
     e = discord.Embed(title=title, description=msg, color=COLOR_ERR)
     return e
@@ -178,3 +214,42 @@ def setup(tree: app_commands.CommandTree):
         except Exception as e:
             embed = build_error("核桃查询失败", f"系统查询故障：{e}")
             await interaction.followup.send(embed=embed, ephemeral=True)
+
+    @tree.command(name="核桃价值", description="核桃开启的期望白金/杜卡特 (不填代号则列出最值得开的核桃)")
+    @app_commands.choices(era=ERA_CHOICES, 精炼=REFINEMENT_CHOICES)
+    @app_commands.describe(era="选择核桃的纪元", name="核桃代号（例如: L7, B8），留空看排行", 精炼="精炼度", 车队="是否按 4 人车队计算")
+    async def relic_value(
+        interaction: discord.Interaction,
+        era: Optional[app_commands.Choice[str]] = None,
+        name: Optional[str] = None,
+        精炼: str = "radiant",
+        车队: bool = True
+    ):
+        await interaction.response.defer(thinking=False)
+
+        if engine.values is None:
+            embed = build_error("核桃估值尚未就绪", "奖励价格正在后台拉取，请几分钟后再试。\n若长时间无数据，请先运行每日同步以导入奖励表。")
+            await interaction.followup.send(embed=embed, ephemeral=True)
+            return
+
+        if era and name:
+            code = normalize_code(name)
+            if not code:
+                await interaction.followup.send(embed=build_error("核桃查询失败", "输入格式不对。\n示例：`L7`、`B8`、`A10`。"), ephemeral=True)
+                return
+            relic_name = full_relic_name(era.value, code)
+            embed = build_value_embed(relic_name, 精炼)
+            if embed is None:
+                await interaction.followup.send(embed=build_error("⚪ 未找到记录", f"奖励表中没有 **{relic_name}**。"), ephemeral=True)
+                return
+            await interaction.followup.send(embed=embed)
+            return
+
+        rows = engine.top(精炼, 车队, 10)
+        mode = "4 人车" if 车队 else "单人"
+        embed = discord.Embed(title=f"💎 最值得开的核桃 · {REFINEMENT_NAMES[精炼]} · {mode}", color=COLOR_VALUE)
+        embed.description = "\n".join(
+            f"`{n:>2}.` **{relic}**：{plat:.1f} Pt / {duc:.0f} 杜卡特" for n, (relic, plat, duc) in enumerate(rows, 1)
+        ) or "暂无数据"
+        embed.set_footer(text="用 /核桃价值 指定纪元和代号可查看奖励明细。")
+        await interaction.followup.send(embed=embed)
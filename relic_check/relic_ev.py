@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from discord.ext import tasks
+
+from wf_market.market_api import BULK, client_v2
+
+
+# -----------------------------
+# 配置
+# -----------------------------
+
+DB_PATH = Path("relic_check/warframe_relics.db")
+# 奖励估价多久刷新一次 (上游请求走批量优先级，排在指令与价格监控之后)
+REFRESH_MINUTES = int(os.getenv("RELIC_PRICE_REFRESH_MINUTES", "60"))
+
+REFINEMENTS = ("intact", "exceptional", "flawless", "radiant")
+REFINEMENT_NAMES = {"intact": "完整", "exceptional": "优良", "flawless": "无瑕", "radiant": "光辉"}
+RARITIES = ("Common", "Uncommon", "Rare")
+
+# 单件奖励的掉率：行 = 精炼度，列 = 稀有度 (每个核桃 3 件铜 / 2 件银 / 1 件金)
+CHANCES = np.array([
+    [0.2533, 0.11, 0.02],
+    [0.2333, 0.13, 0.04],
+    [0.20,   0.17, 0.06],
+    [0.1667, 0.20, 0.10],
+])
+SQUAD_SIZE = 4
+
+
+# -----------------------------
+# 数据结构
+# -----------------------------
+
+@dataclass(frozen=True)
+class RelicTable:
+    """奖励表展开成定长矩阵：R 个核桃 × K 个奖励位，空位 rarity = -1"""
+    names: List[str]
+    items: List[List[Tuple[str, str]]]   # 每个核桃的 (英文名, slug)
+    slot: np.ndarray                     # (R, K) 奖励在价格向量里的下标，空位 -1
+    rarity: np.ndarray                   # (R, K) 稀有度下标，空位 -1
+    slugs: List[str]                     # 价格向量对应的 slug
+
+
+@dataclass(frozen=True)
+class RelicValues:
+    table: RelicTable
+    prices: np.ndarray                   # (S,) 每个 slug 的估价，无价为 0
+    ducats: np.ndarray                   # (S,)
+    plat_solo: np.ndarray                # (4, R) 各精炼度单人开的期望白金
+    plat_share: np.ndarray               # (4, R) 4 人车队各自挑最好的一件
+    ducat_solo: np.ndarray
+    ducat_share: np.ndarray
+    priced: int                          # 有价格的 slug 数
+    computed_at: float
+
+    def index(self, name: str) -> Optional[int]:
+        try:
+            return self.table.names.index(name)
+        except ValueError:
+            return None
+
+
+# -----------------------------
+# 计算
+# -----------------------------
+
+def expected_values(values: np.ndarray, rarity: np.ndarray, squad: int = SQUAD_SIZE) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    对所有核桃、所有精炼度一次性计算：
+    - 单人：sum(p * v)
+    - 车队：squad 个独立抽取里取最大值的期望。
+      按价值升序排好后 G 为累计概率，最大值落在第 j 件的概率是 G_j^n - G_{j-1}^n
+    values / rarity 形状 (R, K)，返回两个 (4, R) 数组
+    """
+    p = np.where(rarity >= 0, CHANCES[:, np.maximum(rarity, 0)], 0.0)       # (4, R, K)
+    solo = (p * values).sum(axis=-1)
+
+    order = np.argsort(values, axis=-1)
+    v_sorted = np.take_along_axis(values, order, axis=-1)
+    p_sorted = np.take_along_axis(p, np.broadcast_to(order, p.shape), axis=-1)
+    g = np.clip(np.cumsum(p_sorted, axis=-1), 0.0, 1.0) ** squad
+    share = (v_sorted * np.diff(g, axis=-1, prepend=0.0)).sum(axis=-1)
+    return solo, share
+
+
+def load_table(db_path: Path = DB_PATH) -> Optional[RelicTable]:
+    with sqlite3.connect(str(db_path)) as conn:
+        try:
+            rows = conn.execute("SELECT relic, item, slug, rarity FROM relic_rewards ORDER BY relic, item").fetchall()
+        except sqlite3.OperationalError:
+            return None
+    if not rows:
+        return None
+
+    # 奖励名优先用物品目录里的精确匹配修正 slug
+    index = client_v2.ensure_catalog()
+
+    grouped: Dict[str, List[Tuple[str, str, int]]] = {}
+    for relic, item, slug, rarity in rows:
+        hit = (index.row(item) or index.row(slug)) if index else None
+        grouped.setdefault(relic, []).append((item, hit[0] if hit else slug, RARITIES.index(rarity)))
+
+    names = list(grouped)
+    width = max(len(v) for v in grouped.values())
+    slugs: Dict[str, int] = {}
+    slot = np.full((len(names), width), -1, dtype=np.int32)
+    rarity = np.full((len(names), width), -1, dtype=np.int8)
+    for r, name in enumerate(names):
+        for k, (_, slug, rar) in enumerate(grouped[name]):
+            slot[r, k] = slugs.setdefault(slug, len(slugs))
+            rarity[r, k] = rar
+    return RelicTable(
+        names=names,
+        items=[[(item, slug) for item, slug, _ in grouped[n]] for n in names],
+        slot=slot, rarity=rarity, slugs=list(slugs),
+    )
+
+
+class RelicEV:
+    """
+    核桃期望收益引擎：
+    - 奖励表来自 relic_rewards (sync_jobs 每日同步)
+    - 所有奖励一次批量估价 (走订单缓存 + 全局限速器)
+    - 价格向量与上次完全相同时直接沿用结果，只有价格变动才重新计算
+    """
+
+    def __init__(self, db_path: Path = DB_PATH):
+        self.db_path = db_path
+        self.values: Optional[RelicValues] = None
+        self._lock = threading.Lock()
+        self.recomputes = 0
+
+    def refresh(self) -> Optional[RelicValues]:
+        with self._lock:
+            table = load_table(self.db_path)
+            if table is None:
+                return None
+
+            quotes = client_v2.get_sell_prices(table.slugs, BULK)
+            prices = np.array([quotes.get(s) or 0.0 for s in table.slugs], dtype=np.float64)
+            index = client_v2.item_index
+            ducats = np.array([(index.row(s) or (0,) * 5)[4] if index else 0 for s in table.slugs], dtype=np.float64)
+
+            old = self.values
+            if (old is not None and old.table.slugs == table.slugs and old.table.names == table.names
+                    and np.array_equal(old.prices, prices) and np.array_equal(old.ducats, ducats)):
+                return old
+
+            slot = np.maximum(table.slot, 0)
+            empty = table.slot < 0
+            plat = np.where(empty, 0.0, prices[slot])
+            duc = np.where(empty, 0.0, ducats[slot])
+            plat_solo, plat_share = expected_values(plat, table.rarity)
+            ducat_solo, ducat_share = expected_values(duc, table.rarity)
+
+            self.values = RelicValues(
+                table=table, prices=prices, ducats=ducats,
+                plat_solo=plat_solo, plat_share=plat_share,
+                ducat_solo=ducat_solo, ducat_share=ducat_share,
+                priced=int(np.count_nonzero(prices)), computed_at=time.time(),
+            )
+            self.recomputes += 1
+            return self.values
+
+    def top(self, refinement: str, squad: bool, n: int = 10) -> List[Tuple[str, float, float]]:
+        """按期望白金排序的前 n 个核桃：(名字, 白金, 杜卡特)"""
+        v = self.values
+        if v is None: return []
+        i = REFINEMENTS.index(refinement)
+        plat = (v.plat_share if squad else v.plat_solo)[i]
+        duc = (v.ducat_share if squad else v.ducat_solo)[i]
+        order = np.argsort(-plat)[:n]
+        return [(v.table.names[r], float(plat[r]), float(duc[r])) for r in order]
+
+engine = RelicEV()
+
+
+# -----------------------------
+# 后台刷新
+# -----------------------------
+
+class RelicValueRefresher:
+    def __init__(self, bot):
+        self.bot = bot
+        self.refresh.start()
+
+    @tasks.loop(minutes=REFRESH_MINUTES)
+    async def refresh(self):
+        try:
+            t0 = time.perf_counter()
+            before = engine.recomputes
+            v = await asyncio.to_thread(engine.refresh)
+            if v is not None and engine.recomputes != before:
+                print(f"💎 核桃估值已更新：{len(v.table.names)} 个核桃 / {v.priced} 件有价奖励，"
+                      f"耗时 {time.perf_counter() - t0:.1f}s")
+        except Exception as e:
+            print(f"核桃估值刷新失败: {e}")
+
+def setup_relic_ev(bot):
+    return RelicValueRefresher(bot)
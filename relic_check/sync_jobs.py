@@ -15,6 +15,8 @@ import requests
 # -------------------------
 
 WARFRAMESTAT_BASE = "https://api.warframestat.us/pc"
+# 官方掉落表的整理版 (每个核桃各精炼度的奖励与稀有度)
+DROPS_RELICS_URL = "https://drops.warframestat.us/data/relics.json"
 DB_PATH = Path("relic_check/warframe_relics.db")  # 你如果 db 在根目录就改成 Path("warframe_relics.db")
 
 # 新闻关键词（你原本的）
@@ -92,6 +94,16 @@ def ensure_tables(conn: sqlite3.Connection) -> None:
             seen_at TEXT NOT NULL
         )
     """)
+    # 核桃奖励表：每个核桃 6 件奖励及其稀有度 (各精炼度的概率由稀有度决定)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS relic_rewards (
+            relic TEXT NOT NULL,
+            item TEXT NOT NULL,
+            slug TEXT NOT NULL,
+            rarity TEXT NOT NULL,
+            PRIMARY KEY (relic, item)
+        )
+    """)
     conn.commit()
 
 
@@ -187,7 +199,53 @@ def sync_resurgence(conn: sqlite3.Connection, session: requests.Session) -> Sync
 
 
 # -------------------------
-# 任务 2：扫描 News（可扩展成更新 DB 的触发器）
+# 任务 2：同步核桃奖励表
+# -------------------------
+
+def reward_slug(item_name: str) -> str:
+    """掉落表里的英文名 -> warframe.market 的 slug 规则 (小写、空格换下划线)"""
+    s = item_name.strip().lower().replace("&", "and")
+    s = re.sub(r"[^a-z0-9 _-]", "", s)
+    return re.sub(r"[\s-]+", "_", s)
+
+
+def sync_relic_rewards(conn: sqlite3.Connection, session: requests.Session) -> int:
+    """
+    用掉落表整体替换 relic_rewards；只取 Intact 条目里的奖励与稀有度即可，
+    其余精炼度的概率是固定的。
+    """
+    print("🎁 [Rewards] 正在同步核桃奖励表...")
+    r = session.get(DROPS_RELICS_URL, timeout=30)
+    r.raise_for_status()
+
+    rows = []
+    for relic in r.json().get("relics", []) or []:
+        if (relic.get("state") or "").lower() != "intact":
+            continue
+        name = normalize_relic_name(f"{relic.get('tier', '')} {relic.get('relicName', '')} Relic")
+        if not name:
+            continue
+        for reward in relic.get("rewards", []) or []:
+            item = (reward.get("itemName") or "").strip()
+            rarity = (reward.get("rarity") or "").capitalize()
+            if item and rarity in ("Common", "Uncommon", "Rare"):
+                rows.append((name, item, reward_slug(item), rarity))
+
+    if not rows:
+        print("ℹ️ [Rewards] 掉落表为空，保留原有数据。")
+        return 0
+
+    cur = conn.cursor()
+    cur.execute("DELETE FROM relic_rewards")
+    cur.executemany("INSERT OR REPLACE INTO relic_rewards(relic, item, slug, rarity) VALUES (?, ?, ?, ?)", rows)
+    meta_set(conn, "relic_rewards_synced_utc", utc_now_str())
+    conn.commit()
+    print(f"✅ [Rewards] 同步完成：{len(rows)} 条奖励。")
+    return len(rows)
+
+
+# -------------------------
+# 任务 3：扫描 News（可扩展成更新 DB 的触发器）
 # -------------------------
 
 def scan_news(conn: sqlite3.Connection, session: requests.Session, max_items: int = 10) -> int:
@@ -251,6 +309,12 @@ def run_daily_sync() -> None:
         session = get_session()
         try:
             sync_resurgence(conn, session)
+            # 掉落表站点偶尔不可用：记录后继续，保留原有奖励表，不影响其他任务
+            try:
+                sync_relic_rewards(conn, session)
+            except Exception as e:
+                conn.rollback()
+                print(f"⚠️ [Rewards] 同步失败，保留原有数据：{e}")
             scan_news(conn, session, max_items=10)
 
             # 标记今日已跑
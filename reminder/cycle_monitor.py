@@ -1,47 +1,172 @@
 import asyncio
+import heapq
 import time
+from collections import deque
+from typing import List, Optional, Tuple
 import discord
-from discord.ext import tasks
-from reminder.reminder_core import pop_due_items, ts_full
+from reminder.reminder_core import get_repo, list_active, ts_full, ts_relative
+from reminder.reminder_records import ReminderItem
+from reminder.reminder_store import store
 
-def setup_time_monitor(client: discord.Client):
+# 调度延迟 (到期 -> 领取落盘并派发发送任务) 超过该阈值时打印告警 (毫秒)；
+# Discord 发送耗时单独统计，不计入调度延迟
+LATENESS_WARN_MS = 100
+
+class CycleScheduler:
     """
-    专门的时间监控器：独立存储和运行 Type 1 提醒的轮询逻辑
+    专门的时间监控器：Type 1 提醒的事件驱动调度
+
+    待触发提醒以 (trigger_ts, id) 放在最小堆里，协程精确睡到堆顶的到期时间；
+    /提醒_平原 新增更早的提醒时通过 schedule() 提前唤醒。空闲时不做任何轮询。
+    已取消的提醒不从堆中删除，到期时由 store.trigger 过滤掉 (惰性删除)。
+    重复提醒触发后只在内存中推进到下一周期并重新入堆，不写存储。
     """
-    
-    @tasks.loop(seconds=1.0)
-    async def time_checker():
+
+    def __init__(self, client: discord.Client):
+        self.client = client
+        self._heap: List[Tuple[int, str]] = []
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        # 调度延迟 (到期 -> 派发) 与发送耗时 (派发 -> 消息发出)：各保留最近 1000 次 + 历史最大值
+        self.lateness_ms = deque(maxlen=1000)
+        self.max_lateness_ms = 0.0
+        self.send_ms = deque(maxlen=1000)
+        self.max_send_ms = 0.0
+        self.fired_count = 0
+        # 正在发送的通知任务：保留引用，防止任务在完成前被回收
+        self._sending = set()
+
+    def start(self) -> None:
+        for item in list_active(1):
+            self._heap.append((int(item.trigger_ts or 0), item.id))
+        heapq.heapify(self._heap)
+        self._task = asyncio.create_task(self._run())
+
+    def stop(self) -> None:
+        if self._task: self._task.cancel()
+
+    def schedule(self, item: ReminderItem) -> None:
+        """登记一条新的 Type 1 提醒；若比当前堆顶更早则立即唤醒调度协程"""
+        entry = (int(item.trigger_ts or 0), item.id)
+        earlier = not self._heap or entry < self._heap[0]
+        heapq.heappush(self._heap, entry)
+        if earlier:
+            self._wake.set()
+
+    @property
+    def pending(self) -> int:
+        return len(self._heap)
+
+    @staticmethod
+    def _p99(samples) -> float:
+        recent = sorted(samples)
+        return recent[min(len(recent) - 1, int(len(recent) * 0.99))] if recent else 0.0
+
+    def stats(self) -> dict:
+        return {
+            "pending": self.pending,
+            "fired": self.fired_count,
+            "p99_ms": round(self._p99(self.lateness_ms), 1),
+            "max_ms": round(self.max_lateness_ms, 1),
+            "send_p99_ms": round(self._p99(self.send_ms), 1),
+            "send_max_ms": round(self.max_send_ms, 1),
+        }
+
+    async def _run(self):
         # 确保 Bot 准备就绪后再执行，防止找不到频道
-        if not client.is_ready():
-            return
-            
-        current_ts = int(time.time())
-        # 从 reminders.json 取出到期的任务
-        due_items = pop_due_items(current_ts)
-        
-        for item in due_items:
-            channel = client.get_channel(item.channel_id)
-            if channel:
-                # 构造艾特提醒的 UI
-                embed = discord.Embed(
-                    title="⏰ 定时提醒触发", 
-                    description=f"您预设的提醒时间已到：**{item.item_name}**", 
-                    color=0xE74C3C # 红色提醒
-                )
-                
-                # 如果 meta 里有具体的开始时间，展示出来
-                start_ts = item.meta.get("start_ts")
-                if start_ts:
-                    embed.add_field(name="目标事件时间", value=ts_full(int(start_ts)))
-                
-                embed.set_footer(text="提示：该提醒已触发并自动从活跃列表中移除。")
+        await self.client.wait_until_ready()
+        while True:
+            self._wake.clear()
+            if not self._heap:
+                await self._wake.wait()
+                continue
 
+            delay = self._heap[0][0] - time.time()
+            if delay > 0:
                 try:
-                    # 发送艾特消息
-                    await channel.send(content=f"<@{item.user_id}>", embed=embed)
-                except Exception as e:
-                    print(f"发送提醒失败: {e}")
-
-    # 启动循环任务
-    time_checker.start()
-    return time_checker
\ No newline at end of file
+                    await asyncio.wait_for(self._wake.wait(), timeout=delay)
+                    continue  # 被新提醒唤醒，重新计算堆顶
+                except asyncio.TimeoutError:
+                    pass
+
+            now = time.time()
+            due_ids = []
+            while self._heap and self._heap[0][0] <= now:
+                due_ids.append(heapq.heappop(self._heap)[1])
+            if not due_ids:
+                continue
+
+            # 一次性提醒交给 store 禁用；重复提醒在内存中推进
+            repo = get_repo()
+            one_shot, fired = [], []
+            for item_id in due_ids:
+                item = repo.get(item_id)
+                if item is None or not item.enabled or item.trigger_ts > now:
+                    continue  # 已取消 / 堆里的过期条目
+                if getattr(item, "recurring", False):
+                    occurrence = (item.start_ts, item.trigger_ts)
+                    if repo.rearm(item_id, int(now)):
+                        heapq.heappush(self._heap, (item.trigger_ts, item_id))
+                        fired.append((item, occurrence))
+                else:
+                    one_shot.append(item_id)
+
+            try:
+                for item in await store.trigger(one_shot):
+                    fired.append((item, (getattr(item, "start_ts", 0), item.trigger_ts)))
+            except Exception as e:
+                print(f"领取到期提醒失败: {e}")
+
+            dispatched = time.time()
+            for item, (start_ts, trigger_ts) in fired:
+                # 调度延迟：到期 -> 已领取并派发，不含 Discord 接口耗时
+                late = max(0.0, (dispatched - int(trigger_ts or 0)) * 1000)
+                self.lateness_ms.append(late)
+                self.max_lateness_ms = max(self.max_lateness_ms, late)
+                self.fired_count += 1
+                if late > LATENESS_WARN_MS:
+                    print(f"⚠️ 提醒 {item.id} 调度延迟 {late:.0f} ms")
+                # 发送放到独立任务里，慢速的 Discord 请求不拖慢后续定时器
+                task = asyncio.create_task(self._deliver(item, start_ts))
+                self._sending.add(task)
+                task.add_done_callback(self._sending.discard)
+
+    async def _deliver(self, item: ReminderItem, start_ts: int):
+        """发送通知，单独记录派发 -> 消息发出的耗时"""
+        t0 = time.perf_counter()
+        await self._notify(item, start_ts)
+        cost = (time.perf_counter() - t0) * 1000
+        self.send_ms.append(cost)
+        self.max_send_ms = max(self.max_send_ms, cost)
+
+    async def _notify(self, item: ReminderItem, start_ts: int = 0):
+        channel = self.client.get_channel(item.channel_id)
+        if not channel:
+            return
+        # 构造艾特提醒的 UI
+        embed = discord.Embed(
+            title="⏰ 定时提醒触发",
+            description=f"您预设的提醒时间已到：**{item.item_name}**",
+            color=0xE74C3C # 红色提醒
+        )
+
+        # 如果有具体的开始时间，展示出来
+        if start_ts:
+            embed.add_field(name="目标事件时间", value=ts_full(int(start_ts)))
+
+        if getattr(item, "recurring", False):
+            embed.add_field(name="🔁 下一次提醒", value=f"{ts_full(item.trigger_ts)} ({ts_relative(item.trigger_ts)})", inline=False)
+            embed.set_footer(text="提示：这是重复提醒，可用 /提醒取消 停止。")
+        else:
+            embed.set_footer(text="提示：该提醒已触发并自动从活跃列表中移除。")
+
+        try:
+            # 发送艾特消息
+            await channel.send(content=f"<@{item.user_id}>", embed=embed)
+        except Exception as e:
+            print(f"发送提醒失败: {e}")
+
+def setup_time_monitor(client: discord.Client) -> CycleScheduler:
+    scheduler = CycleScheduler(client)
+    scheduler.start()
+    return scheduler
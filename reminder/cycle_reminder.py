@@ -1,18 +1,15 @@
 import asyncio
 import time
-import json
-import os
 import discord
 from discord import app_commands
 from typing import List
 
 # 引用你已有的核心逻辑
 from timecheck.cycle_core import get_three_statuses, next_state_start_ts, CycleStatus
-from reminder.reminder_core import (
-    ts_full, ts_relative
-)
+from reminder.reminder_core import ts_full, ts_relative
+from reminder.reminder_records import CycleReminder
+from reminder.reminder_store import store
 
-ALERTS_FILE = "reminders.json"
 COLOR_OK = 0x2ECC71
 COLOR_ALERT = 0xE74C3C
 
@@ -53,13 +50,14 @@ def compute_cycle_times(status: CycleStatus, target_key: str, minutes_before: in
 def setup(tree: app_commands.CommandTree, client: discord.Client):
 
     @tree.command(name="提醒_平原", description="设置平原/开放世界提醒")
-    @app_commands.describe(区域="选择开放世界", 状态="根据区域选择对应状态", 提前分钟="提前多少分钟提醒")
+    @app_commands.describe(区域="选择开放世界", 状态="根据区域选择对应状态", 提前分钟="提前多少分钟提醒",
+                           重复="每个周期都提醒 (例如每个夜灵平原夜晚)，直到手动取消")
     @app_commands.choices(区域=[
         app_commands.Choice(name="夜灵平原 (Cetus)", value="夜灵平原"),
         app_commands.Choice(name="奥布山谷 (金星)", value="金星"),
         app_commands.Choice(name="魔方提灯 (火卫二)", value="火卫二"),
     ])
-    async def remind(interaction: discord.Interaction, 区域: app_commands.Choice[str], 状态: str, 提前分钟: int = 0):
+    async def remind(interaction: discord.Interaction, 区域: app_commands.Choice[str], 状态: str, 提前分钟: int = 0, 重复: bool = False):
         await interaction.response.defer()
         
         area = 区域.value
@@ -71,41 +69,44 @@ def setup(tree: app_commands.CommandTree, client: discord.Client):
             return
 
         start_ts, trigger_ts = compute_cycle_times(status, 状态, 提前分钟)
+        if start_ts <= 0:
+            # 状态不属于该区域 (例如没选区域时的占位项) 或周期数据不完整，不保存无意义的提醒
+            options = AREA_MAP.get(area, [])
+            if any(k == 状态 for _, k in options):
+                await interaction.followup.send("❌ 暂时无法计算该状态的开始时间，请稍后再试。")
+            else:
+                await interaction.followup.send(f"❌ 无效的状态，{area} 可选：{'、'.join(name for name, _ in options)}")
+            return
         target_text = display_target(area, 状态)
 
-        # 构造数据：标记 reminder_type = 1
-        new_reminder = {
-            "type": "cycle",
-            "reminder_type": 1, 
-            "user_id": interaction.user.id,
-            "channel_id": interaction.channel_id,
-            "item_name": f"{area}-{target_text}",
-            "trigger_ts": trigger_ts,
-            "meta": {
-                "area": area, 
-                "target_text": target_text, 
-                "start_ts": start_ts, 
-                "minutes_before": 提前分钟
-            }
-        }
-
-        # 写入共享 JSON
-        data = []
-        if os.path.exists(ALERTS_FILE):
-            try:
-                with open(ALERTS_FILE, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-            except: data = []
-        
-        data.append(new_reminder)
-        with open(ALERTS_FILE, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=4)
+        # 构造数据：Type 1 平原提醒；重复模式只保存一条规则 (锚点 + 周期长度)
+        cycle_len = sum(d for _, d in status.pattern) if 重复 else 0
+        new_reminder = CycleReminder(
+            user_id=interaction.user.id,
+            channel_id=interaction.channel_id,
+            guild_id=interaction.guild_id,
+            item_name=f"{area}-{target_text}",
+            trigger_ts=trigger_ts,
+            area=area,
+            target_text=target_text,
+            start_ts=start_ts,
+            minutes_before=提前分钟,
+            cycle_len=cycle_len
+        )
+
+        # 写入提醒数据库，并登记到调度器 (比当前最早的提醒更早时会立即唤醒)
+        await store.add(new_reminder)
+        scheduler = getattr(client, "time_monitor", None)
+        if scheduler:
+            scheduler.schedule(new_reminder)
 
         # 成功反馈
         embed = discord.Embed(title="✅ 提醒设置成功", color=COLOR_OK)
         embed.add_field(name="目标", value=f"**{area} - {target_text}**", inline=False)
         embed.add_field(name="开始时间", value=f"{ts_full(start_ts)}\n{ts_relative(start_ts)}", inline=False)
         embed.add_field(name="提醒时间", value=f"{ts_full(trigger_ts)}\n{ts_relative(trigger_ts)}", inline=False)
+        if cycle_len:
+            embed.add_field(name="🔁 重复", value=f"每 {cycle_len // 60} 分钟一个周期，触发后自动设置下一次", inline=False)
         await interaction.followup.send(embed=embed)
 
     @remind.autocomplete("状态")
@@ -1,38 +1,53 @@
 import discord
 from discord import app_commands
-from reminder.reminder_core import list_items, disable_item, ts_full, ts_relative
+from typing import List
+from reminder.reminder_core import list_items, get_item, ts_full, ts_relative
+from reminder.reminder_store import store
 
 # 颜色配置
 COLOR_OK = 0x2ECC71
 COLOR_ERR = 0xE74C3C
 
+def choice_label(item) -> str:
+    """自动补全下拉框中的一行：名称 + 类型摘要 + 稳定 id"""
+    if item.reminder_type == 1:
+        detail = f"{'🔁' if getattr(item, 'recurring', False) else '⏰'} {item.item_name}"
+    elif item.reminder_type == 2:
+        trade_str = "新挂单" if getattr(item, "listing", False) else ("买入" if item.trade_type == "sell" else "卖出")
+        rank_str = f" R{item.rank}" if item.rank is not None else ""
+        detail = f"💰 {item.item_name}{rank_str} {trade_str} {item.target_price}Pt"
+    elif item.reminder_type == 3:
+        detail = f"🌀 {item.item_name}"
+    else:
+        detail = item.item_name
+    # Discord 限制 Choice 名称最长 100 字符
+    return f"{detail[:85]} [{item.id}]"
+
 def setup(tree: app_commands.CommandTree):
-    @tree.command(name="提醒取消", description="通过序号取消提醒（序号见 /提醒列表）")
-    @app_commands.describe(序号="在 /提醒列表 中看到的数字编号")
-    async def cancel_reminder(interaction: discord.Interaction, 序号: int):
-        # 1. 统一 defer 处理，防止操作文件导致超时
+    @tree.command(name="提醒取消", description="取消一个提醒（输入时会列出你当前的提醒）")
+    @app_commands.describe(提醒="从下拉列表中选择要取消的提醒，也可输入 /提醒列表 中的 ID")
+    async def cancel_reminder(interaction: discord.Interaction, 提醒: str):
+        # 1. 统一 defer 处理
         await interaction.response.defer(thinking=True)
 
-        if 序号 <= 0:
-            await interaction.followup.send(embed=discord.Embed(
-                title="❌ 输入错误", description="序号必须从 1 开始。", color=COLOR_ERR
-            ))
-            return
+        # 2. 按稳定 ID 直接定位；兼容旧习惯输入的列表序号
+        key = 提醒.strip()
+        item = get_item(key)
+        if item is None and key.isdigit():
+            user_list = list_items(interaction.user.id, only_enabled=True)
+            idx = int(key)
+            item = user_list[idx - 1] if 1 <= idx <= len(user_list) else None
 
-        # 2. 获取当前用户所有活跃提醒，并根据序号提取条目
-        user_list = list_items(interaction.user.id, only_enabled=True)
-        item = user_list[序号 - 1] if 1 <= 序号 <= len(user_list) else None
-        
-        if not item:
+        if not item or item.user_id != interaction.user.id:
             await interaction.followup.send(embed=discord.Embed(
                 title="❌ 取消失败", 
-                description="找不到对应的提醒。可能序号已变动，请重新查看 `/提醒列表`。", 
+                description="找不到对应的提醒，请从下拉列表中选择或查看 `/提醒列表`。", 
                 color=COLOR_ERR
             ))
             return
 
         # 3. 执行禁用操作 (将 enabled 设为 False)
-        ok = disable_item(item.id)
+        ok = await store.disable(item.id)
         if not ok:
             await interaction.followup.send(embed=discord.Embed(
                 title="❌ 取消失败", description="该提醒可能已经触发或已被手动移除。", color=COLOR_ERR
@@ -48,10 +63,9 @@ def setup(tree: app_commands.CommandTree):
         # 针对不同类型的提醒展示不同的原定信息
         if item.reminder_type == 1:
             # Type 1: 平原/时间类展示
-            meta = item.meta or {}
-            area = meta.get("area")
-            target = meta.get("target_text")
-            start_ts = meta.get("start_ts")
+            area = getattr(item, "area", None)
+            target = getattr(item, "target_text", None)
+            start_ts = getattr(item, "start_ts", 0)
             
             if area and target:
                 embed.add_field(name="原定目标", value=f"{area} · {target}", inline=True)
@@ -64,10 +78,23 @@ def setup(tree: app_commands.CommandTree):
         
         elif item.reminder_type == 2:
             # Type 2: 市场价格监控展示
-            trade_str = "买入 (监控卖家)" if item.trade_type == "sell" else "卖出 (监控买家)"
+            trade_str = "新挂单 (监控新卖家)" if getattr(item, "listing", False) else ("买入 (监控卖家)" if item.trade_type == "sell" else "卖出 (监控买家)")
             rank_str = f" (Rank {item.rank})" if item.rank is not None else ""
             embed.add_field(name="监控类型", value=f"{trade_str}{rank_str}", inline=True)
             embed.add_field(name="监控价格", value=f"{item.target_price} Pt", inline=True)
 
         embed.set_footer(text="提示：你可以随时重新设置新的提醒。")
-        await interaction.followup.send(embed=embed)
\ No newline at end of file
+        await interaction.followup.send(embed=embed)
+
+    @cancel_reminder.autocomplete("提醒")
+    async def cancel_autocomplete(interaction: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
+        cur = current.strip().lower()
+        out = []
+        for item in list_items(interaction.user.id, only_enabled=True):
+            label = choice_label(item)
+            if cur and cur not in label.lower():
+                continue
+            out.append(app_commands.Choice(name=label, value=item.id))
+            if len(out) >= 25:  # Discord 最多展示 25 个选项
+                break
+        return out
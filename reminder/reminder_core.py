@@ -1,90 +1,463 @@
 from __future__ import annotations
 import json
-import uuid
+import sqlite3
+import threading
 import time
-from dataclasses import dataclass, asdict
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, List, Optional
+from reminder.reminder_records import ReminderItem, LEGACY_FIELDS, from_dict, from_legacy
 
-DB_PATH = Path("reminders.json")
+DB_PATH = Path("reminders.db")
+# 旧版本的 JSON 存储，首次启动时自动迁移进 SQLite
+LEGACY_JSON_PATH = Path("reminders.json")
 
 def ts_full(unix: int) -> str: return f"<t:{int(unix)}:f>"
 def ts_relative(unix: int) -> str: return f"<t:{int(unix)}:R>"
 
-@dataclass
-class ReminderItem:
-    user_id: int
-    channel_id: int
-    item_name: str
-    reminder_type: int 
-    type: str = "custom"            
-    trigger_ts: Optional[int] = 0   
-    target_price: Optional[int] = 0 
-    rank: Optional[int] = None      
-    trade_type: Optional[str] = None 
-    slug: Optional[str] = None
-    
-    # --- Type 3 裂缝提醒新增字段 ---
-    target_mission: Optional[str] = None    # 存储任务英文名, 如 Excavation
-    target_is_storm: bool = False           # 是否仅限九重天 (虚空风暴)
-    
-    id: str = ""
-    meta: dict = None
-    enabled: bool = True
-
-    def __post_init__(self):
-        if not self.id: self.id = uuid.uuid4().hex[:10]
-        if self.meta is None: self.meta = {}
-
-def load_items() -> List[ReminderItem]:
-    if not DB_PATH.exists(): return []
+# -------- 持久化格式 (SQLite) --------
+# 内存中的 ReminderRepository 是唯一数据源；磁盘上只有两张表：
+#   reminders         快照：压缩时整理出的完整状态
+#   reminder_journal  追加日志：每次增/禁用/触发写一条，启动时在快照之上重放
+# 快照表沿用旧版宽表的列 (v1 格式) 外加 guild_id，meta 以 JSON 文本存储；日志里的 add 记录使用 v2 紧凑格式
+_COLUMNS = list(LEGACY_FIELDS) + ["guild_id"]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS reminders (
+    id TEXT PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    channel_id INTEGER NOT NULL,
+    item_name TEXT NOT NULL,
+    reminder_type INTEGER NOT NULL,
+    type TEXT NOT NULL DEFAULT 'custom',
+    trigger_ts INTEGER DEFAULT 0,
+    target_price INTEGER DEFAULT 0,
+    rank INTEGER,
+    trade_type TEXT,
+    slug TEXT,
+    target_mission TEXT,
+    target_is_storm INTEGER NOT NULL DEFAULT 0,
+    meta TEXT NOT NULL DEFAULT '{}',
+    enabled INTEGER NOT NULL DEFAULT 1,
+    guild_id INTEGER
+);
+-- 读操作全部走内存，快照表只在启动加载和压缩时整表读写，不需要二级索引 (旧库里的一并删掉)
+DROP INDEX IF EXISTS idx_reminders_due;
+DROP INDEX IF EXISTS idx_reminders_user;
+CREATE TABLE IF NOT EXISTS reminder_journal (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    op TEXT NOT NULL,          -- add / disable / trigger
+    item_id TEXT NOT NULL,
+    payload TEXT,              -- 仅 add 携带完整条目
+    ts INTEGER NOT NULL
+);
+-- 已禁用 (触发/取消) 的条目由保留策略移到这里，超过 TTL 后删除
+CREATE TABLE IF NOT EXISTS reminders_archive (
+    id TEXT PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    channel_id INTEGER NOT NULL,
+    item_name TEXT NOT NULL,
+    reminder_type INTEGER NOT NULL,
+    type TEXT NOT NULL DEFAULT 'custom',
+    trigger_ts INTEGER DEFAULT 0,
+    target_price INTEGER DEFAULT 0,
+    rank INTEGER,
+    trade_type TEXT,
+    slug TEXT,
+    target_mission TEXT,
+    target_is_storm INTEGER NOT NULL DEFAULT 0,
+    meta TEXT NOT NULL DEFAULT '{}',
+    enabled INTEGER NOT NULL DEFAULT 0,
+    guild_id INTEGER,
+    archived_at INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_archive_time ON reminders_archive(archived_at);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# 日志累计超过该条数时在后台线程压缩进快照
+COMPACT_EVERY = 2000
+# 压缩时每个事务最多折叠的日志条数 (单个事务约几十毫秒)
+COMPACT_CHUNK = 500
+
+def _connect() -> sqlite3.Connection:
+    conn = sqlite3.connect(str(DB_PATH), check_same_thread=False, isolation_level=None, timeout=10)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    # FULL：每次提交都落盘，已确认的写入在崩溃/断电后不会丢
+    conn.execute("PRAGMA synchronous=FULL")
+    return conn
+
+def _to_row(item: ReminderItem) -> tuple:
+    d = item.to_legacy()
+    d.setdefault("guild_id", None)
+    d["meta"] = json.dumps(d.get("meta") or {}, ensure_ascii=False)
+    d["target_is_storm"] = int(bool(d["target_is_storm"]))
+    d["enabled"] = int(bool(d["enabled"]))
+    return tuple(d[c] for c in _COLUMNS)
+
+def _from_row(row) -> ReminderItem:
+    d = {c: row[c] for c in _COLUMNS}
     try:
-        raw = json.loads(DB_PATH.read_text(encoding="utf-8"))
-        # 因为使用了 **x 解包，JSON 中缺失的新字段会自动使用 dataclass 定义的默认值
-        return [ReminderItem(**x) for x in raw]
-    except: return []
+        d["meta"] = json.loads(d["meta"]) if d["meta"] else {}
+    except ValueError:
+        d["meta"] = {}
+    return from_legacy(d)
+
+def _from_payload(payload: str) -> ReminderItem:
+    # 早期日志记录是整行宽表 (meta 为 JSON 文本)，新记录带版本号
+    d = json.loads(payload)
+    return from_dict(d) if "v" in d else _from_row(d)
+
+_INSERT_SQL = f"INSERT OR REPLACE INTO reminders ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})"
+_JOURNAL_SQL = "INSERT INTO reminder_journal(op, item_id, payload, ts) VALUES(?, ?, ?, ?)"
+
+def _ensure_columns(conn: sqlite3.Connection) -> None:
+    """给旧版本建出的表补上后来新增的列"""
+    for table in ("reminders", "reminders_archive"):
+        have = {r["name"] for r in conn.execute(f"PRAGMA table_info({table})")}
+        if "guild_id" not in have:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN guild_id INTEGER")
+
+def _run_tx(conn: sqlite3.Connection, fn) -> None:
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        fn(conn)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+def _meta_get(conn: sqlite3.Connection, key: str) -> Optional[str]:
+    row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else None
+
+def _meta_set(conn: sqlite3.Connection, key: str, value: str) -> None:
+    conn.execute(
+        "INSERT INTO meta(key, value) VALUES(?, ?) ON CONFLICT(key) DO UPDATE SET value=excluded.value",
+        (key, value)
+    )
+
+def _migrate_legacy_json(conn: sqlite3.Connection) -> None:
+    """一次性把旧的 reminders.json 导入 SQLite，完成后将原文件重命名备份"""
+    done = conn.execute("SELECT value FROM meta WHERE key = 'legacy_json_migrated'").fetchone()
+    if done or not LEGACY_JSON_PATH.exists():
+        return
+    try:
+        raw = json.loads(LEGACY_JSON_PATH.read_text(encoding="utf-8"))
+        items = [from_legacy(x) for x in raw]
+    except Exception as e:
+        print(f"reminders.json 迁移失败，已跳过: {e}")
+        return
+
+    def tx(c):
+        c.executemany(_INSERT_SQL.replace("OR REPLACE", "OR IGNORE"), [_to_row(x) for x in items])
+        c.execute(
+            "INSERT OR REPLACE INTO meta(key, value) VALUES('legacy_json_migrated', ?)",
+            (str(int(time.time())),)
+        )
+    _run_tx(conn, tx)
+    LEGACY_JSON_PATH.rename(LEGACY_JSON_PATH.with_name(LEGACY_JSON_PATH.name + ".migrated"))
+    print(f"✅ 已从 {LEGACY_JSON_PATH} 迁移 {len(items)} 条提醒到 {DB_PATH}")
+
+class ReminderRepository:
+    """
+    常驻内存的提醒仓库
+
+    - 读操作只访问内存
+    - 写操作先追加一条日志并提交 (O(1)，与提醒总数无关)，成功后再修改内存
+    - 日志过长时由后台线程把日志折叠进快照表，不阻塞命令与监控
+    - _lock 只保护内存结构，任何 SQLite 读写都不在持锁期间进行；
+      self._conn 只给唯一写入者 (ReminderStore 的提交线程) 使用，其余读写各自开连接
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.RLock()
+        self._items: Dict[str, ReminderItem] = {}
+        # reminder_type -> {id: item}，仅包含 enabled 的条目
+        self._active: Dict[int, Dict[str, ReminderItem]] = {}
+        # user_id -> {id: item}，用户维度的二级索引 (含已禁用条目)
+        self._by_user: Dict[int, Dict[str, ReminderItem]] = {}
+        # guild_id -> {id: item}，仅包含 enabled 的条目，供配额统计
+        self._by_guild: Dict[int, Dict[str, ReminderItem]] = {}
+        self._journal_len = 0
+        self._compacting = False
+        # 写入者与压缩线程轮流写库：写入者在等时压缩线程让路，避免在 SQLite 的忙等退避里被饿住
+        self._write_gate = threading.Lock()
+        self._writers_waiting = 0
+        self._conn = _connect()
+        # 仅对新建的库生效；旧库在第一次回收时 VACUUM 一次再切换
+        self._conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        self._conn.executescript(_SCHEMA)
+        _ensure_columns(self._conn)
+        _migrate_legacy_json(self._conn)
+        self._load()
+
+    # --- 启动：快照 + 日志重放 ---
+    def _load(self) -> None:
+        for row in self._conn.execute("SELECT * FROM reminders"):
+            self._put(_from_row(row))
+        for row in self._conn.execute("SELECT op, item_id, payload FROM reminder_journal ORDER BY seq"):
+            if row["op"] == "add":
+                self._put(_from_payload(row["payload"]))
+            else:
+                self._mark_disabled(row["item_id"])
+            self._journal_len += 1
+        # 重复规则只持久化锚点，启动时推进到下一次 (不写存储)
+        now = int(time.time())
+        for item in self._active.get(1, {}).values():
+            if getattr(item, "recurring", False) and item.trigger_ts <= now:
+                item.advance(now)
+        if self._journal_len:
+            self.compact()
+
+    # --- 内存状态变更 ---
+    def _put(self, item: ReminderItem) -> None:
+        old = self._items.get(item.id)
+        if old is not None:
+            self._active.get(old.reminder_type, {}).pop(old.id, None)
+            self._by_user.get(old.user_id, {}).pop(old.id, None)
+            self._by_guild.get(old.guild_id, {}).pop(old.id, None)
+        self._items[item.id] = item
+        self._by_user.setdefault(item.user_id, {})[item.id] = item
+        if item.enabled:
+            self._active.setdefault(item.reminder_type, {})[item.id] = item
+            if item.guild_id is not None:
+                self._by_guild.setdefault(item.guild_id, {})[item.id] = item
+
+    def _mark_disabled(self, item_id: str) -> Optional[ReminderItem]:
+        item = self._items.get(item_id)
+        if item is None or not item.enabled:
+            return None
+        item.enabled = False
+        self._active.get(item.reminder_type, {}).pop(item_id, None)
+        self._by_guild.get(item.guild_id, {}).pop(item_id, None)
+        return item
 
-def save_items(items: List[ReminderItem]) -> None:
-    # asdict 会自动把新字段 target_mission 等也序列化进 JSON
-    data = [asdict(x) for x in items]
-    DB_PATH.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+    # --- 日志 ---
+    def _append(self, records: List[tuple]) -> None:
+        now = int(time.time())
+        with self._lock:
+            self._writers_waiting += 1
+        try:
+            with self._write_gate:
+                _run_tx(self._conn, lambda c: c.executemany(_JOURNAL_SQL, [r + (now,) for r in records]))
+        finally:
+            with self._lock:
+                self._writers_waiting -= 1
 
-def add_item(item: ReminderItem) -> None:
-    items = load_items()
-    items.append(item)
-    save_items(items)
+    def _journal_grew(self, n: int) -> None:
+        """调用方持锁"""
+        self._journal_len += n
+        if self._journal_len >= COMPACT_EVERY and not self._compacting:
+            self._compacting = True
+            threading.Thread(target=self.compact, name="reminder-compact", daemon=True).start()
+
+    def compact(self) -> int:
+        """
+        把当前日志折叠进快照表，返回折叠的日志条数
+        每个事务最多折叠 COMPACT_CHUNK 条，写入者在等时先让它提交：批量导入后日志很长时，
+        写入者每次最多只等一小段，不会被一个几秒的大事务卡住 (到期提醒的领取也走写入者)
+        """
+        conn = _connect()
+        total = 0
+        try:
+            while True:
+                folded = 0
+                def tx(c):
+                    nonlocal folded
+                    rows = c.execute("SELECT seq, op, item_id, payload FROM reminder_journal ORDER BY seq LIMIT ?",
+                                     (COMPACT_CHUNK,)).fetchall()
+                    for r in rows:
+                        if r["op"] == "add":
+                            c.execute(_INSERT_SQL, _to_row(_from_payload(r["payload"])))
+                        else:
+                            c.execute("UPDATE reminders SET enabled = 0 WHERE id = ?", (r["item_id"],))
+                    if rows:
+                        c.execute("DELETE FROM reminder_journal WHERE seq <= ?", (rows[-1]["seq"],))
+                    folded = len(rows)
+                while self._writers_waiting:
+                    time.sleep(0.001)
+                with self._write_gate:
+                    _run_tx(conn, tx)
+                total += folded
+                with self._lock:
+                    self._journal_len = max(0, self._journal_len - folded)
+                if folded < COMPACT_CHUNK:
+                    return total
+        finally:
+            conn.close()
+            with self._lock:
+                self._compacting = False
+
+    # --- 写接口 ---
+    def apply(self, mutations: List[tuple]) -> list:
+        """
+        按顺序应用一批变更并作为一次提交持久化
+          ("add", ReminderItem)             -> True
+          ("disable" | "trigger", item_id)  -> 被禁用的条目；已失效则为 None
+        只由 ReminderStore 的提交线程调用 (唯一写入者)，所以判断与修改内存之间可以放开锁去落盘：
+        落盘期间 (包括等待回收任务的 VACUUM) 事件循环上的读操作不会被卡住
+        """
+        with self._lock:
+            records, results = [], []
+            added: Dict[str, ReminderItem] = {}
+            off = set()
+            for op, arg in mutations:
+                if op == "add":
+                    records.append(("add", arg.id, json.dumps(arg.to_dict(), ensure_ascii=False)))
+                    added[arg.id] = arg
+                    off.discard(arg.id)
+                    results.append(True)
+                    continue
+                item = added.get(arg) or self._items.get(arg)
+                live = item is not None and arg not in off and (arg in added or item.enabled)
+                if live:
+                    records.append((op, arg, None))
+                    off.add(arg)
+                results.append(item if live else None)
+
+        if records:
+            self._append(records)
+        with self._lock:
+            self._journal_grew(len(records))
+            for op, arg in mutations:
+                if op == "add": self._put(arg)
+                else: self._mark_disabled(arg)
+            return results
+
+    # --- 保留策略 ---
+    @staticmethod
+    def _db_bytes(c: sqlite3.Connection) -> int:
+        return c.execute("PRAGMA page_count").fetchone()[0] * c.execute("PRAGMA page_size").fetchone()[0]
+
+    def collect_garbage(self, ttl_seconds: int, now: Optional[int] = None) -> dict:
+        """
+        1. 把日志折叠进快照，再把快照里已禁用的条目整体移入归档表并移出内存
+        2. 删除归档时间早于 TTL 的条目
+        3. 归还空闲页，返回本次回收的字节数
+        SQLite 部分都在独立连接上、不持锁执行；只有把归档条目移出内存时短暂持锁
+        """
+        now = int(now or time.time())
+        self.compact()
+        conn = _connect()
+        try:
+            before = self._db_bytes(conn)
+            moved: List[str] = []
+
+            def tx(c):
+                rows = c.execute("SELECT id FROM reminders WHERE enabled = 0").fetchall()
+                moved.extend(r["id"] for r in rows)
+                c.execute(
+                    f"INSERT OR REPLACE INTO reminders_archive ({', '.join(_COLUMNS)}, archived_at) "
+                    f"SELECT {', '.join(_COLUMNS)}, ? FROM reminders WHERE enabled = 0",
+                    (now,)
+                )
+                c.execute("DELETE FROM reminders WHERE enabled = 0")
+            _run_tx(conn, tx)
+
+            with self._lock:
+                for item_id in moved:
+                    item = self._items.get(item_id)
+                    if item is not None and not item.enabled:
+                        del self._items[item_id]
+                        self._by_user.get(item.user_id, {}).pop(item_id, None)
+
+            purged = conn.execute(
+                "DELETE FROM reminders_archive WHERE archived_at < ?", (now - ttl_seconds,)
+            ).rowcount
+
+            if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+                conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+                conn.execute("VACUUM")
+            else:
+                # executescript 会把 pragma 执行到底；execute 每次只释放一页
+                conn.executescript("PRAGMA incremental_vacuum;")
+            reclaimed = max(0, before - self._db_bytes(conn))
+
+            total = int(_meta_get(conn, "gc_bytes_reclaimed") or 0) + reclaimed
+            _meta_set(conn, "gc_bytes_reclaimed", str(total))
+            _meta_set(conn, "gc_last_run", str(now))
+        finally:
+            conn.close()
+        return {"archived": len(moved), "purged": purged, "bytes_reclaimed": reclaimed}
+
+    def stats(self) -> dict:
+        with self._lock:
+            live = sum(len(x) for x in self._active.values())
+            total, journal = len(self._items), self._journal_len
+        conn = _connect()
+        try:
+            return {
+                "live": live,
+                "disabled_pending": total - live,
+                "archived": conn.execute("SELECT COUNT(*) FROM reminders_archive").fetchone()[0],
+                "journal": journal,
+                "db_bytes": self._db_bytes(conn),
+                "bytes_reclaimed_total": int(_meta_get(conn, "gc_bytes_reclaimed") or 0),
+                "last_gc": int(_meta_get(conn, "gc_last_run") or 0),
+            }
+        finally:
+            conn.close()
+
+    # --- 读接口 ---
+    def active(self, reminder_type: int) -> List[ReminderItem]:
+        with self._lock:
+            return list(self._active.get(reminder_type, {}).values())
+
+    def by_user(self, user_id: int) -> List[ReminderItem]:
+        with self._lock:
+            return list(self._by_user.get(user_id, {}).values())
+
+    def rearm(self, item_id: str, after_ts: int) -> Optional[ReminderItem]:
+        """重复提醒触发后在内存中推进到下一次；已取消或非重复提醒返回 None"""
+        with self._lock:
+            item = self._items.get(item_id)
+            if item is None or not item.enabled or not getattr(item, "recurring", False):
+                return None
+            item.advance(after_ts)
+            return item
+
+    def count_active(self, reminder_type: int, user_id: Optional[int] = None,
+                     guild_id: Optional[int] = None) -> int:
+        """按用户或服务器统计某类型的活跃提醒数，代价与该用户/服务器的提醒数成正比"""
+        with self._lock:
+            if user_id is not None:
+                pool = self._by_user.get(user_id, {}).values()
+            else:
+                pool = self._by_guild.get(guild_id, {}).values()
+            return sum(1 for x in pool if x.enabled and x.reminder_type == reminder_type)
+
+    def get(self, item_id: str) -> Optional[ReminderItem]:
+        return self._items.get(item_id)
+
+_repo: Optional[ReminderRepository] = None
+_repo_lock = threading.Lock()
+
+def get_repo() -> ReminderRepository:
+    global _repo
+    if _repo is None:
+        with _repo_lock:
+            if _repo is None:
+                _repo = ReminderRepository(DB_PATH)
+    return _repo
+
+# -------- 对外读接口 --------
+# 返回的 ReminderItem 是仓库中的同一对象，调用方只读；所有写入都走 reminder_store.store
 
 def list_items(user_id: int, only_enabled: bool = True) -> List[ReminderItem]:
-    items = load_items()
-    out = [x for x in items if x.user_id == user_id]
+    # 走用户索引，代价只与该用户的提醒数量有关
+    out = get_repo().by_user(user_id)
     if only_enabled: out = [x for x in out if x.enabled]
     out.sort(key=lambda r: (r.reminder_type, r.trigger_ts or 0))
     return out
 
-def get_item_by_index(user_id: int, idx_1based: int) -> Optional[ReminderItem]:
-    lst = list_items(user_id, only_enabled=True)
-    if 1 <= idx_1based <= len(lst): return lst[idx_1based - 1]
-    return None
-
-def disable_item(item_id: str) -> bool:
-    items = load_items()
-    changed = False
-    for it in items:
-        if it.id == item_id and it.enabled:
-            it.enabled = False
-            changed = True
-            break
-    if changed: save_items(items)
-    return changed
-
-def pop_due_items(now_ts: int) -> List[ReminderItem]:
-    items = load_items()
-    due, active, changed = [], [], False
-    for it in items:
-        if it.reminder_type == 1 and it.enabled and it.trigger_ts <= now_ts:
-            it.enabled = False
-            due.append(it)
-            changed = True
-        active.append(it)
-    if changed: save_items(active)
-    return due
\ No newline at end of file
+def list_active(reminder_type: int) -> List[ReminderItem]:
+    """某一类型的所有活跃提醒，供后台监控使用"""
+    return get_repo().active(reminder_type)
+
+def get_item(item_id: str) -> Optional[ReminderItem]:
+    return get_repo().get(item_id)
@@ -0,0 +1,93 @@
+import os
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from reminder.reminder_core import get_repo
+
+# -------- 配置 (可通过环境变量覆盖) --------
+# 每种提醒类型的活跃数量上限：reminder_type -> (每用户, 每服务器)
+QUOTA_CAPS = {
+    2: (int(os.getenv("QUOTA_MARKET_PER_USER", "30")), int(os.getenv("QUOTA_MARKET_PER_GUILD", "300"))),
+    3: (int(os.getenv("QUOTA_FISSURE_PER_USER", "10")), int(os.getenv("QUOTA_FISSURE_PER_GUILD", "200"))),
+}
+# 近一小时内后台监控替某个用户/服务器发出的上游请求预算
+USER_REQUEST_BUDGET = int(os.getenv("QUOTA_USER_REQUESTS_PER_HOUR", "1800"))
+GUILD_REQUEST_BUDGET = int(os.getenv("QUOTA_GUILD_REQUESTS_PER_HOUR", "12000"))
+
+WINDOW_SECONDS = 3600
+_BUCKET_SECONDS = 60
+
+TYPE_NAMES = {1: "平原", 2: "市场", 3: "裂缝"}
+
+class CostLedger:
+    """
+    按租户 (用户 / 服务器) 记录后台监控的开销：上游请求数与扫描耗时。
+    以分钟为桶滚动统计最近一小时，进程重启后清零。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (kind, tenant_id) -> {minute: [requests, seconds]}
+        self._buckets: Dict[Tuple[str, int], Dict[int, List[float]]] = defaultdict(dict)
+
+    def charge(self, user_id: int, guild_id: Optional[int], requests: float, seconds: float) -> None:
+        minute = int(time.time()) // _BUCKET_SECONDS
+        with self._lock:
+            for key in (("user", user_id), ("guild", guild_id)):
+                if key[1] is None: continue
+                b = self._buckets[key].setdefault(minute, [0.0, 0.0])
+                b[0] += requests
+                b[1] += seconds
+
+    def usage(self, kind: str, tenant_id: int) -> Tuple[float, float]:
+        """返回最近一小时的 (请求数, 耗时秒)"""
+        oldest = int(time.time()) // _BUCKET_SECONDS - WINDOW_SECONDS // _BUCKET_SECONDS
+        with self._lock:
+            buckets = self._buckets.get((kind, tenant_id))
+            if not buckets: return (0.0, 0.0)
+            for m in [m for m in buckets if m <= oldest]:
+                del buckets[m]
+            return (sum(b[0] for b in buckets.values()), sum(b[1] for b in buckets.values()))
+
+    def top(self, kind: str, n: int = 5) -> List[Tuple[int, float, float]]:
+        with self._lock:
+            tenants = [k[1] for k in self._buckets if k[0] == kind]
+        rows = [(t,) + self.usage(kind, t) for t in tenants]
+        rows.sort(key=lambda r: r[1], reverse=True)
+        return [r for r in rows[:n] if r[1] > 0]
+
+ledger = CostLedger()
+
+@dataclass
+class Admission:
+    ok: bool
+    reason: str = ""
+
+def check_admission(reminder_type: int, user_id: int, guild_id: Optional[int], count: int = 1) -> Admission:
+    """新建提醒前的准入检查：数量上限 + 近一小时的监控开销预算"""
+    repo = get_repo()
+    name = TYPE_NAMES.get(reminder_type, "")
+    user_cap, guild_cap = QUOTA_CAPS.get(reminder_type, (None, None))
+
+    if user_cap is not None:
+        have = repo.count_active(reminder_type, user_id=user_id)
+        if have + count > user_cap:
+            return Admission(False, f"你已有 **{have}** 个{name}提醒，每人上限 **{user_cap}** 个。请先用 `/提醒取消` 清理不需要的提醒。")
+
+    if guild_cap is not None and guild_id is not None:
+        have = repo.count_active(reminder_type, guild_id=guild_id)
+        if have + count > guild_cap:
+            return Admission(False, f"本服务器的{name}提醒已达 **{have}** 个，上限 **{guild_cap}** 个，请联系管理员清理。")
+
+    if reminder_type == 2:
+        used, _ = ledger.usage("user", user_id)
+        if used >= USER_REQUEST_BUDGET:
+            return Admission(False, f"你的提醒在近一小时内已消耗 **{used:.0f}** 次市场查询 (预算 {USER_REQUEST_BUDGET})，暂时无法新增，请稍后再试。")
+        if guild_id is not None:
+            used, _ = ledger.usage("guild", guild_id)
+            if used >= GUILD_REQUEST_BUDGET:
+                return Admission(False, f"本服务器近一小时的市场查询已达预算上限 ({GUILD_REQUEST_BUDGET})，暂时无法新增提醒。")
+
+    return Admission(True)
@@ -0,0 +1,377 @@
+from __future__ import annotations
+import sys
+import uuid
+from enum import IntEnum
+from typing import Any, Dict, Optional
+from timecheck.cycle_core import next_occurrence
+
+# -------- 整数编码的枚举 --------
+
+class TradeType(IntEnum):
+    SELL = 1    # 监控卖家 (买入提醒)
+    BUY = 2     # 监控买家 (卖出提醒)
+
+class Difficulty(IntEnum):
+    ALL = 0
+    NORMAL = 1
+    HARD = 2
+    STORM = 3
+
+_TRADE_KEYS = {TradeType.SELL: "sell", TradeType.BUY: "buy"}
+_TRADE_BY_KEY = {v: k for k, v in _TRADE_KEYS.items()}
+_DIFF_KEYS = {Difficulty.ALL: "all", Difficulty.NORMAL: "normal", Difficulty.HARD: "hard", Difficulty.STORM: "storm"}
+_DIFF_BY_KEY = {v: k for k, v in _DIFF_KEYS.items()}
+
+# 裂缝任务类型 (英文名与 warframestat 的 missionType 一致)，编码 = 下标 + 1，0 表示未知
+MISSIONS = (
+    "Survival", "Defense", "Extermination", "Capture", "Excavation", "Interception",
+    "Mobile Defense", "Spy", "Rescue", "Sabotage", "Disruption", "Skirmish", "Assault",
+    "Orphix", "Volatile", "Void Cascade", "Void Flood", "Mirror Defense", "Alchemy",
+)
+_MISSION_CODES = {m.lower(): i + 1 for i, m in enumerate(MISSIONS)}
+
+def mission_code(name: Optional[str]) -> int:
+    return _MISSION_CODES.get((name or "").lower(), 0)
+
+def mission_name(code: int) -> Optional[str]:
+    return MISSIONS[code - 1] if 0 < code <= len(MISSIONS) else None
+
+def new_id() -> str:
+    return uuid.uuid4().hex[:10]
+
+# 旧版 ReminderItem dataclass 的字段顺序 (SQLite 快照表的列)
+LEGACY_FIELDS = (
+    "user_id", "channel_id", "item_name", "reminder_type", "type", "trigger_ts",
+    "target_price", "rank", "trade_type", "slug", "target_mission", "target_is_storm",
+    "id", "meta", "enabled",
+)
+
+# 序列化格式版本：v1 = 旧版宽表 JSON (无 "v" 字段)，v2 = 下面的按类型紧凑格式
+RECORD_VERSION = 2
+
+# -------- 记录类型 --------
+
+class ReminderItem:
+    """
+    所有提醒的基类：只保存各类型共有的字段，使用 __slots__ 不带实例 __dict__。
+    extra 仅在旧数据里有无法映射的 meta 键时才创建。
+    """
+    __slots__ = ("id", "user_id", "channel_id", "guild_id", "item_name", "enabled", "extra")
+
+    reminder_type = 0
+    type = "custom"
+    trigger_ts = 0
+    target_price = 0
+    rank = None
+    slug = None
+    trade_type = None
+    target_mission = None
+    target_is_storm = False
+
+    def __init__(self, user_id: int, channel_id: int, item_name: str, id: str = "",
+                 enabled: bool = True, extra: Optional[dict] = None, guild_id: Optional[int] = None):
+        self.id = id or new_id()
+        self.user_id = user_id
+        self.channel_id = channel_id
+        self.guild_id = guild_id    # 私信中创建的提醒为 None
+        self.item_name = item_name
+        self.enabled = enabled
+        self.extra = extra or None
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} {self.id} {self.item_name!r} enabled={self.enabled}>"
+
+    # --- 兼容旧接口：meta 按需生成，不常驻内存 ---
+    @property
+    def meta(self) -> dict:
+        return dict(self.extra or {})
+
+    def _type_fields(self) -> Dict[str, Any]:
+        return {}
+
+    # --- v2 紧凑序列化 ---
+    def to_dict(self) -> dict:
+        d = {
+            "v": RECORD_VERSION, "t": self.reminder_type, "id": self.id,
+            "u": self.user_id, "c": self.channel_id, "n": self.item_name, "e": self.enabled,
+        }
+        d.update(self._type_fields())
+        if self.guild_id is not None: d["g"] = self.guild_id
+        if self.extra: d["x"] = self.extra
+        return d
+
+    # --- v1 宽表格式 (旧 reminders.json / SQLite 快照列) ---
+    def to_legacy(self) -> dict:
+        d = {
+            "user_id": self.user_id, "channel_id": self.channel_id, "item_name": self.item_name,
+            "reminder_type": self.reminder_type, "type": self.type, "trigger_ts": self.trigger_ts,
+            "target_price": self.target_price, "rank": self.rank, "trade_type": self.trade_type,
+            "slug": self.slug, "target_mission": self.target_mission,
+            "target_is_storm": self.target_is_storm, "id": self.id, "meta": self.meta,
+            "enabled": self.enabled,
+        }
+        # guild_id 是 v1 之后新增的字段，只在有值时输出，保证旧数据原样往返
+        if self.guild_id is not None: d["guild_id"] = self.guild_id
+        return d
+
+class CustomReminder(ReminderItem):
+    """未知类型的通用定时提醒，保留旧数据中的字段"""
+    __slots__ = ("trigger_ts", "kind", "code")
+
+    def __init__(self, user_id: int, channel_id: int, item_name: str, trigger_ts: int = 0,
+                 reminder_type: int = 0, kind: str = "custom", **kw):
+        super().__init__(user_id, channel_id, item_name, **kw)
+        self.trigger_ts = int(trigger_ts or 0)
+        self.code = reminder_type
+        self.kind = kind
+
+    @property
+    def reminder_type(self) -> int:
+        return self.code
+
+    @property
+    def type(self) -> str:
+        return self.kind
+
+    def _type_fields(self):
+        return {"ts": self.trigger_ts, "code": self.code, "k": self.kind}
+
+class CycleReminder(ReminderItem):
+    """Type 1：平原/开放世界定时提醒；cycle_len > 0 时为每个周期重复的规则"""
+    __slots__ = ("trigger_ts", "start_ts", "minutes_before", "area", "target_text", "cycle_len")
+    reminder_type = 1
+    type = "cycle"
+
+    def __init__(self, user_id: int, channel_id: int, item_name: str, trigger_ts: int,
+                 area: Optional[str] = None, target_text: Optional[str] = None,
+                 start_ts: int = 0, minutes_before: int = 0, cycle_len: int = 0, **kw):
+        super().__init__(user_id, channel_id, item_name, **kw)
+        self.trigger_ts = int(trigger_ts or 0)
+        self.start_ts = int(start_ts or 0)
+        self.minutes_before = int(minutes_before or 0)
+        self.cycle_len = int(cycle_len or 0)
+        # 区域/状态只有少数几种取值，intern 后所有条目共享同一个字符串对象
+        self.area = sys.intern(area) if area else None
+        self.target_text = sys.intern(target_text) if target_text else None
+
+    @property
+    def meta(self) -> dict:
+        d = dict(self.extra or {})
+        if self.area is not None: d["area"] = self.area
+        if self.target_text is not None: d["target_text"] = self.target_text
+        if self.start_ts: d["start_ts"] = self.start_ts
+        d["minutes_before"] = self.minutes_before
+        if self.cycle_len: d["cycle_len"] = self.cycle_len
+        return d
+
+    @property
+    def recurring(self) -> bool:
+        return self.cycle_len > 0
+
+    def advance(self, after_ts: int) -> None:
+        """重复规则：把下一次触发推进到 after_ts 之后 (只改内存，无需写存储)"""
+        if self.recurring:
+            self.start_ts, self.trigger_ts = next_occurrence(
+                self.start_ts, self.cycle_len, self.start_ts - self.trigger_ts, after_ts
+            )
+
+    def _type_fields(self):
+        d = {"ts": self.trigger_ts, "st": self.start_ts, "mb": self.minutes_before,
+             "a": self.area, "tt": self.target_text}
+        if self.cycle_len: d["cl"] = self.cycle_len
+        return d
+
+class MarketReminder(ReminderItem):
+    """Type 2：warframe.market 价格提醒；listing 为真时是“新挂单订阅”，每个新卖家通知一次且不会失效"""
+    __slots__ = ("slug", "rank", "trade", "target_price", "listing")
+    reminder_type = 2
+    type = "market"
+
+    def __init__(self, user_id: int, channel_id: int, item_name: str, slug: str,
+                 trade: TradeType, target_price: int, rank: Optional[int] = None, listing: bool = False, **kw):
+        super().__init__(user_id, channel_id, item_name, **kw)
+        self.slug = slug
+        self.trade = TradeType(trade)
+        self.target_price = int(target_price or 0)
+        self.rank = rank
+        self.listing = bool(listing)
+
+    @property
+    def trade_type(self) -> str:
+        return _TRADE_KEYS[self.trade]
+
+    @property
+    def meta(self) -> dict:
+        d = dict(self.extra or {})
+        d["item_full_name"] = self.item_name
+        d["rank"] = self.rank
+        if self.listing: d["listing"] = True
+        return d
+
+    def _type_fields(self):
+        d = {"s": self.slug, "r": self.rank, "tr": int(self.trade), "p": self.target_price}
+        if self.listing: d["ls"] = True
+        return d
+
+class FissureReminder(ReminderItem):
+    """Type 3：虚空裂缝提醒"""
+    __slots__ = ("mission", "difficulty", "storm_only")
+    reminder_type = 3
+
+    def __init__(self, user_id: int, channel_id: int, item_name: str, mission: int,
+                 difficulty: Difficulty = Difficulty.ALL, storm_only: bool = False, **kw):
+        super().__init__(user_id, channel_id, item_name, **kw)
+        self.mission = int(mission)
+        self.difficulty = Difficulty(difficulty)
+        self.storm_only = bool(storm_only)
+
+    @property
+    def type(self) -> str:
+        # 旧版本创建的裂缝提醒 type 为 "custom"，迁移后原样保留，v1 读者与导出看到的值不变
+        return (self.extra or {}).get("legacy_type") or "fissure"
+
+    @property
+    def target_mission(self) -> Optional[str]:
+        return mission_name(self.mission) or (self.extra or {}).get("target_mission")
+
+    @property
+    def target_is_storm(self) -> bool:
+        return self.storm_only
+
+    @property
+    def difficulty_key(self) -> str:
+        return _DIFF_KEYS[self.difficulty]
+
+    @property
+    def trade_type(self) -> str:
+        # 旧版本借用 trade_type 存储难度，保留只读兼容
+        return self.difficulty_key
+
+    @property
+    def meta(self) -> dict:
+        d = dict(self.extra or {})
+        d.pop("target_mission", None)
+        d.pop("legacy_type", None)
+        return d
+
+    def _type_fields(self):
+        return {"m": self.mission, "d": int(self.difficulty), "so": self.storm_only}
+
+# -------- 反序列化 --------
+
+def from_dict(d: dict) -> ReminderItem:
+    """读取任意版本的序列化数据 (v1 宽表 / v2 紧凑格式)"""
+    if d.get("v") is None:
+        return from_legacy(d)
+    if d["v"] != RECORD_VERSION:
+        raise ValueError(f"不支持的提醒记录版本: {d['v']}")
+
+    common = dict(user_id=d["u"], channel_id=d["c"], item_name=d["n"], id=d["id"],
+                  enabled=d.get("e", True), extra=d.get("x"), guild_id=d.get("g"))
+    t = d["t"]
+    if t == 1:
+        return CycleReminder(trigger_ts=d["ts"], start_ts=d.get("st", 0), minutes_before=d.get("mb", 0),
+                             area=d.get("a"), target_text=d.get("tt"), cycle_len=d.get("cl", 0), **common)
+    if t == 2:
+        return MarketReminder(slug=d["s"], rank=d.get("r"), trade=d["tr"], target_price=d["p"],
+                              listing=d.get("ls", False), **common)
+    if t == 3:
+        return FissureReminder(mission=d["m"], difficulty=d.get("d", 0), storm_only=d.get("so", False), **common)
+    return CustomReminder(trigger_ts=d.get("ts", 0), reminder_type=d.get("code", t), kind=d.get("k", "custom"), **common)
+
+def from_legacy(d: dict) -> ReminderItem:
+    """旧版宽表 ReminderItem (asdict 结果) -> 按类型的紧凑记录"""
+    meta = dict(d.get("meta") or {})
+    common = dict(user_id=d["user_id"], channel_id=d["channel_id"], item_name=d["item_name"],
+                  id=d.get("id") or "", enabled=bool(d.get("enabled", True)), guild_id=d.get("guild_id"))
+    t = int(d.get("reminder_type") or 0)
+
+    if t == 1:
+        return CycleReminder(
+            trigger_ts=d.get("trigger_ts") or 0,
+            area=meta.pop("area", None), target_text=meta.pop("target_text", None),
+            start_ts=meta.pop("start_ts", 0) or 0, minutes_before=meta.pop("minutes_before", 0) or 0,
+            cycle_len=meta.pop("cycle_len", 0) or 0, extra=meta, **common
+        )
+    if t == 2:
+        # item_full_name / rank 与主字段重复，不再单独保存
+        if meta.get("item_full_name") == d["item_name"]: meta.pop("item_full_name")
+        if meta.get("rank") == d.get("rank"): meta.pop("rank", None)
+        return MarketReminder(
+            slug=d.get("slug"), rank=d.get("rank"), trade=_TRADE_BY_KEY.get(d.get("trade_type"), TradeType.SELL),
+            target_price=d.get("target_price") or 0, listing=meta.pop("listing", False), extra=meta, **common
+        )
+    if t == 3:
+        code = mission_code(d.get("target_mission"))
+        if not code and d.get("target_mission"):
+            meta["target_mission"] = d["target_mission"]
+        if d.get("type") and d["type"] != "fissure":
+            meta["legacy_type"] = d["type"]
+        return FissureReminder(
+            mission=code, difficulty=_DIFF_BY_KEY.get(d.get("trade_type") or "all", Difficulty.ALL),
+            storm_only=bool(d.get("target_is_storm")), extra=meta, **common
+        )
+    return CustomReminder(trigger_ts=d.get("trigger_ts") or 0, reminder_type=t,
+                          kind=d.get("type") or "custom", extra=meta, **common)
+
+# -------- 内存占用对比 --------
+
+def benchmark_footprint(n: int = 20000) -> dict:
+    """
+    分别构造 n 条旧版 dataclass 与新版记录 (三种类型各占 1/3)，
+    用 tracemalloc 统计每条提醒的平均内存占用 (字节)
+    """
+    import tracemalloc
+    from dataclasses import dataclass, field
+
+    @dataclass
+    class _WideItem:
+        user_id: int
+        channel_id: int
+        item_name: str
+        reminder_type: int
+        type: str = "custom"
+        trigger_ts: Optional[int] = 0
+        target_price: Optional[int] = 0
+        rank: Optional[int] = None
+        trade_type: Optional[str] = None
+        slug: Optional[str] = None
+        target_mission: Optional[str] = None
+        target_is_storm: bool = False
+        id: str = ""
+        meta: dict = field(default_factory=dict)
+        enabled: bool = True
+
+    def legacy_rows():
+        for i in range(n):
+            k = i % 3
+            if k == 0:
+                yield dict(user_id=10**17 + i, channel_id=10**17, item_name="夜灵平原-夜晚 🌙", reminder_type=1,
+                           type="cycle", trigger_ts=1700000000 + i, id=new_id(),
+                           meta={"area": "夜灵平原", "target_text": "夜晚 🌙", "start_ts": 1700000300 + i, "minutes_before": 5})
+            elif k == 1:
+                yield dict(user_id=10**17 + i, channel_id=10**17, item_name="Ash Prime 套装", reminder_type=2,
+                           type="market", target_price=100 + i % 50, rank=None, trade_type="sell",
+                           slug="ash_prime_set", id=new_id(), meta={"item_full_name": "Ash Prime 套装", "rank": None})
+            else:
+                yield dict(user_id=10**17 + i, channel_id=10**17, item_name="裂缝提醒: 挖掘 (全部)", reminder_type=3,
+                           target_mission="Excavation", trade_type="all", id=new_id())
+
+    def measure(build):
+        rows = list(legacy_rows())
+        tracemalloc.start()
+        base = tracemalloc.take_snapshot()
+        objs = [build(dict(r, meta=dict(r.get("meta", {})))) for r in rows]
+        used = sum(s.size_diff for s in tracemalloc.take_snapshot().compare_to(base, "filename"))
+        tracemalloc.stop()
+        del objs
+        return used / n
+
+    before = measure(lambda r: _WideItem(**r))
+    after = measure(from_legacy)
+    return {"n": n, "before_bytes": round(before, 1), "after_bytes": round(after, 1),
+            "saving": f"{(1 - after / before) * 100:.0f}%"}
+
+if __name__ == "__main__":
+    # python -m reminder.reminder_records
+    print(benchmark_footprint())
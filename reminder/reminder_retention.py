@@ -0,0 +1,76 @@
+import asyncio
+import os
+import discord
+from discord import app_commands
+from discord.ext import tasks
+from reminder.reminder_core import get_repo, ts_full, ts_relative
+from reminder.reminder_quota import ledger
+
+# 已触发/已取消的提醒在归档表中保留的天数，可通过环境变量覆盖
+ARCHIVE_TTL_DAYS = int(os.getenv("REMINDER_ARCHIVE_TTL_DAYS", "30"))
+
+COLOR_OK = 0x2ECC71
+
+def fmt_bytes(n: int) -> str:
+    for unit in ("B", "KB", "MB"):
+        if n < 1024: return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} GB"
+
+class ReminderRetention:
+    """定期把已禁用的提醒移入归档、清理过期归档，让常驻数据只包含活跃提醒"""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.last_result = None
+        self.collect.start()
+
+    @tasks.loop(hours=1)
+    async def collect(self):
+        try:
+            # SQLite 操作放到线程里，避免阻塞事件循环
+            self.last_result = await asyncio.to_thread(
+                get_repo().collect_garbage, ARCHIVE_TTL_DAYS * 86400
+            )
+            if self.last_result["archived"] or self.last_result["purged"]:
+                print(f"🧹 提醒回收：{self.last_result}")
+        except Exception as e:
+            print(f"提醒回收失败: {e}")
+
+def setup_retention(bot):
+    return ReminderRetention(bot)
+
+def setup(tree: app_commands.CommandTree):
+    @tree.command(name="提醒统计", description="[管理员] 查看提醒存储的活跃/归档数量与回收情况")
+    @app_commands.default_permissions(administrator=True)
+    async def reminder_stats(interaction: discord.Interaction):
+        await interaction.response.defer(thinking=True, ephemeral=True)
+        s = await asyncio.to_thread(get_repo().stats)
+
+        embed = discord.Embed(title="🗄️ 提醒存储统计", color=COLOR_OK)
+        embed.add_field(name="活跃提醒", value=str(s["live"]), inline=True)
+        embed.add_field(name="待归档", value=str(s["disabled_pending"]), inline=True)
+        embed.add_field(name="归档中", value=f"{s['archived']} (保留 {ARCHIVE_TTL_DAYS} 天)", inline=True)
+        embed.add_field(name="数据库大小", value=fmt_bytes(s["db_bytes"]), inline=True)
+        embed.add_field(name="累计回收", value=fmt_bytes(s["bytes_reclaimed_total"]), inline=True)
+        embed.add_field(name="未压缩日志", value=str(s["journal"]), inline=True)
+        sched = getattr(interaction.client, "time_monitor", None)
+        if sched is not None:
+            cs = sched.stats()
+            embed.add_field(
+                name="定时提醒调度",
+                value=(f"待触发 {cs['pending']} 条，已触发 {cs['fired']} 次\n"
+                       f"调度延迟 (到期→派发)：P99 {cs['p99_ms']:.0f} ms / 最大 {cs['max_ms']:.0f} ms\n"
+                       f"消息发送耗时：P99 {cs['send_p99_ms']:.0f} ms / 最大 {cs['send_max_ms']:.0f} ms"),
+                inline=False
+            )
+        top = ledger.top("user", 5)
+        if top:
+            embed.add_field(
+                name="监控开销 Top 5 (近 1 小时)",
+                value="\n".join(f"<@{uid}>：{req:.0f} 次请求 / {sec:.1f} 秒" for uid, req, sec in top),
+                inline=False
+            )
+        if s["last_gc"]:
+            embed.add_field(name="上次回收", value=f"{ts_full(s['last_gc'])} ({ts_relative(s['last_gc'])})", inline=False)
+        await interaction.followup.send(embed=embed, ephemeral=True)
@@ -20,7 +20,7 @@ def setup(tree: app_commands.CommandTree):
 
         embed = discord.Embed(
             title="🔔 我的提醒清单",
-            description="你可以通过编号来取消不需要的提醒。",
+            description="可在 /提醒取消 的下拉列表中选择，或输入方括号中的 ID。",
             color=COLOR_MARKET_GREEN
         )
 
@@ -33,21 +33,22 @@ def setup(tree: app_commands.CommandTree):
         for i, item in enumerate(active_reminders, 1):
             if item.reminder_type == 1:
                 # Type 1：时间戳提醒
-                type1_text += f"{i}. **{item.item_name}**\n预计：{core.ts_full(item.trigger_ts)}\n"
+                repeat_tag = " 🔁" if getattr(item, "recurring", False) else ""
+                type1_text += f"{i}. **{item.item_name}**{repeat_tag} `[{item.id}]`\n预计：{core.ts_full(item.trigger_ts)}\n"
             
             elif item.reminder_type == 2:
                 # Type 2：市场价格提醒
                 rank_str = f" (Rank {item.rank})" if item.rank is not None else ""
-                trade_str = "买入" if item.trade_type == "sell" else "卖出"
-                type2_text += f"{i}. **{item.item_name}**{rank_str}\n类型：{trade_str} | 目标：{item.target_price} Pt\n"
+                trade_str = "新挂单" if getattr(item, "listing", False) else ("买入" if item.trade_type == "sell" else "卖出")
+                type2_text += f"{i}. **{item.item_name}**{rank_str} `[{item.id}]`\n类型：{trade_str} | 目标：{item.target_price} Pt\n"
             
             elif item.reminder_type == 3:
                 # --- 修改部分：Type 3 裂缝提醒解析 ---
                 storm_tag = " (仅限九重天)" if getattr(item, 'target_is_storm', False) else ""
-                type3_text += f"{i}. **{item.item_name}**{storm_tag}\n监控中：出现即艾特提醒\n"
+                type3_text += f"{i}. **{item.item_name}**{storm_tag} `[{item.id}]`\n监控中：出现即艾特提醒\n"
                 
             else:
-                other_text += f"{i}. **{item.item_name}** (未知类型)\n"
+                other_text += f"{i}. **{item.item_name}** `[{item.id}]` (未知类型)\n"
 
         # 按照分类添加到 Embed 字段
         if type1_text:
@@ -63,5 +64,5 @@ def setup(tree: app_commands.CommandTree):
         if other_text:
             embed.add_field(name="❓ 其他提醒", value=other_text, inline=False)
 
-        embed.set_footer(text="使用 /取消提醒 [编号] 可以移除对应条目")
+        embed.set_footer(text="使用 /提醒取消 [ID] 可以移除对应条目")
         await interaction.followup.send(embed=embed)
\ No newline at end of file
@@ -0,0 +1,80 @@
+import asyncio
+import time
+from typing import Iterable, List, Optional
+from reminder.reminder_core import get_repo
+from reminder.reminder_records import ReminderItem
+
+class ReminderStore:
+    """
+    提醒存储的唯一写入者 (asyncio actor)
+
+    所有命令与监控都通过队列提交变更；store 任务每一轮把队列里积压的变更一次取空，
+    合并成一次提交 (一个事务 + 一次落盘)。提交在线程里执行，期间新到的变更自动
+    攒到下一轮，负载越高合并越多。读操作直接走内存中的 ReminderRepository。
+    """
+
+    # 单轮最多合并的变更数，防止一次提交过大
+    MAX_BATCH = 1000
+
+    def __init__(self):
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self.commits = 0
+        self.mutations = 0
+        self.last_commit_ms = 0.0
+
+    def _ensure_started(self) -> asyncio.Queue:
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+        return self._queue
+
+    async def _submit(self, mutations: List[tuple]) -> list:
+        if not mutations: return []
+        fut = asyncio.get_running_loop().create_future()
+        self._ensure_started().put_nowait((mutations, fut))
+        return await fut
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.MAX_BATCH and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            flat = [m for muts, _ in batch for m in muts]
+            t0 = time.perf_counter()
+            try:
+                results = await asyncio.to_thread(get_repo().apply, flat)
+            except Exception as e:
+                print(f"提醒存储提交失败: {e}")
+                for _, fut in batch:
+                    if not fut.done(): fut.set_exception(e)
+                continue
+            self.last_commit_ms = (time.perf_counter() - t0) * 1000
+            self.commits += 1
+            self.mutations += len(flat)
+
+            pos = 0
+            for muts, fut in batch:
+                if not fut.done():
+                    fut.set_result(results[pos:pos + len(muts)])
+                pos += len(muts)
+
+    # --- 对外写接口 ---
+    async def add(self, item: ReminderItem) -> None:
+        await self._submit([("add", item)])
+
+    async def add_many(self, items: Iterable[ReminderItem]) -> None:
+        await self._submit([("add", x) for x in items])
+
+    async def disable(self, item_id: str) -> bool:
+        """用户取消：返回是否真的禁用了一条仍在生效的提醒"""
+        res = await self._submit([("disable", item_id)])
+        return res[0] is not None
+
+    async def trigger(self, item_ids: Iterable[str]) -> List[ReminderItem]:
+        """监控触发：领取并禁用仍在生效的提醒，已被取消/触发的 id 自动忽略"""
+        res = await self._submit([("trigger", i) for i in dict.fromkeys(item_ids)])
+        return [x for x in res if x is not None]
+
+store = ReminderStore()
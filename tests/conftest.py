@@ -0,0 +1,20 @@
+import os
+import sys
+import pytest
+
+# 测试从仓库根目录导入各模块 (与 bot.py 的运行方式一致)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from reminder import reminder_core
+from reminder.reminder_store import store
+
+@pytest.fixture
+def reminder_db(tmp_path, monkeypatch):
+    """每个测试一个独立的提醒数据库 (reminders.db 写在临时目录)，写入者任务随新事件循环重建"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(reminder_core, "_repo", None)
+    monkeypatch.setattr(store, "_task", None)
+    monkeypatch.setattr(store, "_queue", None)
+    yield tmp_path
+    if reminder_core._repo is not None:
+        reminder_core._repo._conn.close()
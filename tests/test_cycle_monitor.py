@@ -0,0 +1,63 @@
+import asyncio
+import time
+from reminder.cycle_monitor import LATENESS_WARN_MS, CycleScheduler
+from reminder.reminder_records import CycleReminder
+from reminder.reminder_store import store
+
+PENDING = 100_000
+DUE_PER_SECOND = 500
+SEND_DELAY = 0.05   # 模拟 Discord 接口耗时，不应计入调度延迟
+
+class Channel:
+    def __init__(self):
+        self.sent = 0
+
+    async def send(self, **kw):
+        await asyncio.sleep(SEND_DELAY)
+        self.sent += 1
+
+class Client:
+    def __init__(self):
+        self.channel = Channel()
+
+    async def wait_until_ready(self):
+        pass
+
+    def get_channel(self, channel_id):
+        return self.channel
+
+def test_lateness_with_100k_pending_timers(reminder_db):
+    """
+    基准：10 万条待触发的平原提醒，其中接下来两秒各有 500 条到期；
+    到期 -> 派发的 P99 调度延迟必须低于 LATENESS_WARN_MS (100 ms)，发送耗时单独统计
+    """
+    async def run():
+        # 先写入远期的大批提醒 (耗时几秒)，再登记马上到期的，保证基准开始时它们都还没到期
+        due = 2 * DUE_PER_SECOND
+        far = int(time.time()) + 86400
+        await store.add_many(CycleReminder(user_id=i % 997, channel_id=1, item_name=f"t{i}", trigger_ts=far + i)
+                             for i in range(PENDING - due))
+        base = int(time.time()) + 2
+        await store.add_many(CycleReminder(user_id=i % 997, channel_id=1, item_name=f"d{i}", trigger_ts=base + i // DUE_PER_SECOND)
+                             for i in range(due))
+
+        client = Client()
+        scheduler = CycleScheduler(client)
+        scheduler.start()
+        try:
+            assert scheduler.pending == PENDING
+            deadline = time.time() + 10
+            while client.channel.sent < due and time.time() < deadline:
+                await asyncio.sleep(0.05)
+        finally:
+            scheduler.stop()
+
+        s = scheduler.stats()
+        print(f"\n10 万定时器：{s}")
+        assert s["fired"] == due
+        assert client.channel.sent == due
+        assert s["pending"] == PENDING - due
+        assert s["p99_ms"] < LATENESS_WARN_MS
+        assert s["send_p99_ms"] >= SEND_DELAY * 1000
+
+    asyncio.run(run())
@@ -0,0 +1,132 @@
+import asyncio
+import json
+from aiohttp import web
+from reminder.reminder_core import list_active
+from reminder.reminder_records import MarketReminder, TradeType
+from reminder.reminder_store import store
+from wf_market import market_stream
+from wf_market.market_api import client_v2
+from wf_market.market_monitor import MarketMonitor
+from wf_market.market_stream import MSG_NEW_ORDER, MSG_SUBSCRIBE, MarketStream
+from wf_market.order_diff import OrderSnapshots
+
+SLUG = "ash_prime_set"
+
+def top(sell_price, player="Seller"):
+    """REST /top 形式的快照：一张卖单"""
+    return {"sell": [{"id": f"rest-{sell_price}", "platinum": sell_price, "user": {"ingameName": player, "status": "ingame"}}],
+            "buy": []}
+
+def new_order(order_id, price, player="Pusher"):
+    return {"type": MSG_NEW_ORDER, "payload": {"order": {
+        "id": order_id, "platinum": price, "order_type": "sell", "mod_rank": None,
+        "item": {"url_name": SLUG}, "user": {"ingame_name": player, "status": "ingame"},
+    }}}
+
+class StandIn:
+    """本地 websocket 替身：记录订阅消息，把每条连接交给测试去推送/断开"""
+
+    def __init__(self):
+        self.subscribes = 0
+        self.connections = asyncio.Queue()
+
+    async def handler(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        msg = await ws.receive_json()
+        if msg.get("type") == MSG_SUBSCRIBE:
+            self.subscribes += 1
+        await self.connections.put(ws)
+        async for _ in ws:
+            pass
+        return ws
+
+    async def start(self) -> str:
+        app = web.Application()
+        app.router.add_get("/socket", self.handler)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        host, port = self.runner.addresses[0][:2]
+        return f"ws://{host}:{port}/socket"
+
+class Monitor(MarketMonitor):
+    """只保留推送需要的部分：新挂单快照与通知 (记录下来而不是发 Discord 消息)"""
+
+    def __init__(self):
+        self.snapshots = OrderSnapshots()
+        self.alerts = []
+
+    async def _notify(self, item, order_data):
+        self.alerts.append((item.id, order_data["price"], order_data["ingame_name"]))
+
+    async def _notify_listings(self, item, events, offline):
+        pass
+
+async def until(cond, timeout=5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not cond():
+        assert asyncio.get_running_loop().time() < deadline, "等待超时"
+        await asyncio.sleep(0.01)
+
+def reminder(price):
+    return MarketReminder(user_id=1, channel_id=2, item_name="Ash Prime 套装", slug=SLUG,
+                          trade=TradeType.SELL, target_price=price)
+
+def test_subscribe_push_alert_drop_reconnect(reminder_db, monkeypatch):
+    snapshots = {"data": top(150)}
+    monkeypatch.setattr(client_v2, "get_top_orders", lambda slug, rank=None, priority=0, allow_stale=None: snapshots["data"])
+    monkeypatch.setattr(market_stream, "WATCH_REFRESH_SECONDS", 0.05)
+
+    async def run():
+        server = StandIn()
+        url = await server.start()
+        first = reminder(100)
+        await store.add(first)
+
+        monitor = Monitor()
+        stream = MarketStream(monitor, url)
+        stream.start()
+        try:
+            # 订阅 -> 用 REST 快照初始化订单簿 (150 > 100，不触发)
+            ws = await asyncio.wait_for(server.connections.get(), 5)
+            assert server.subscribes == 1
+            key = (SLUG, None)
+            await until(lambda: stream.books.get(key) and stream.books[key].best("sell"))
+            assert stream.books[key].best("sell") == (150, "Seller")
+            assert monitor.alerts == []
+
+            # 推送一张 90 的新卖单 -> 领取并通知
+            await ws.send_json(new_order("o-1", 90))
+            await until(lambda: monitor.alerts)
+            assert monitor.alerts == [(first.id, 90, "Pusher")]
+            assert stream.fired == 1 and stream.matched == 1
+            assert list_active(2) == []
+
+            # 断线 -> 退避后重连并重新订阅
+            await ws.close()
+            await until(lambda: stream.reconnects == 1)
+            ws = await asyncio.wait_for(server.connections.get(), 5)
+            assert server.subscribes == 2
+            await until(lambda: stream.connected)
+
+            # 推送静默时新加的提醒也会被定时关注、初始化；快照已低于目标价，初始化即触发
+            snapshots["data"] = top(70, "Cheap")
+            second = reminder(80)
+            await store.add(second)
+            await until(lambda: len(monitor.alerts) == 2)
+            assert monitor.alerts[1] == (second.id, 70, "Cheap")
+
+            # REST 轮询的结果经 reseed 替换订单簿 (推送看不到的撤单也随之清掉)
+            third = reminder(10)
+            await store.add(third)
+            await until(lambda: stream._ladders.get(key) and stream.books.get(key) and stream.books[key].best("sell"))
+            stream.reseed(key, top(60, "Rest"))
+            assert stream.books[key].sell == {"rest-60": (60, "Rest")}
+        finally:
+            stream._task.cancel()
+            await asyncio.gather(stream._task, return_exceptions=True)
+            await server.runner.cleanup()
+
+    asyncio.run(run())
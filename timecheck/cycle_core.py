@@ -86,6 +86,18 @@ def next_state_start_ts(now_key: str, now_change_ts: int, target_key: str, patte
         t += dur
     return 0
 
+def next_occurrence(start_ts: int, cycle_len: int, lead_seconds: int, after_ts: int) -> Tuple[int, int]:
+    """
+    周期性事件的下一次发生：返回提醒时间晚于 after_ts 的 (start_ts, trigger_ts)
+    直接按周期长度取整跳转，O(1)，不需要重新请求 worldstate
+    """
+    trigger_ts = start_ts - lead_seconds
+    if cycle_len > 0 and trigger_ts <= after_ts:
+        k = (after_ts - trigger_ts) // cycle_len + 1
+        start_ts += k * cycle_len
+        trigger_ts += k * cycle_len
+    return start_ts, trigger_ts
+
 # --- 官方解析逻辑 ---
 
 def parse_official_cetus(data: dict) -> Optional[dict]:
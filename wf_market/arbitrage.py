@@ -0,0 +1,126 @@
+import asyncio
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+import numpy as np
+from discord.ext import tasks
+from wf_market.market_api import BULK, client_v2
+
+# 后台全量扫描的间隔与并发 (速率由全局令牌桶控制)
+SCAN_MINUTES = int(os.getenv("ARBITRAGE_SCAN_MINUTES", "30"))
+SCAN_WORKERS = int(os.getenv("ARBITRAGE_WORKERS", "3"))
+
+@dataclass(frozen=True)
+class Opportunity:
+    set_slug: str
+    name: str
+    set_price: float
+    parts_price: float
+    spread: float          # 套装价 - 部件总价：>0 买部件合成卖套装更赚，<0 买套装拆散卖更赚
+    ratio: float           # spread / 较便宜的一边
+    parts: Tuple[Tuple[str, int, float], ...]   # (部件 slug, 数量, 单价)
+
+@dataclass(frozen=True)
+class ScanResult:
+    opportunities: List[Opportunity]
+    sets: int
+    requests: int
+    finished_at: float
+    seconds: float
+
+def prime_sets(index) -> List[tuple]:
+    """目录中所有有部件组成的 Prime 套装行"""
+    return [r for r in index.rows if r[5] and "prime" in r[0]]
+
+def compute_spreads(sets: List[tuple], quotes: dict) -> List[Opportunity]:
+    """
+    一次矩阵运算算出所有套装的差价：
+    Q (套装 × 部件) 为数量矩阵，部件总价 = Q @ 部件价；任一部件无价的套装剔除
+    """
+    part_slugs = list(dict.fromkeys(p for r in sets for p, _ in r[5]))
+    col = {s: j for j, s in enumerate(part_slugs)}
+    q = np.zeros((len(sets), len(part_slugs)))
+    for i, r in enumerate(sets):
+        for p, n in r[5]:
+            q[i, col[p]] += n
+
+    part_price = np.array([quotes.get(s) or np.nan for s in part_slugs], dtype=np.float64)
+    set_price = np.array([quotes.get(r[0]) or np.nan for r in sets], dtype=np.float64)
+    missing = ((q > 0) & np.isnan(part_price)).any(axis=1) | np.isnan(set_price)
+
+    parts_total = q @ np.nan_to_num(part_price)
+    spread = set_price - parts_total
+    ratio = spread / np.minimum(set_price, parts_total).clip(min=1)
+
+    out = []
+    for i in np.flatnonzero(~missing):
+        r = sets[i]
+        out.append(Opportunity(
+            set_slug=r[0], name=r[1] or r[2], set_price=float(set_price[i]), parts_price=float(parts_total[i]),
+            spread=float(spread[i]), ratio=float(ratio[i]),
+            parts=tuple((p, n, float(part_price[col[p]])) for p, n in r[5]),
+        ))
+    return out
+
+class ArbitrageScanner:
+    """
+    Prime 套装 vs 部件 差价扫描
+    - 套装组成来自物品目录 (setParts)
+    - 所有套装与部件去重后批量拉取，走订单缓存 + 全局限速器
+    - 结果缓存到下一次扫描；同一时间只跑一次扫描，指令调用方共享结果
+    """
+
+    def __init__(self):
+        self.result: Optional[ScanResult] = None
+        self._lock = threading.Lock()
+
+    def scan(self) -> Optional[ScanResult]:
+        if not self._lock.acquire(blocking=False):
+            # 已有扫描在跑：等它结束后直接用它的结果
+            with self._lock:
+                return self.result
+        try:
+            t0 = time.perf_counter()
+            index = client_v2.ensure_catalog()
+            if index is None:
+                return self.result
+            sets = prime_sets(index)
+            slugs = list(dict.fromkeys([r[0] for r in sets] + [p for r in sets for p, _ in r[5]]))
+            quotes = client_v2.get_sell_prices(slugs, BULK, workers=SCAN_WORKERS)
+            self.result = ScanResult(
+                opportunities=compute_spreads(sets, quotes),
+                sets=len(sets), requests=len(slugs),
+                finished_at=time.time(), seconds=time.perf_counter() - t0,
+            )
+            return self.result
+        finally:
+            self._lock.release()
+
+    def top(self, assemble: bool, n: int = 10, min_spread: float = 0) -> List[Opportunity]:
+        """assemble=True：买部件卖套装；False：买套装拆散卖部件"""
+        if self.result is None: return []
+        sign = 1 if assemble else -1
+        hits = [o for o in self.result.opportunities if o.spread * sign > max(min_spread, 0)]
+        hits.sort(key=lambda o: o.spread * sign, reverse=True)
+        return hits[:n]
+
+scanner = ArbitrageScanner()
+
+class ArbitrageRefresher:
+    def __init__(self, bot):
+        self.bot = bot
+        self.refresh.start()
+
+    @tasks.loop(minutes=SCAN_MINUTES)
+    async def refresh(self):
+        try:
+            res = await asyncio.to_thread(scanner.scan)
+            if res:
+                print(f"🔁 套利扫描完成：{res.sets} 个套装 / {res.requests} 个物品，耗时 {res.seconds:.0f}s")
+        except Exception as e:
+            print(f"套利扫描失败: {e}")
+
+def setup_arbitrage(bot):
+    return ArbitrageRefresher(bot)
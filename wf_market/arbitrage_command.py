@@ -0,0 +1,44 @@
+import asyncio
+import discord
+from discord import app_commands
+from reminder.reminder_core import ts_relative
+from wf_market.arbitrage import scanner
+
+COLOR_MARKET_GREEN = 0x2ECC71
+
+def setup(tree: app_commands.CommandTree):
+    @tree.command(name="套利", description="扫描 Prime 套装与部件之间的差价")
+    @app_commands.describe(方向="买部件合成卖套装，还是买套装拆散卖部件", 数量="显示前几个机会 (1-15)", 最低差价="只看差价不低于这个值的 (Pt)")
+    @app_commands.choices(方向=[
+        app_commands.Choice(name="买部件 → 卖套装", value="assemble"),
+        app_commands.Choice(name="买套装 → 拆散卖", value="split"),
+    ])
+    async def arbitrage(interaction: discord.Interaction, 方向: str = "assemble", 数量: int = 10, 最低差价: int = 5):
+        await interaction.response.defer(thinking=True)
+
+        # 有缓存直接用；第一次扫描 (或上次失败) 时在线程里跑一次全量扫描，期间并发的调用共享结果
+        if scanner.result is None:
+            await interaction.followup.send("⏳ 首次扫描所有 Prime 套装中，通常需要几分钟，完成后会在这里回复……")
+            await asyncio.to_thread(scanner.scan)
+        res = scanner.result
+        if res is None:
+            await interaction.followup.send("⚠️ 物品目录或价格数据暂不可用，请稍后再试。")
+            return
+
+        assemble = 方向 == "assemble"
+        hits = scanner.top(assemble, max(1, min(数量, 15)), 最低差价)
+        title = "🧩 买部件 → 卖套装" if assemble else "🔨 买套装 → 拆散卖"
+        embed = discord.Embed(title=f"{title} 套利机会", color=COLOR_MARKET_GREEN)
+        if not hits:
+            embed.description = f"当前没有差价 ≥ {最低差价} Pt 的机会。"
+        for o in hits:
+            gain = abs(o.spread)
+            parts = "、".join(f"{p.replace('_', ' ').title()}{f' ×{n}' if n > 1 else ''} {price:g}" for p, n, price in o.parts)
+            embed.add_field(
+                name=f"{o.name}：+{gain:g} Pt ({abs(o.ratio):.0%})",
+                value=f"套装 {o.set_price:g} Pt / 部件合计 {o.parts_price:g} Pt\n{parts}"[:1024],
+                inline=False
+            )
+        embed.set_footer(text=f"价格为卖单前 5 中位价 · {res.sets} 个套装 · 扫描于 {int(res.seconds)}s 内完成")
+        embed.description = (embed.description or "") + f"\n数据更新：{ts_relative(res.finished_at)}"
+        await interaction.followup.send(embed=embed)
@@ -0,0 +1,31 @@
+import discord
+from discord import app_commands
+from reminder.reminder_core import ts_relative
+from wf_market.ducat_table import table
+
+COLOR_DUCAT = 0xF1C40F
+
+def setup(tree: app_commands.CommandTree):
+    @tree.command(name="杜卡特", description="Prime 部件 杜卡特/白金 性价比排行 (给奸商换杜卡特用)")
+    @app_commands.describe(最低杜卡特="只看杜卡特不低于这个值的部件", 最高价格="只看卖价不超过这个值的部件 (Pt，0 为不限)", 数量="显示前几个 (1-25)")
+    @app_commands.choices(最低杜卡特=[
+        app_commands.Choice(name=str(d), value=d) for d in (15, 25, 45, 65, 100)
+    ])
+    async def ducats(interaction: discord.Interaction, 最低杜卡特: int = 45, 最高价格: int = 0, 数量: int = 15):
+        # 只读内存里的预计算表，不发任何上游请求
+        s = table.stats()
+        if not s["priced"]:
+            await interaction.response.send_message("⏳ 杜卡特表正在后台拉取价格，请几分钟后再试。", ephemeral=True)
+            return
+
+        rows = table.query(最低杜卡特, 最高价格, max(1, min(数量, 25)))
+        limit = f"≥ {最低杜卡特} 杜卡特" + (f"，≤ {最高价格} Pt" if 最高价格 > 0 else "")
+        embed = discord.Embed(title=f"🪙 杜卡特性价比排行 ({limit})", color=COLOR_DUCAT)
+        embed.description = "\n".join(
+            f"`{n:>2}.` **{name}**：{duc} 杜卡特 / {price:g} Pt = **{ratio:.1f}** 杜卡特/Pt"
+            for n, (name, _, duc, price, ratio) in enumerate(rows, 1)
+        ) or "没有符合条件的部件。"
+        if s["updated_at"]:
+            embed.description += f"\n\n价格更新：{ts_relative(s['updated_at'])}"
+        embed.set_footer(text=f"价格为卖单前 5 中位价 · 已有价格 {s['priced']}/{s['parts']} 件部件，后台持续补全")
+        await interaction.response.send_message(embed=embed)
@@ -0,0 +1,121 @@
+import asyncio
+import os
+import threading
+import time
+from typing import List, Tuple
+import numpy as np
+from discord.ext import tasks
+from wf_market.market_api import BULK, client_v2
+
+# 后台每轮只补价最久没更新的一小批，其余靠其他功能拉订单时顺带更新
+REFRESH_MINUTES = int(os.getenv("DUCAT_REFRESH_MINUTES", "5"))
+REFRESH_BATCH = int(os.getenv("DUCAT_REFRESH_BATCH", "40"))
+
+class DucatTable:
+    """
+    所有 Prime 部件的 杜卡特/白金 预计算表
+    - 行来自物品目录 (ducats > 0 且不是套装)，目录版本变化时重建，已有价格保留
+    - 价格两条来源：任何一次真实拉取订单 (监控、/市场、套利、核桃估价) 经 observe 顺带更新；
+      后台每轮再给最久没更新的 REFRESH_BATCH 个部件补价
+    - 只有价格变了的行才重算比值；查询只在内存数组上做筛选排序，不发请求
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self.slugs: List[str] = []
+        self.names: List[str] = []
+        self._pos = {}
+        self.ducats = np.zeros(0)
+        self.prices = np.zeros(0)      # 无价为 nan
+        self.ratio = np.zeros(0)       # 杜卡特 / 白金，无价为 nan
+        self.priced_at = np.zeros(0)   # 上次拿到价格的时间，0 表示从未
+        self.updated_at = 0.0
+        self.changes = 0
+
+    def _sync_rows(self):
+        index = client_v2.ensure_catalog()
+        if index is None or (self._version == client_v2.catalog_version and self.slugs):
+            return
+        rows = [r for r in index.rows if r[4] > 0 and not r[5] and not r[0].endswith('_set')]
+        with self._lock:
+            old = {s: (self.prices[i], self.priced_at[i]) for s, i in self._pos.items()}
+            self.slugs = [r[0] for r in rows]
+            self.names = [r[1] or r[2] for r in rows]
+            self._pos = {s: i for i, s in enumerate(self.slugs)}
+            self.ducats = np.array([r[4] for r in rows], dtype=np.float64)
+            self.prices = np.array([old.get(s, (np.nan,))[0] for s in self.slugs], dtype=np.float64)
+            self.priced_at = np.array([old.get(s, (0, 0.0))[1] for s in self.slugs], dtype=np.float64)
+            self.ratio = self.ducats / np.maximum(self.prices, 1.0)
+            self._version = client_v2.catalog_version
+
+    def _apply(self, slug, price, now) -> bool:
+        """写入一个价格；返回该行是否真的变化 (调用方持锁)"""
+        i = self._pos.get(slug)
+        if i is None: return False
+        self.priced_at[i] = now
+        new = np.nan if price is None else float(price)
+        old = self.prices[i]
+        if old == new or (np.isnan(old) and np.isnan(new)):
+            return False
+        self.prices[i] = new
+        self.ratio[i] = self.ducats[i] / max(new, 1.0) if not np.isnan(new) else np.nan
+        self.changes += 1
+        self.updated_at = now
+        return True
+
+    def observe(self, slug, rank, data):
+        """订单回调：Prime 部件没有等级，只收 rank=None 的结果"""
+        if rank is not None or slug not in self._pos: return
+        price = client_v2.sell_price(data)
+        with self._lock:
+            self._apply(slug, price, time.time())
+
+    def refresh(self, batch: int = REFRESH_BATCH) -> int:
+        """给最久没更新的 batch 个部件补价，返回价格变化的行数"""
+        self._sync_rows()
+        with self._lock:
+            if not self.slugs: return 0
+            stale = [self.slugs[i] for i in np.argsort(self.priced_at, kind="stable")[:batch]]
+        quotes = client_v2.get_sell_prices(stale, BULK)
+        now = time.time()
+        with self._lock:
+            # 请求被限速器放弃时 get_sell_prices 给 None，不当作下架处理
+            return sum(self._apply(s, p, now) for s, p in quotes.items() if p is not None)
+
+    def query(self, min_ducats: int = 0, max_price: float = 0, n: int = 15) -> List[Tuple[str, str, int, float, float]]:
+        """按 杜卡特/白金 降序 (同比值时杜卡特高的在前)：(名字, slug, 杜卡特, 白金, 比值)"""
+        with self._lock:
+            mask = ~np.isnan(self.prices) & (self.ducats >= min_ducats)
+            if max_price > 0:
+                mask &= self.prices <= max_price
+            idx = np.flatnonzero(mask)
+            idx = idx[np.lexsort((-self.ducats[idx], -self.ratio[idx]))][:n]
+            return [(self.names[i], self.slugs[i], int(self.ducats[i]), float(self.prices[i]), float(self.ratio[i]))
+                    for i in idx]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"parts": len(self.slugs), "priced": int(np.count_nonzero(~np.isnan(self.prices))),
+                    "changes": self.changes, "updated_at": self.updated_at}
+
+table = DucatTable()
+
+class DucatRefresher:
+    def __init__(self, bot):
+        self.bot = bot
+        client_v2.order_listeners.append(table.observe)
+        self.refresh.start()
+
+    @tasks.loop(minutes=REFRESH_MINUTES)
+    async def refresh(self):
+        try:
+            changed = await asyncio.to_thread(table.refresh)
+            if changed:
+                s = table.stats()
+                print(f"🪙 杜卡特表更新 {changed} 行 ({s['priced']}/{s['parts']} 件有价)")
+        except Exception as e:
+            print(f"杜卡特表刷新失败: {e}")
+
+def setup_ducat_table(bot):
+    return DucatRefresher(bot)
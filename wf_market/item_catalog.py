@@ -0,0 +1,35 @@
+import json
+import os
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+from wf_market.item_search import ItemRow
+
+# 本地物品目录：只保存搜索需要的精简字段，重启后直接从磁盘建索引
+CATALOG_PATH = Path("wf_market/items_catalog.json")
+# 文件格式版本，字段变化时加一，旧文件会被忽略并重新下载
+CATALOG_SCHEMA = 4
+
+def load_catalog(path: Path = CATALOG_PATH) -> Optional[Tuple[str, List[ItemRow]]]:
+    """读取本地目录，返回 (上游版本号, 物品行)；文件不存在/损坏/格式过旧时返回 None"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            raw = json.load(f)
+        if raw.get("schema") != CATALOG_SCHEMA:
+            return None
+        return raw.get("version", ""), [
+            tuple(r[:5]) + (tuple(tuple(p) for p in r[5]),) + tuple(r[6:]) for r in raw.get("items", [])
+        ]
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"本地物品目录读取失败: {e}")
+        return None
+
+def save_catalog(version: str, rows: List[ItemRow], path: Path = CATALOG_PATH) -> None:
+    """先写临时文件再替换，避免写到一半崩溃留下坏文件"""
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"schema": CATALOG_SCHEMA, "version": version, "saved_at": int(time.time()), "items": rows},
+                  f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp, path)
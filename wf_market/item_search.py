@@ -0,0 +1,174 @@
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Dict, List, Optional, Tuple
+
+# 每条物品只保留搜索/估价需要的字段
+# (slug, 中文名, 英文名, 是否有等级, 杜卡特, 套装组成, 最高等级)
+# 套装组成只在套装本身上有：((部件 slug, 数量), ...)，其余物品为空；没有等级的物品最高等级为 0
+ItemRow = Tuple[str, str, str, bool, int, tuple, int]
+
+RANKABLE_TAGS = ("mod", "arcane_enhancement")
+NEGATIVE_CACHE_SIZE = 4096
+# 1~2 个字符的查询 (自动补全的头几下按键) 命中的物品很多：倒排表超过 SHORT_POSTING 条的切片
+# 在建索引时就排好前 SHORT_TOP 名，查询时不再逐个打分
+SHORT_POSTING = 64
+SHORT_TOP = 25
+
+def row_from_api(item: dict) -> ItemRow:
+    i18n = item.get('i18n', {})
+    tags = item.get('tags', [])
+    return (
+        item.get('slug', '').lower(),
+        i18n.get('zh-hans', {}).get('name') or '',
+        i18n.get('en', {}).get('name') or '',
+        any(t in tags for t in RANKABLE_TAGS),
+        int(item.get('ducats') or 0),
+        (),
+        int(item.get('maxRank') or 0),
+    )
+
+def rows_from_api(items: List[dict]) -> List[ItemRow]:
+    """
+    整个目录一起转换，才能把套装的 setParts (物品 id) 换成 slug。
+    接口没给 setParts 时按命名规则兜底：xxx_set 的部件是同前缀的其他物品，数量按 1 计。
+    """
+    by_id = {x.get('id'): x for x in items if x.get('id')}
+    rows = [row_from_api(x) for x in items]
+    slugs = [r[0] for r in rows]
+
+    for n, item in enumerate(items):
+        slug = slugs[n]
+        if not slug.endswith('_set'): continue
+        ids = [i for i in item.get('setParts') or [] if i != item.get('id') and i in by_id]
+        if ids:
+            parts = tuple((by_id[i].get('slug', '').lower(), int(by_id[i].get('quantityInSet') or 1)) for i in ids)
+        else:
+            prefix = slug[:-len('set')]
+            parts = tuple((s, 1) for s in slugs if s.startswith(prefix) and s != slug and not s.endswith('_set'))
+        if parts:
+            rows[n] = rows[n][:5] + (parts,) + rows[n][6:]
+    return rows
+
+def _grams(s: str) -> set:
+    """单字 + 双字切片：单字用于 1 个字符的查询，双字用于更长的查询"""
+    return set(s) | {s[i:i + 2] for i in range(len(s) - 1)}
+
+class ItemIndex:
+    """
+    物品目录的搜索索引，每次目录加载后整体重建一次 (建好后只读，可在多线程中共享)
+    - 精确匹配：中文名 / 英文名 / slug 三张哈希表
+    - 子串匹配：n-gram 倒排表求交集得到候选，再按相关度排序
+      (完全相等 > 前缀 > 词首 > 任意位置，其次名字越短越靠前)；
+      候选很多的短切片预先排好前几名
+    - 未命中的查询进入负缓存 (唯一会变的部分，加锁)，重复的错字查询不再扫描
+    """
+
+    def __init__(self, rows: List[ItemRow]):
+        self.rows = rows
+        self.built_at = time.time()
+        self._exact: Dict[str, int] = {}
+        self._grams: Dict[str, List[int]] = defaultdict(list)
+        # 每条物品参与子串匹配的小写名字
+        self._names: List[Tuple[str, ...]] = []
+        self._misses: "OrderedDict[str, None]" = OrderedDict()
+        self._misses_lock = threading.Lock()
+
+        for i, (slug, zh, en, *_) in enumerate(rows):
+            names = tuple(dict.fromkeys(n.lower() for n in (zh, en, slug.replace('_', ' ')) if n))
+            self._names.append(names)
+            for key in (zh.lower(), en.lower(), slug):
+                if key: self._exact.setdefault(key, i)
+            for g in set().union(*(_grams(n) for n in names)) if names else ():
+                self._grams[g].append(i)
+
+        self._short_top: Dict[str, List[int]] = {
+            g: self._rank(posting, g, SHORT_TOP)
+            for g, posting in self._grams.items() if len(posting) > SHORT_POSTING
+        }
+
+    def __len__(self):
+        return len(self.rows)
+
+    def row(self, key: str) -> Optional[ItemRow]:
+        """只做精确匹配 (slug / 英文名 / 中文名)，返回整行"""
+        i = self._exact.get(key.strip().lower())
+        return self.rows[i] if i is not None else None
+
+    def info(self, i: int) -> dict:
+        slug, zh, en, rankable = self.rows[i][:4]
+        return {"name": zh or en, "slug": slug, "is_rankable": rankable, "max_rank": self.rows[i][6]}
+
+    @staticmethod
+    def _score(names: Tuple[str, ...], q: str) -> Optional[tuple]:
+        best = None
+        for n in names:
+            pos = n.find(q)
+            if pos < 0: continue
+            if n == q: tier = 0
+            elif pos == 0: tier = 1
+            elif n[pos - 1] in " -_(": tier = 2
+            else: tier = 3
+            s = (tier, len(n))
+            if best is None or s < best: best = s
+        return best
+
+    def _rank(self, candidates, q: str, limit: int) -> List[int]:
+        scored = []
+        for i in candidates:
+            s = self._score(self._names[i], q)
+            if s is not None:
+                scored.append((s, self.rows[i][0], i))
+        scored.sort()
+        return [i for _, _, i in scored[:limit]]
+
+    def _candidates(self, q: str):
+        if len(q) == 1:
+            return self._grams.get(q, [])
+        postings = sorted((self._grams.get(q[i:i + 2], []) for i in range(len(q) - 1)), key=len)
+        if not postings[0]:
+            return []
+        cand = set(postings[0])
+        for p in postings[1:]:
+            cand.intersection_update(p)
+            if not cand: break
+        return cand
+
+    def search(self, query: str, limit: int = 25) -> List[int]:
+        """返回按相关度排序的物品下标"""
+        q = query.strip().lower()
+        if not q:
+            return []
+        with self._misses_lock:
+            if q in self._misses: return []
+
+        exact = self._exact.get(q)
+        if limit <= SHORT_TOP and q in self._short_top:
+            # 短查询只对应一个切片，候选与完整打分时相同，直接用预排好的结果
+            out = self._short_top[q][:limit]
+        else:
+            out = self._rank(self._candidates(q), q, limit)
+        if exact is not None and (not out or out[0] != exact):
+            out = [exact] + [i for i in out if i != exact][:limit - 1]
+
+        if not out:
+            # get_sell_prices 的工作线程与 to_thread 里的查询会同时写负缓存
+            with self._misses_lock:
+                self._misses[q] = None
+                if len(self._misses) > NEGATIVE_CACHE_SIZE:
+                    self._misses.popitem(last=False)
+        return out
+
+    def lookup(self, query: str) -> Optional[dict]:
+        """单个查询：精确匹配优先，否则取相关度最高的子串匹配"""
+        hits = self.search(query, limit=1)
+        return self.info(hits[0]) if hits else None
+
+    def suggest(self, query: str, limit: int = 25) -> List[Tuple[str, str]]:
+        """自动补全：返回 (显示文本, slug)"""
+        out = []
+        for i in self.search(query, limit):
+            slug, zh, en = self.rows[i][:3]
+            label = f"{zh} ({en})" if zh and en and zh != en else (zh or en or slug)
+            out.append((label[:100], slug))
+        return out
@@ -1,6 +1,195 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import requests
+from wf_market.item_catalog import load_catalog, save_catalog
+from wf_market.item_search import ItemIndex, rows_from_api
+from wf_market.order_stats import summarize
+from wf_market.price_history import history
 
 BASE_URL = "https://api.warframe.market/v2"
+# 物品目录下载失败后，交互查询多久内不再重试
+CATALOG_RETRY_SECONDS = 60
+
+# 优先级：数字越小越优先。交互指令的查询插队在后台监控前面，
+# 套利/核桃估价/杜卡特表这类几百个请求的批量扫描排在监控后面
+INTERACTIVE = 0
+BACKGROUND = 1
+BULK = 2
+
+class RateLimiter:
+    """
+    进程级令牌桶：所有访问 warframe.market 的请求都先在这里取令牌。
+    - 按 rate 匀速补充，最多攒 burst 个
+    - 有更高优先级的请求在等时，低优先级不取令牌 (交互查询抢占后台监控，监控抢占批量扫描)
+    - 等待超过 max_wait 的请求直接放弃 (记为 shed)，不让请求无限堆积
+    - 收到 429 时 penalize 清空令牌并暂停，按 Retry-After 退避
+    线程安全：监控与指令都在 to_thread 的工作线程里调用 acquire。
+    """
+
+    def __init__(self, rate: float, burst: int, max_wait=(10.0, 30.0, 60.0)):
+        self.rate = rate
+        self.burst = burst
+        self.max_wait = max_wait
+        self._cond = threading.Condition()
+        self._tokens = float(burst)
+        self._last = time.monotonic()
+        self._paused_until = 0.0
+        self._waiting = [0] * len(max_wait)
+        # 统计：发放 / 需要等待才拿到 / 累计等待秒数 / 放弃 (按优先级) / 429 次数
+        self.granted = 0
+        self.waited = 0
+        self.wait_seconds = 0.0
+        self.shed = [0] * len(max_wait)
+        self.throttled = 0
+
+    def _refill(self, now: float):
+        if now > self._paused_until:
+            self._tokens = min(self.burst, self._tokens + (now - max(self._last, self._paused_until)) * self.rate)
+        self._last = now
+
+    def acquire(self, priority: int = BACKGROUND) -> bool:
+        start = time.monotonic()
+        deadline = start + self.max_wait[priority]
+        blocked = False
+        with self._cond:
+            self._waiting[priority] += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    preempted = any(self._waiting[p] for p in range(priority))
+                    if self._tokens >= 1 and not preempted:
+                        self._tokens -= 1
+                        self.granted += 1
+                        if blocked:
+                            self.waited += 1
+                            self.wait_seconds += now - start
+                        return True
+                    if now >= deadline:
+                        self.shed[priority] += 1
+                        return False
+                    # 令牌不足时估算补满一个令牌的时间；被抢占时等高优先级取完后的通知
+                    need = max(self._paused_until - now, 0) + max(1 - self._tokens, 0) / self.rate
+                    blocked = True
+                    self._cond.wait(min(max(need, 0.01), deadline - now))
+            finally:
+                self._waiting[priority] -= 1
+                self._cond.notify_all()
+
+    def penalize(self, seconds: float):
+        with self._cond:
+            self.throttled += 1
+            self._tokens = 0.0
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "granted": self.granted, "waited": self.waited, "wait_seconds": self.wait_seconds,
+                "shed_interactive": self.shed[INTERACTIVE], "shed_background": self.shed[BACKGROUND],
+                "shed_bulk": self.shed[BULK],
+                "throttled": self.throttled, "queued": sum(self._waiting),
+            }
+
+# warframe.market 公开的限制约为每秒 3 次
+limiter = RateLimiter(
+    rate=float(os.getenv("WFM_RATE_PER_SECOND", "3")),
+    burst=int(os.getenv("WFM_RATE_BURST", "3")),
+)
+
+class _Flight:
+    """一次正在进行的上游请求，同 key 的其他调用者等它的结果"""
+    __slots__ = ("done", "result", "priority")
+
+    def __init__(self, priority):
+        self.done = threading.Event()
+        self.result = None
+        self.priority = priority
+
+class OrderBookCache:
+    """
+    (slug, rank) -> 订单快照 的共享缓存
+    - ttl 秒内直接命中
+    - 过期但仍在 stale 窗口内：允许旧数据的调用者立刻拿到旧快照，同时后台线程刷新
+    - 同一个 key 同时只有一个上游请求 (singleflight)，其他调用者等待并共享结果；
+      但更高优先级的调用者不排在低优先级请求后面 (避免优先级反转)，而是自己发起请求并接替它
+    - 失败结果不缓存；按 LRU 最多保留 max_entries 个 key
+    """
+
+    def __init__(self, fetch, ttl: float, stale: float, max_entries: int = 2000):
+        self._fetch = fetch
+        self.ttl = ttl
+        self.stale = stale
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()  # key -> (fetched_at, data)
+        self._flights = {}
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def _run_flight(self, key, flight, priority):
+        try:
+            data = self._fetch(key[0], key[1], priority)
+        except Exception as e:
+            print(f"订单快照刷新失败 {key}: {e}")
+            data = None
+        with self._lock:
+            if data is not None:
+                self._entries[key] = (time.monotonic(), data)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            # 可能已被更高优先级的请求接替
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        flight.result = data
+        flight.done.set()
+        return data
+
+    def get(self, slug, rank, priority=INTERACTIVE, allow_stale=True):
+        key = (slug, rank)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            age = now - entry[0] if entry else None
+            if entry and age < self.ttl:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return entry[1]
+
+            serve_stale = bool(allow_stale and entry and age < self.ttl + self.stale)
+            # 后台刷新不占交互优先级；批量扫描触发的刷新仍按批量排队
+            run_priority = max(priority, BACKGROUND) if serve_stale else priority
+            flight = self._flights.get(key)
+            leader = flight is None or (not serve_stale and priority < flight.priority)
+            if leader:
+                flight = self._flights[key] = _Flight(run_priority)
+
+            if serve_stale:
+                self.stale_hits += 1
+            elif leader:
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if serve_stale:
+            if leader:
+                threading.Thread(target=self._run_flight, args=(key, flight, run_priority), daemon=True).start()
+            return entry[1]
+        if leader:
+            return self._run_flight(key, flight, priority)
+        flight.done.wait()
+        return flight.result
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "stale_hits": self.stale_hits,
+                    "misses": self.misses, "coalesced": self.coalesced}
 
 class WFMV2Client:
     def __init__(self):
@@ -9,83 +198,250 @@ class WFMV2Client:
             'Accept': 'application/json',
             'Platform': 'pc'
         }
-        self._items_cache = []
+        self._index = None
+        self._items_lock = threading.Lock()
+        self.catalog_version = None
+        self._catalog_failed_at = -CATALOG_RETRY_SECONDS
+        # 订单快照缓存：/市场 与后台监控共用，TTL 内重复查询同一物品不再请求上游
+        self.order_cache = OrderBookCache(
+            self._fetch_top_orders,
+            ttl=float(os.getenv("WFM_ORDER_TTL", "20")),
+            stale=float(os.getenv("WFM_ORDER_STALE", "120")),
+        )
+        # 完整订单簿的统计汇总：按 slug 缓存 {等级: BookStats}，一次下载汇总所有等级；
+        # 只缓存汇总结果，不保留原始订单，数据量大时更省内存
+        self.book_cache = OrderBookCache(
+            self._fetch_order_stats,
+            ttl=float(os.getenv("WFM_BOOK_TTL", "60")),
+            stale=float(os.getenv("WFM_BOOK_STALE", "300")),
+            max_entries=500,
+        )
+        # 每次真实拉到订单后的回调 fn(slug, rank, data)，供派生表顺带更新
+        self.order_listeners = []
+
+    def _get(self, path, params=None, priority=INTERACTIVE, timeout=10):
+        """统一出口：先取令牌再请求；被限流放弃时返回 None，429 时触发全局退避"""
+        if not limiter.acquire(priority):
+            return None
+        r = requests.get(f"{BASE_URL}{path}", headers=self.headers, params=params or {}, timeout=timeout)
+        if r.status_code == 429:
+            try:
+                retry = float(r.headers.get('Retry-After', 1))
+            except ValueError:
+                retry = 1.0
+            limiter.penalize(retry)
+            print(f"⚠️ warframe.market 返回 429，暂停 {retry:.0f}s")
+        return r
+
+    def _install_catalog(self, version, rows):
+        self._index = ItemIndex(rows)
+        self.catalog_version = version
+
+    def _fetch_catalog_version(self, priority):
+        """/versions 里 items 集合的版本号；请求失败返回 None"""
+        r = self._get("/versions", priority=priority)
+        if r is None or r.status_code != 200: return None
+        data = r.json().get('data', {})
+        return data.get('collections', {}).get('items') or data.get('updatedAt') or ""
+
+    def _download_catalog(self, priority, version=None):
+        """下载完整目录，只保留精简字段，建索引并落盘"""
+        if version is None:
+            version = self._fetch_catalog_version(priority) or ""
+        r = self._get("/items", priority=priority)
+        if r is None or r.status_code != 200: return False
+        rows = rows_from_api(r.json().get('data', []))
+        if not rows: return False
+        self._install_catalog(version, rows)
+        try:
+            save_catalog(version, rows)
+        except Exception as e:
+            print(f"物品目录保存失败: {e}")
+        return True
 
     def _load_items(self):
-        if self._items_cache: return
+        """确保索引可用：优先读本地目录，没有时才现场下载；下载失败后一段时间内不再重试"""
+        if self._index is not None: return
+        with self._items_lock:
+            if self._index is not None: return
+            local = load_catalog()
+            if local:
+                self._install_catalog(*local)
+                return
+            if time.monotonic() - self._catalog_failed_at < CATALOG_RETRY_SECONDS: return
+            try:
+                ok = self._download_catalog(INTERACTIVE)
+            except Exception as e:
+                print(f"API 缓存加载失败: {e}")
+                ok = False
+            if not ok:
+                self._catalog_failed_at = time.monotonic()
+
+    def sync_catalog(self):
+        """启动时在后台执行：先用本地目录顶上，再对比上游版本号，只有变化时才重新下载"""
+        with self._items_lock:
+            if self._index is None:
+                local = load_catalog()
+                if local: self._install_catalog(*local)
         try:
-            r = requests.get(f"{BASE_URL}/items", headers=self.headers, timeout=10)
-            if r.status_code == 200:
-                self._items_cache = r.json().get('data', [])
+            version = self._fetch_catalog_version(BACKGROUND)
+            if version is None:
+                print("⚠️ 物品目录版本检查失败，继续使用本地目录")
+                return
+            if self._index is not None and version == self.catalog_version:
+                print(f"📦 物品目录已是最新 ({len(self._index)} 个物品)")
+                return
+            with self._items_lock:
+                if self._download_catalog(BACKGROUND, version):
+                    print(f"📦 物品目录已更新 ({len(self._index)} 个物品)")
+                else:
+                    self._catalog_failed_at = time.monotonic()
         except Exception as e:
-            print(f"API 缓存加载失败: {e}")
+            print(f"物品目录同步失败: {e}")
+
+    def start_catalog_sync(self):
+        threading.Thread(target=self.sync_catalog, daemon=True).start()
+
+    @property
+    def item_index(self):
+        """已加载的物品搜索索引 (尚未加载时为 None，不会触发网络请求)"""
+        return self._index
+
+    def ensure_catalog(self):
+        """确保物品目录已加载 (必要时现场读取/下载)，返回搜索索引；仍不可用时为 None"""
+        self._load_items()
+        return self._index
+
+    def warm_up(self):
+        """在后台线程里加载物品目录，供自动补全等不能阻塞的调用方使用"""
+        if self._index is None and not self._items_lock.locked():
+            threading.Thread(target=self._load_items, daemon=True).start()
 
     def find_item_slug(self, query):
         self._load_items()
-        query = query.strip().lower()
-        for item in self._items_cache:
-            i18n = item.get('i18n', {})
-            zh = i18n.get('zh-hans', {}).get('name', '').lower()
-            en = i18n.get('en', {}).get('name', '').lower()
-            slug = item.get('slug', '').lower()
-            tags = item.get('tags', []) 
-            if query == zh or query == en or query == slug or query in zh:
-                is_rankable = any(t in tags for t in ["mod", "arcane_enhancement"])
-                return {
-                    "name": i18n.get('zh-hans', {}).get('name'), 
-                    "slug": slug,
-                    "is_rankable": is_rankable
-                }
-        return None
+        return self._index.lookup(query) if self._index else None
 
-    # --- 方法一：为 /市场 指令设计，返回前 5 名列表 ---
-    def get_market_data(self, slug, rank=None):
-        """返回包含 sell 和 buy 两个列表的字典，每个列表包含前 5 个最优订单"""
-        url = f"{BASE_URL}/orders/item/{slug}/top"
+    def find_item_slugs(self, queries):
+        """批量解析物品名：目录只加载一次，每个查询走同一份索引"""
+        self._load_items()
+        return {q: (self._index.lookup(q) if self._index else None) for q in dict.fromkeys(queries)}
+
+    # --- 基础请求：一次取回某物品 (某等级) 的买卖两侧前列订单 ---
+    def get_top_orders(self, slug, rank=None, priority=INTERACTIVE, allow_stale=None):
+        """
+        返回 /orders/item/{slug}/top 的 data：{'sell': [...], 'buy': [...]}，失败返回 None
+        经过订单快照缓存；交互查询默认接受稍旧的快照 (后台刷新)，监控默认只要 TTL 内的数据
+        """
+        if allow_stale is None:
+            allow_stale = priority == INTERACTIVE
+        return self.order_cache.get(slug, rank, priority, allow_stale)
+
+    def _fetch_top_orders(self, slug, rank=None, priority=INTERACTIVE):
         params = {'rank': rank} if rank is not None else {}
         try:
-            r = requests.get(url, headers=self.headers, params=params, timeout=10)
-            if r.status_code == 200:
-                raw_data = r.json().get('data', {})
-                # 获取卖单并按价格升序排，取前5
-                sell_orders = sorted(raw_data.get('sell', []), key=lambda x: x.get('platinum', 999999))[:5]
-                # 获取买单并按价格降序排，取前5
-                buy_orders = sorted(raw_data.get('buy', []), key=lambda x: x.get('platinum', 0), reverse=True)[:5]
-                
-                return {
-                    'sell': sell_orders,
-                    'buy': buy_orders
-                }
+            r = self._get(f"/orders/item/{slug}/top", params, priority)
+            if r is not None and r.status_code == 200:
+                data = r.json().get('data', {})
+                # 每次真实的上游请求都留一条价格样本 (监控扫描与 /市场 都经过这里)
+                history.record_orders(slug, rank, data)
+                for fn in self.order_listeners:
+                    try:
+                        fn(slug, rank, data)
+                    except Exception as e:
+                        print(f"订单回调失败 {slug}: {e}")
+                return data
         except Exception as e:
-            print(f"get_market_data 失败: {e}")
+            print(f"_fetch_top_orders 失败: {e}")
         return None
 
-    # --- 方法二：为 监控/提醒 设计，返回单一最佳订单字典 ---
-    def get_market_best_price(self, slug, trade_type, rank=None):
-        """返回单一字典，包含 price, ingame_name 等"""
-        url = f"{BASE_URL}/orders/item/{slug}/top"
-        params = {'rank': rank} if rank is not None else {}
+    def get_order_stats(self, slug, rank=None, priority=INTERACTIVE):
+        """完整订单簿的 BookStats (分位数/价差/深度/在线人数)，失败返回 None"""
+        books = self.book_cache.get(slug, None, priority, allow_stale=True)
+        if books is None: return None
+        # 没有任何该等级订单时给一个空汇总，而不是当作请求失败
+        return books.get(rank) or summarize([], rank)
+
+    def _fetch_order_stats(self, slug, rank=None, priority=INTERACTIVE):
+        """/orders/item/{slug} 返回所有等级的订单：下载一次，按等级分组各汇总一份，None 为全部等级合计"""
         try:
-            r = requests.get(url, headers=self.headers, params=params, timeout=10)
-            if r.status_code == 200:
-                data = r.json().get('data', {}).get(trade_type, [])
-                if not data: return None
-                
-                if trade_type == 'sell':
-                    best_order = min(data, key=lambda x: x.get('platinum', 999999))
-                else:
-                    best_order = max(data, key=lambda x: x.get('platinum', 0))
-    
-                user_info = best_order.get('user', {})
-                player_name = user_info.get('ingameName') or user_info.get('ingame_name') or "WFM_User"
-
-                return {
-                    'price': best_order.get('platinum'),
-                    'ingame_name': player_name,
-                    'en_name': slug.replace('_', ' ').title() 
-                }
+            r = self._get(f"/orders/item/{slug}", priority=priority, timeout=15)
+            if r is not None and r.status_code == 200:
+                orders = r.json().get('data', [])
+                by_rank = {}
+                for o in orders:
+                    if o.get("rank") is not None:
+                        by_rank.setdefault(o["rank"], []).append(o)
+                books = {k: summarize(v) for k, v in by_rank.items()}
+                books[None] = summarize(orders)
+                return books
         except Exception as e:
-            print(f"get_market_best_price 失败: {e}")
+            print(f"_fetch_order_stats 失败: {e}")
         return None
 
+    @staticmethod
+    def best_order(data, trade_type, slug):
+        """从 get_top_orders 的结果里挑出某一侧的最优订单，返回 price, ingame_name 等"""
+        orders = (data or {}).get(trade_type, [])
+        if not orders: return None
+
+        if trade_type == 'sell':
+            best = min(orders, key=lambda x: x.get('platinum', 999999))
+        else:
+            best = max(orders, key=lambda x: x.get('platinum', 0))
+
+        user_info = best.get('user', {})
+        player_name = user_info.get('ingameName') or user_info.get('ingame_name') or "WFM_User"
+        return {
+            'price': best.get('platinum'),
+            'ingame_name': player_name,
+            'en_name': slug.replace('_', ' ').title()
+        }
+
+    @staticmethod
+    def sell_price(data, depth=5):
+        """估价用的卖价：最低 depth 个卖单的中位数，避免单个挂错价的订单拉偏"""
+        prices = sorted(o.get('platinum') for o in (data or {}).get('sell', []) if o.get('platinum') is not None)[:depth]
+        if not prices: return None
+        mid = len(prices) // 2
+        return prices[mid] if len(prices) % 2 else (prices[mid - 1] + prices[mid]) / 2
+
+    def get_sell_prices(self, slugs, priority=BACKGROUND, workers=2):
+        """
+        批量估价：{slug: 卖价或 None}
+        同一 slug 只请求一次，经订单缓存与全局限速器，几个线程并发拉取
+        """
+        slugs = list(dict.fromkeys(slugs))
+        def one(slug):
+            return self.sell_price(self.get_top_orders(slug, None, priority, allow_stale=True))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return dict(zip(slugs, pool.map(one, slugs)))
+
+    def get_all_ranks(self, slug, max_rank, priority=INTERACTIVE):
+        """
+        一次并发拉取 0..max_rank 每个等级的订单：{rank: data 或 None}
+        每个等级仍各自经过订单缓存与全局限速器，总耗时约等于限速器放行这几个请求的时间
+        """
+        ranks = list(range(max_rank + 1))
+        with ThreadPoolExecutor(max_workers=len(ranks)) as pool:
+            return dict(zip(ranks, pool.map(lambda r: self.get_top_orders(slug, r, priority), ranks)))
+
+    # --- 方法一：为 /市场 指令设计，返回前 5 名列表 ---
+    def get_market_data(self, slug, rank=None):
+        """返回包含 sell 和 buy 两个列表的字典，每个列表包含前 5 个最优订单"""
+        raw_data = self.get_top_orders(slug, rank)
+        if raw_data is None: return None
+        # 获取卖单并按价格升序排，取前5
+        sell_orders = sorted(raw_data.get('sell', []), key=lambda x: x.get('platinum', 999999))[:5]
+        # 获取买单并按价格降序排，取前5
+        buy_orders = sorted(raw_data.get('buy', []), key=lambda x: x.get('platinum', 0), reverse=True)[:5]
+        return {
+            'sell': sell_orders,
+            'buy': buy_orders
+        }
+
+    # --- 方法二：为 监控/提醒 设计，返回单一最佳订单字典 ---
+    def get_market_best_price(self, slug, trade_type, rank=None, priority=BACKGROUND):
+        """返回单一字典，包含 price, ingame_name 等"""
+        return self.best_order(self.get_top_orders(slug, rank, priority), trade_type, slug)
+
 client_v2 = WFMV2Client()
\ No newline at end of file
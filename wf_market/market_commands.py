@@ -1,3 +1,4 @@
+import asyncio
 import discord
 from discord import app_commands
 from wf_market.market_api import client_v2
@@ -5,17 +6,83 @@ from wf_market.market_api import client_v2
 # 统一使用绿色风格
 COLOR_MARKET_GREEN = 0x2ECC71 
 
+async def item_autocomplete(interaction: discord.Interaction, current: str):
+    """物品名自动补全：只查内存索引，目录还没加载时先在后台加载，本次返回空"""
+    index = client_v2.item_index
+    if index is None:
+        client_v2.warm_up()
+        return []
+    return [app_commands.Choice(name=label, value=slug) for label, slug in index.suggest(current)]
+
+def build_ranks_embed(item_info, by_rank):
+    """每个等级一行：最低卖价 (卖家) / 最高收购价 (买家)"""
+    lines = []
+    for rank, data in by_rank.items():
+        if data is None:
+            lines.append(f"`R{rank:<2}` 查询失败")
+            continue
+        sell = client_v2.best_order(data, 'sell', item_info['slug'])
+        buy = client_v2.best_order(data, 'buy', item_info['slug'])
+        s = f"**{sell['price']}** Pt ({sell['ingame_name']})" if sell else "无卖单"
+        b = f"**{buy['price']}** Pt ({buy['ingame_name']})" if buy else "无收购"
+        lines.append(f"`R{rank:<2}` 💰 {s} · 🛒 {b}")
+    embed = discord.Embed(
+        title=f"📊 {item_info['name']} · 全部等级",
+        url=f"https://warframe.market/zh-hant/items/{item_info['slug']}",
+        color=COLOR_MARKET_GREEN,
+        description="\n".join(lines)[:4096]
+    )
+    embed.set_footer(text="💰 最低卖价 · 🛒 最高收购价 · 数据源：Warframe Market V2")
+    return embed
+
+def build_stats_embed(item_info, rank, stats, pct):
+    title_rank = f" (Rank {rank})" if rank is not None else ""
+    embed = discord.Embed(
+        title=f"📈 {item_info['name']}{title_rank} · 订单分析",
+        url=f"https://warframe.market/zh-hant/items/{item_info['slug']}",
+        color=COLOR_MARKET_GREEN
+    )
+    if stats.sell_percentiles:
+        p10, p25, p50, p75, p90 = stats.sell_percentiles
+        n, qty = stats.sell_depth(pct)
+        embed.add_field(name="💰 卖价分布 (在线卖家)", value=(
+            f"最低 **{stats.best_sell:g}** Pt · 中位 **{p50:g}** Pt\n"
+            f"P10 {p10:g} / P25 {p25:g} / P75 {p75:g} / P90 {p90:g}\n"
+            f"最低价 +{pct}% 内：{n} 单 / {qty} 件"
+        ), inline=False)
+    else:
+        embed.add_field(name="💰 卖价分布", value="当前没有在线卖家", inline=False)
+    if stats.best_buy is not None:
+        n, qty = stats.buy_depth(pct)
+        embed.add_field(name="🛒 收购 (在线买家)", value=(
+            f"最高 **{stats.best_buy:g}** Pt · 中位 {stats.buy_median:g} Pt\n"
+            f"最高价 -{pct}% 内：{n} 单 / {qty} 件"
+        ), inline=False)
+    if stats.spread is not None:
+        embed.add_field(name="↔️ 买卖价差", value=f"{stats.spread:g} Pt", inline=True)
+    ingame, online, offline = stats.sell_status
+    embed.add_field(name="👥 卖单状态", value=f"游戏中 {ingame} · 在线 {online} · 离线 {offline}", inline=True)
+    embed.set_footer(text=f"共统计 {stats.orders} 个订单 · 数据源：Warframe Market V2")
+    return embed
+
 def setup(tree: app_commands.CommandTree):
     @tree.command(name="市场", description="Warframe Market V2 实时查询 (支持MOD/赋能等级)")
     @app_commands.describe(
         物品="输入中文或英文物品名称", 
-        等级="如果是MOD或赋能可选填等级 (0-max)，非此类物品请勿填写"
+        等级="如果是MOD或赋能可选填等级 (0-max)，非此类物品请勿填写",
+        分析="统计全部订单：分位价、价差、深度、在线卖家数",
+        深度范围="分析模式下统计最优价 ±X% 以内的挂单量 (默认 10)",
+        全部等级="MOD/赋能：一次列出 0 到满级每个等级的最低卖价与最高收购价"
     )
-    async def market(interaction: discord.Interaction, 物品: str, 等级: int = None):
+    @app_commands.autocomplete(物品=item_autocomplete)
+    async def market(interaction: discord.Interaction, 物品: str, 等级: int = None, 分析: bool = False, 深度范围: int = 10, 全部等级: bool = False):
+        if 分析 and 全部等级:
+            await interaction.response.send_message("⚠️ “分析” 与 “全部等级” 不能同时使用，请分别查询。", ephemeral=True)
+            return
         await interaction.response.defer(thinking=True)
         
         # 1. 扫描匹配物品并获取类型
-        item_info = client_v2.find_item_slug(物品)
+        item_info = await asyncio.to_thread(client_v2.find_item_slug, 物品)
         if not item_info:
             await interaction.followup.send(f"❌ 查不到 “{物品}”，请尝试输入更准确的名称。")
             return
@@ -31,8 +98,24 @@ def setup(tree: app_commands.CommandTree):
         if item_info.get('is_rankable') and 等级 is None:
             target_rank = 0
 
+        if 全部等级 and item_info.get('is_rankable') and item_info.get('max_rank'):
+            by_rank = await asyncio.to_thread(client_v2.get_all_ranks, item_info['slug'], item_info['max_rank'])
+            if not any(by_rank.values()):
+                await interaction.followup.send(f"⚠️ 无法获取 **{item_info['name']}** 的价格数据。")
+                return
+            await interaction.followup.send(embed=build_ranks_embed(item_info, by_rank))
+            return
+
+        if 分析:
+            stats = await asyncio.to_thread(client_v2.get_order_stats, item_info['slug'], target_rank)
+            if stats is None:
+                await interaction.followup.send(f"⚠️ 无法获取 **{item_info['name']}** 的订单数据。")
+                return
+            await interaction.followup.send(embed=build_stats_embed(item_info, target_rank, stats, max(1, min(深度范围, 100))))
+            return
+
         # 3. 获取数据 (带入 rank 参数)
-        data = client_v2.get_market_data(item_info['slug'], rank=target_rank)
+        data = await asyncio.to_thread(client_v2.get_market_data, item_info['slug'], target_rank)
         if not data:
             await interaction.followup.send(f"⚠️ 无法获取 **{item_info['name']}** 的价格数据。")
             return
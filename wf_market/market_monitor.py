@@ -1,77 +1,236 @@
 import discord
 import asyncio  # 必须导入
+import os
+import time
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from typing import Dict, List, Tuple
 from discord.ext import tasks
-from wf_market.market_api import client_v2
-from reminder.reminder_core import load_items, save_items
+from wf_market.market_api import BACKGROUND, client_v2
+from wf_market.poll_scheduler import PollScheduler
+from wf_market.order_diff import LISTING_SIDE, OrderDiff, OrderSnapshots, matched_subscribers
+from reminder.reminder_core import list_active
+from reminder.reminder_records import MarketReminder
+from reminder.reminder_store import store
+from reminder.reminder_quota import ledger
+
+# 扫描流水线：同时在途的请求数上限 (发起速率由 market_api 的全局令牌桶控制)
+SWEEP_CONCURRENCY = int(os.getenv("MARKET_SWEEP_CONCURRENCY", "4"))
+SWEEP_INTERVAL = 60
+# 调度器的检查节拍：每个物品什么时候真正发请求由 PollScheduler 决定
+POLL_TICK = 15
+
+# (slug, rank) -> {trade_type: (升序阈值列表, 对应提醒列表)}；新挂单订阅单独放在 LISTING_SIDE 一侧
+Ladders = Dict[Tuple[str, object], Dict[str, Tuple[List[int], List[MarketReminder]]]]
+
+def build_ladders(items: List[MarketReminder]) -> Ladders:
+    """
+    把活跃的市场提醒按 (slug, rank, trade_type) 分组，每组按目标价升序排成一条阈值阶梯。
+    /top 接口一次同时返回买卖两侧，所以外层按 (slug, rank) 聚合，一个物品只请求一次。
+    """
+    groups = defaultdict(lambda: defaultdict(list))
+    for item in items:
+        groups[(item.slug, item.rank)][LISTING_SIDE if item.listing else item.trade_type].append(item)
+
+    ladders = {}
+    for key, sides in groups.items():
+        ladders[key] = {}
+        for trade_type, members in sides.items():
+            members.sort(key=lambda x: x.target_price)
+            ladders[key][trade_type] = ([x.target_price for x in members], members)
+    return ladders
+
+def fired_on_ladder(prices: List[int], members: List[MarketReminder], trade_type: str, price: int) -> List[MarketReminder]:
+    """
+    对一条阶梯做一次二分：
+    - 卖单 (sell)：最低卖价 <= 目标价即触发 -> 所有目标价 >= price 的提醒
+    - 买单 (buy)：最高收购价 >= 目标价即触发 -> 所有目标价 <= price 的提醒
+    """
+    if trade_type == "sell":
+        return members[bisect_left(prices, price):]
+    return members[:bisect_right(prices, price)]
 
 class MarketMonitor:
+    """
+    市场扫描：每 POLL_TICK 秒由 PollScheduler 挑出到期的物品，按三段流水线处理：
+    fetch (线程里发请求，最多 SWEEP_CONCURRENCY 个在途，以后台优先级经全局令牌桶限速)
+      -> evaluate (阈值阶梯二分) -> notify (批量领取后并发发送)
+    阻塞的 HTTP 请求不再跑在事件循环上，扫描期间其他指令照常响应。
+    """
+
     def __init__(self, bot):
         self.bot = bot
+        # 最近一轮扫描：提醒数 / 去重后的上游请求数 / 总耗时 / 单次请求平均耗时
+        self.last_reminders = 0
+        self.last_requests = 0
+        self.last_sweep_ms = 0.0
+        self.last_fetch_ms = 0.0
+        # 每个物品的自适应轮询间隔
+        self.scheduler = PollScheduler()
+        # 由 market_stream.setup_stream 挂上；None 表示纯 REST 轮询
+        self.stream = None
+        # 每个关注物品上一次看到的卖单，用于新挂单订阅的增量对比
+        self.snapshots = OrderSnapshots()
         self.check_market_prices.start()
 
-    @tasks.loop(minutes=1)
-    async def check_market_prices(self):
-        if not self.bot.is_ready():
-            return
+    async def _notify(self, item: MarketReminder, order_data: dict):
+        channel = self.bot.get_channel(item.channel_id)
+        if not channel: return
+
+        current_price = order_data['price']
+        player_name = order_data['ingame_name']
+        en_item_name = order_data['en_name']
+        rank_str = f" (rank {item.rank})" if item.rank is not None else ""
+
+        # 构造纯英文交易指令
+        whisper_cmd = f"```/w {player_name} Hi! I want to buy: {en_item_name}{rank_str} for {current_price} platinum. (warframe.market)```"
+
+        embed = discord.Embed(title="💰 市场价格预警触发", color=0xE74C3C)
+        embed.description = (
+            f"物品：**{item.item_name}** ({en_item_name}){rank_str}\n"
+            f"当前价格：**{current_price} Pt**\n"
+            f"在线玩家：**{player_name}**"
+        )
+        embed.add_field(name="复制下方指令至游戏内私聊", value=whisper_cmd, inline=False)
+
+        try:
+            await channel.send(content=f"<@{item.user_id}>", embed=embed)
+        except:
+            pass
+
+    async def _notify_listings(self, item: MarketReminder, events: list, offline: list):
+        """新挂单订阅：一条消息列出这次出现的所有新卖家 / 降价到目标以下的卖单"""
+        channel = self.bot.get_channel(item.channel_id)
+        if not channel: return
+
+        en_item_name = item.slug.replace('_', ' ').title()
+        rank_str = f" (rank {item.rank})" if item.rank is not None else ""
+        embed = discord.Embed(title="🆕 新挂单提醒", color=0xE67E22)
+        embed.description = f"物品：**{item.item_name}** ({en_item_name}){rank_str}\n订阅条件：新卖单 ≤ **{item.target_price} Pt**"
+        for ev in events[:5]:
+            tag = f"降价 {ev.prev_price} → {ev.price} Pt" if ev.prev_price is not None else f"新挂单 {ev.price} Pt"
+            whisper = f"/w {ev.player} Hi! I want to buy: {en_item_name}{rank_str} for {ev.price} platinum. (warframe.market)"
+            embed.add_field(name=f"{tag} · {ev.player}", value=f"```{whisper}```", inline=False)
+        if len(events) > 5:
+            embed.set_footer(text=f"另有 {len(events) - 5} 个卖单未列出")
+        gone = [x.player for x in offline if x.price <= item.target_price]
+        if gone:
+            embed.add_field(name="已下线/撤单", value="、".join(gone)[:1024], inline=False)
 
-        all_items = load_items()
-        triggered = False
+        try:
+            await channel.send(content=f"<@{item.user_id}>", embed=embed)
+        except:
+            pass
 
-        # 筛选出需要检查的市场提醒
-        market_tasks = [it for it in all_items if it.enabled and it.reminder_type == 2]
-        
-        for item in market_tasks:
-            # --- 核心频率控制：每秒最多2次访问，即间隔0.5秒 ---
-            await asyncio.sleep(0.5) 
+    def _listing_hits(self, sides: dict, diff: OrderDiff) -> list:
+        """把一次对比结果分给各个新挂单订阅：[(提醒, 事件列表)]，只涉及变化的订单"""
+        ladder = sides.get(LISTING_SIDE)
+        if not ladder or not (diff.new or diff.drops): return []
+        hits = {}
+        for ev in diff.new + diff.drops:
+            for item in matched_subscribers(ladder[0], ladder[1], ev):
+                hits.setdefault(item.id, (item, []))[1].append(ev)
+        return list(hits.values())
 
+    # --- 第一、二段：拉取 + 评估 ---
+    async def _fetch_worker(self, keys: asyncio.Queue, ladders: Ladders, out: asyncio.Queue, fetch_times: list, listings: list):
+        while True:
             try:
-                # 调用 API
-                order_data = client_v2.get_market_best_price(item.slug, item.trade_type, item.rank)
-                
-                if not order_data:
+                slug, rank = key = keys.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            sides = ladders[key]
+            try:
+                # 耗时包含在令牌桶里排队的时间
+                t0 = time.perf_counter()
+                data = await asyncio.to_thread(client_v2.get_top_orders, slug, rank, BACKGROUND)
+                cost = time.perf_counter() - t0
+                fetch_times.append(cost)
+                self.scheduler.observe(key, sides, data, time.monotonic())
+
+                # 这一次请求的开销由共享它的提醒平摊
+                sharers = [x for _, members in sides.values() for x in members]
+                share = 1 / len(sharers)
+                for x in sharers:
+                    ledger.charge(x.user_id, x.guild_id, share, cost * share)
+
+                if not data:
                     continue
 
-                current_price = order_data['price']
-                player_name = order_data['ingame_name']
-
-                # 判断触发逻辑
-                is_triggered = False
-                if item.trade_type == "sell" and current_price <= item.target_price:
-                    is_triggered = True
-                elif item.trade_type == "buy" and current_price >= item.target_price:
-                    is_triggered = True
-
-                if is_triggered:
-                    channel = self.bot.get_channel(item.channel_id)
-                    if channel:
-                        en_item_name = order_data['en_name']
-                        rank_str = f" (rank {item.rank})" if item.rank is not None else ""
-                        
-                        # 构造纯英文交易指令
-                        whisper_cmd = f"```/w {player_name} Hi! I want to buy: {en_item_name}{rank_str} for {current_price} platinum. (warframe.market)```"
-                        
-                        embed = discord.Embed(title="💰 市场价格预警触发", color=0xE74C3C)
-                        embed.description = (
-                            f"物品：**{item.item_name}** ({en_item_name}){rank_str}\n"
-                            f"当前价格：**{current_price} Pt**\n"
-                            f"在线玩家：**{player_name}**"
-                        )
-                        embed.add_field(name="复制下方指令至游戏内私聊", value=whisper_cmd, inline=False)
-                        
-                        try:
-                            await channel.send(content=f"<@{item.user_id}>", embed=embed)
-                        except:
-                            pass
-                    
-                    # 触发后禁用
-                    item.enabled = False
-                    triggered = True
+                # 推送的订单簿看不到改价和撤单，每次 REST 结果都用来重置它
+                if self.stream: self.stream.reseed(key, data)
+
+                diff = self.snapshots.update(key, data)
+                listings += [(item, evs, diff.offline) for item, evs in self._listing_hits(sides, diff)]
+
+                fired = []
+                for trade_type, (prices, members) in sides.items():
+                    if trade_type == LISTING_SIDE: continue
+                    order_data = client_v2.best_order(data, trade_type, slug)
+                    if not order_data or order_data['price'] is None:
+                        continue
+                    fired += [(item, order_data) for item in fired_on_ladder(prices, members, trade_type, order_data['price'])]
+                if fired:
+                    out.put_nowait(fired)
             except Exception as e:
-                print(f"检查 {item.item_name} 时报错: {e}")
+                print(f"检查 {slug} 时报错: {e}")
+
+    # --- 第三段：把积压的触发一次性领取，再并发发送通知 ---
+    async def _notifier(self, inbox: asyncio.Queue):
+        while True:
+            batch = [await inbox.get()]
+            while not inbox.empty():
+                batch.append(inbox.get_nowait())
+            done = batch[-1] is None
+            fired = {item.id: (item, order) for group in batch if group for item, order in group}
+            if fired:
+                # 一批领取失败只丢这一批，不能让异常冒出去停掉整个轮询任务；哨兵照常处理，保证任务结束
+                try:
+                    claimed = await store.trigger(list(fired))
+                    await asyncio.gather(*(self._notify(x, fired[x.id][1]) for x in claimed))
+                except Exception as e:
+                    print(f"市场提醒触发失败 ({len(fired)} 条): {e}")
+            if done:
+                return
+
+    @tasks.loop(seconds=POLL_TICK)
+    async def check_market_prices(self):
+        if not self.bot.is_ready():
+            return
+
+        # 推送只能看到新挂单 (看不到改价、撤单)，所以推送在线时 REST 仍按调度器的正常节奏轮询
+        now = time.monotonic()
+        t0 = time.perf_counter()
+        # 按 (slug, rank) 去重：上游请求数只随不同物品数增长，与提醒数无关；再只挑到期的物品
+        market_tasks = list_active(2)
+        ladders = build_ladders(market_tasks)
+        due = self.scheduler.due(ladders, now)
+        if not due:
+            return
+        self.last_reminders, self.last_requests = len(market_tasks), len(due)
+
+        keys = asyncio.Queue()
+        for key in due: keys.put_nowait(key)
+        self.snapshots.retain(ladders)
+        inbox = asyncio.Queue()
+        fetch_times = []
+        listings = []
+
+        notifier = asyncio.create_task(self._notifier(inbox))
+        await asyncio.gather(*(
+            self._fetch_worker(keys, ladders, inbox, fetch_times, listings)
+            for _ in range(min(SWEEP_CONCURRENCY, len(due)))
+        ))
+        inbox.put_nowait(None)
+        await notifier
+        # 新挂单订阅不领取 (不会失效)，直接发送
+        await asyncio.gather(*(self._notify_listings(*x) for x in listings))
 
-        # 如果有触发，统一保存一次
-        if triggered:
-            save_items(all_items)
+        self.last_sweep_ms = (time.perf_counter() - t0) * 1000
+        self.last_fetch_ms = sum(fetch_times) / len(fetch_times) * 1000 if fetch_times else 0.0
+        if self.last_sweep_ms > SWEEP_INTERVAL * 1000:
+            print(f"⚠️ 市场扫描耗时 {self.last_sweep_ms / 1000:.1f}s，超过 {SWEEP_INTERVAL}s 周期 "
+                  f"({self.last_requests} 个物品 / {self.last_reminders} 条提醒)")
 
 def setup_monitor(bot):
-    return MarketMonitor(bot)
\ No newline at end of file
+    return MarketMonitor(bot)
@@ -1,9 +1,13 @@
+import asyncio
 import discord
 from discord import app_commands
 import json
 import os
 from wf_market.market_api import client_v2
-from reminder.reminder_core import ReminderItem, add_item
+from wf_market.market_commands import item_autocomplete
+from reminder.reminder_records import MarketReminder, TradeType
+from reminder.reminder_store import store
+from reminder.reminder_quota import check_admission
 
 # 统一绿色风格
 COLOR_MARKET_GREEN = 0x2ECC71 
@@ -11,20 +15,22 @@ COLOR_MARKET_GREEN = 0x2ECC71
 def setup(tree: app_commands.CommandTree):
     @tree.command(name="提醒_买卖", description="设置市场价格预警 (支持MOD/赋能等级)")
     @app_commands.describe(
-        类型="选择监控类型：'买入' (监控卖家低价) 或 '卖出' (监控买家高价)",
+        类型="选择监控类型：'买入' (监控卖家低价)、'卖出' (监控买家高价) 或 '新挂单' (每个新卖家都通知)",
         物品="输入中文或英文物品名称", 
         价格="设定的目标 Pt 价格",
         等级="如果是MOD或赋能可选填等级 (0-max)"
     )
     @app_commands.choices(类型=[
         app_commands.Choice(name="买入 (监控卖家报价)", value="sell"),
-        app_commands.Choice(name="卖出 (监控买家求购)", value="buy")
+        app_commands.Choice(name="卖出 (监控买家求购)", value="buy"),
+        app_commands.Choice(name="新挂单 (任何 ≤ 目标价的新卖单都通知，不会失效)", value="listing")
     ])
+    @app_commands.autocomplete(物品=item_autocomplete)
     async def market_alert(interaction: discord.Interaction, 类型: str, 物品: str, 价格: int, 等级: int = None):
         await interaction.response.defer(thinking=True)
         
         # 1. 获取物品信息并检查等级合法性
-        item_info = client_v2.find_item_slug(物品)
+        item_info = await asyncio.to_thread(client_v2.find_item_slug, 物品)
         if not item_info:
             await interaction.followup.send(f"❌ 查不到 “{物品}”，无法设置提醒。")
             return
@@ -38,33 +44,34 @@ def setup(tree: app_commands.CommandTree):
         if item_info.get('is_rankable') and 等级 is None:
             target_rank = 0
 
-        # 2. 构造符合 ReminderItem 模型的数据
-        # 注意：这里必须包含 item_name 和 reminder_type=2
-        new_item = ReminderItem(
+        # 2. 配额检查：超出上限/预算的用户直接拒绝，不拖慢其他人的提醒
+        admission = check_admission(2, interaction.user.id, interaction.guild_id)
+        if not admission.ok:
+            await interaction.followup.send(f"🚫 {admission.reason}")
+            return
+
+        # 3. 构造 Type 2 市场提醒
+        new_item = MarketReminder(
             user_id=interaction.user.id,
             channel_id=interaction.channel_id,
+            guild_id=interaction.guild_id,
             item_name=item_info['name'],    # 用于列表显示
-            reminder_type=2,                # 市场提醒标识
-            type="market",
+            slug=item_info['slug'],
+            trade=TradeType.SELL if 类型 == "listing" else TradeType[类型.upper()],
             target_price=价格,
             rank=target_rank,
-            trade_type=类型,
-            slug=item_info['slug'],
-            meta={
-                "item_full_name": item_info['name'],
-                "rank": target_rank
-            }
+            listing=类型 == "listing"
         )
 
-        # 3. 写入 reminders.json
+        # 4. 写入提醒数据库
         try:
-            add_item(new_item)
+            await store.add(new_item)
         except Exception as e:
             await interaction.followup.send(f"❌ 数据库写入失败: {e}")
             return
 
-        # 4. 反馈 UI
-        type_text = "买入 (监控卖家低价)" if 类型 == "sell" else "卖出 (监控买家高价)"
+        # 5. 反馈 UI
+        type_text = {"sell": "买入 (监控卖家低价)", "buy": "卖出 (监控买家高价)", "listing": "新挂单 (每个新卖家通知一次)"}[类型]
         rank_text = f" (Rank {target_rank})" if target_rank is not None else ""
         
         embed = discord.Embed(
@@ -72,9 +79,12 @@ def setup(tree: app_commands.CommandTree):
             description=(
                 f"监控目标：**{item_info['name']}**{rank_text}\n"
                 f"监控类型：**{type_text}**\n"
-                f"触发条件：价格 {'≤' if 类型 == 'sell' else '≥'} **{价格} Pt**"
+                f"触发条件：价格 {'≥' if 类型 == 'buy' else '≤'} **{价格} Pt**"
             ),
             color=COLOR_MARKET_GREEN
         )
-        embed.set_footer(text="提示：后台将持续监控，达到目标价后会自动艾特你。")
+        if 类型 == "listing":
+            embed.set_footer(text="提示：只通知设置之后出现的新卖单 (含降价到目标价以下的)，需要停止时请手动取消。")
+        else:
+            embed.set_footer(text="提示：后台将持续监控，达到目标价后会自动艾特你。")
         await interaction.followup.send(embed=embed)
\ No newline at end of file
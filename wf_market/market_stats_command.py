@@ -0,0 +1,39 @@
+import discord
+from discord import app_commands
+from wf_market.market_api import client_v2, limiter
+
+COLOR_MARKET_GREEN = 0x2ECC71
+
+def cache_line(name: str, c: dict) -> str:
+    return f"{name}：命中 {c['hits']} / 旧数据 {c['stale_hits']} / 合并 {c['coalesced']} / 未命中 {c['misses']} ({c['entries']} 个物品)"
+
+def setup(tree: app_commands.CommandTree):
+    @tree.command(name="市场统计", description="[管理员] 查看市场请求限速、订单缓存与价格监控的运行情况")
+    @app_commands.default_permissions(administrator=True)
+    async def market_stats(interaction: discord.Interaction):
+        rl = limiter.stats()
+        embed = discord.Embed(title="📈 市场请求统计", color=COLOR_MARKET_GREEN)
+        embed.add_field(
+            name="市场请求 (进程启动以来)",
+            value=(f"放行 {rl['granted']} 次，其中排队 {rl['waited']} 次 / {rl['wait_seconds']:.1f} 秒\n"
+                   f"放弃：交互 {rl['shed_interactive']} / 后台 {rl['shed_background']} / 批量 {rl['shed_bulk']}，429 退避 {rl['throttled']} 次\n"
+                   f"{cache_line('订单缓存', client_v2.order_cache.stats())}\n"
+                   f"{cache_line('深度分析缓存', client_v2.book_cache.stats())}"),
+            inline=False
+        )
+        monitor = getattr(interaction.client, "market_monitor", None)
+        if monitor is not None:
+            ps = monitor.scheduler.stats()
+            embed.add_field(
+                name="市场自适应轮询",
+                value=(f"关注 {ps['tracked']} 个物品，实际请求 {ps['polls']} 次 / 固定每分钟基线 {ps['baseline']:.0f} 次"
+                       f" (节省 {ps['saved']:.0%})"),
+                inline=False
+            )
+            ds = monitor.snapshots.stats()
+            embed.add_field(
+                name="新挂单对比",
+                value=f"快照 {ds['tracked']} 个物品，对比 {ds['diffs']} 次：新卖家 {ds['new']} / 降价 {ds['drops']} / 下线 {ds['offline']}",
+                inline=False
+            )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
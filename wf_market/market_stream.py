@@ -0,0 +1,220 @@
+import asyncio
+import json
+import os
+import time
+from typing import Dict, Optional, Tuple
+import aiohttp
+from wf_market.market_api import BACKGROUND, client_v2
+from wf_market.market_monitor import build_ladders, fired_on_ladder
+from reminder.reminder_core import list_active
+from reminder.reminder_store import store
+
+# 推送模式默认关闭；MARKET_STREAM=1 开启，WFM_WS_URL 可覆盖推送地址
+STREAM_ENABLED = os.getenv("MARKET_STREAM", "0") == "1"
+WS_URL = os.getenv("WFM_WS_URL", "wss://warframe.market/socket?platform=pc")
+
+# warframe.market 的 websocket 消息类型
+MSG_SUBSCRIBE = "@WS/SUBSCRIBE/MOST_RECENT"
+MSG_NEW_ORDER = "@WS/SUBSCRIPTIONS/MOST_RECENT/NEW_ORDER"
+
+WATCH_REFRESH_SECONDS = 30
+BOOK_DEPTH = 20
+MAX_BACKOFF = 60
+
+class OrderBook:
+    """单个 (slug, rank) 的内存订单簿：两侧各保留最优的 BOOK_DEPTH 条"""
+
+    __slots__ = ("sell", "buy", "updated_at")
+
+    def __init__(self):
+        self.sell: Dict[str, Tuple[int, str]] = {}
+        self.buy: Dict[str, Tuple[int, str]] = {}
+        self.updated_at = 0.0
+
+    def add(self, side: str, order_id: str, price: int, player: str):
+        book = self.sell if side == "sell" else self.buy
+        book[order_id] = (price, player)
+        if len(book) > BOOK_DEPTH:
+            worst = (max if side == "sell" else min)(book, key=lambda k: book[k][0])
+            del book[worst]
+        self.updated_at = time.time()
+
+    def seed(self, data: dict):
+        """用 REST /top 快照重置订单簿 (同时清掉推送里看不到的改价/撤单)"""
+        self.sell.clear()
+        self.buy.clear()
+        for side in ("sell", "buy"):
+            for o in data.get(side, []):
+                user = o.get('user', {})
+                self.add(side, o.get('id', ''), o.get('platinum'),
+                         user.get('ingameName') or user.get('ingame_name') or "WFM_User")
+
+    def best(self, side: str) -> Optional[Tuple[int, str]]:
+        book = self.sell if side == "sell" else self.buy
+        if not book: return None
+        return (min if side == "sell" else max)(book.values(), key=lambda v: v[0])
+
+def parse_order(payload: dict) -> Optional[dict]:
+    """把推送里的订单转成统一字段；兼容 v1 (url_name / mod_rank / order_type) 与 v2 (slug / rank / type)"""
+    o = payload.get("order") or payload
+    item = o.get("item") or {}
+    slug = item.get("url_name") or item.get("slug") or o.get("slug")
+    side = o.get("order_type") or o.get("type")
+    price = o.get("platinum")
+    if not slug or side not in ("sell", "buy") or price is None:
+        return None
+    user = o.get("user") or {}
+    return {
+        "id": o.get("id", ""),
+        "slug": slug,
+        "rank": o.get("mod_rank", o.get("rank")),
+        "side": side,
+        "price": int(price),
+        "player": user.get("ingame_name") or user.get("ingameName") or "WFM_User",
+        "status": user.get("status", "ingame"),
+    }
+
+class MarketStream:
+    """
+    websocket 推送模式：保持一条长连接，订阅最新订单，对被关注的物品维护内存订单簿。
+    订单簿每次变化 (REST 快照初始化、新挂单) 后都用两侧最优价对阈值阶梯判断，几秒内触发提醒。
+    推送只有新挂单，看不到改价和撤单，所以 MarketMonitor 的 REST 轮询照常进行，
+    每次轮询结果经 reseed 重置订单簿。断线自动重连 (指数退避)。
+    """
+
+    def __init__(self, monitor, url: str = WS_URL):
+        self.monitor = monitor
+        self.url = url
+        self.connected = False
+        self.books: Dict[tuple, OrderBook] = {}
+        self._ladders = {}
+        # 统计：收到的订单 / 命中关注物品的订单 / 触发提醒数 / 重连次数
+        self.received = 0
+        self.matched = 0
+        self.fired = 0
+        self.reconnects = 0
+        self._task: Optional[asyncio.Task] = None
+        # 后台初始化订单簿的任务：持有引用，避免被回收
+        self._seeding = set()
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _refresh_watched(self):
+        """重建阈值阶梯；新关注的物品用 REST 快照 (走缓存) 初始化订单簿"""
+        self._ladders = build_ladders(list_active(2))
+        for key in list(self.books):
+            if key not in self._ladders: del self.books[key]
+        new_keys = [key for key in self._ladders if key not in self.books]
+        for key in new_keys:
+            self.books[key] = OrderBook()
+        if new_keys:
+            # 快照经限速器逐个拉取，放到后台做，不耽误处理推送消息
+            task = asyncio.create_task(self._seed(new_keys))
+            self._seeding.add(task)
+            task.add_done_callback(self._seeding.discard)
+
+    async def _watch_loop(self):
+        """连接期间定时重建关注列表：推送很安静时新加的提醒也能及时被关注、初始化"""
+        while True:
+            await asyncio.sleep(WATCH_REFRESH_SECONDS)
+            try:
+                await self._refresh_watched()
+            except Exception as e:
+                print(f"刷新推送关注列表失败: {e}")
+
+    async def _seed(self, keys):
+        for key in keys:
+            try:
+                data = await asyncio.to_thread(client_v2.get_top_orders, key[0], key[1], BACKGROUND)
+                book = self.books.get(key)
+                if data and book is not None:
+                    book.seed(data)
+                    await self._check(key)
+            except Exception as e:
+                print(f"订单簿初始化失败 {key}: {e}")
+
+    def reseed(self, key, data: dict):
+        """REST 轮询拿到的新快照：替换订单簿 (触发判断已由轮询本身完成)"""
+        book = self.books.get(key)
+        if book is not None and data: book.seed(data)
+
+    async def _check(self, key, sides=("sell", "buy")):
+        """用订单簿当前的最优价对阈值阶梯判断，命中的提醒领取后通知"""
+        book, ladders = self.books.get(key), self._ladders.get(key)
+        if book is None or not ladders: return
+        fired = {}
+        for side in sides:
+            ladder, best = ladders.get(side), book.best(side)
+            if not ladder or best is None: continue
+            order_data = {
+                'price': best[0],
+                'ingame_name': best[1],
+                'en_name': key[0].replace('_', ' ').title(),
+            }
+            for x in fired_on_ladder(ladder[0], ladder[1], side, best[0]):
+                fired[x.id] = (x, order_data)
+        if not fired: return
+        claimed = await store.trigger(list(fired))
+        self.fired += len(claimed)
+        await asyncio.gather(*(self.monitor._notify(x, fired[x.id][1]) for x in claimed))
+
+    async def handle(self, msg: dict):
+        if msg.get("type") != MSG_NEW_ORDER: return
+        order = parse_order(msg.get("payload") or {})
+        self.received += 1
+        if not order or order["status"] == "offline": return
+
+        key = (order["slug"], order["rank"])
+        sides = self._ladders.get(key)
+        if not sides: return
+        self.matched += 1
+        book = self.books.setdefault(key, OrderBook())
+        book.add(order["side"], order["id"], order["price"], order["player"])
+
+        # 新挂单订阅：只对比这一条订单，与 REST 轮询共用同一份快照
+        if order["side"] == "sell":
+            diff = self.monitor.snapshots.add(key, order["id"], order["price"], order["player"])
+            listings = self.monitor._listing_hits(sides, diff)
+            if listings:
+                self.fired += len(listings)
+                await asyncio.gather(*(self.monitor._notify_listings(x, evs, []) for x, evs in listings))
+
+        await self._check(key, (order["side"],))
+
+    async def _run(self):
+        backoff = 1
+        while True:
+            try:
+                async with aiohttp.ClientSession() as session:
+                    async with session.ws_connect(self.url, heartbeat=30) as ws:
+                        await ws.send_str(json.dumps({"type": MSG_SUBSCRIBE}))
+                        await self._refresh_watched()
+                        self.connected = True
+                        backoff = 1
+                        print(f"📡 市场推送已连接 ({len(self._ladders)} 个关注物品)")
+                        watcher = asyncio.create_task(self._watch_loop())
+                        try:
+                            async for m in ws:
+                                if m.type != aiohttp.WSMsgType.TEXT: break
+                                try:
+                                    await self.handle(json.loads(m.data))
+                                except Exception as e:
+                                    print(f"处理推送消息失败: {e}")
+                        finally:
+                            watcher.cancel()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ 市场推送连接中断: {e}")
+            self.connected = False
+            self.reconnects += 1
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, MAX_BACKOFF)
+
+def setup_stream(monitor) -> Optional[MarketStream]:
+    if not STREAM_ENABLED: return None
+    stream = monitor.stream = MarketStream(monitor)
+    stream.start()
+    return stream
@@ -0,0 +1,188 @@
+import asyncio
+import csv
+import io
+import json
+import discord
+from discord import app_commands
+from typing import List, Tuple
+from wf_market.market_api import client_v2
+from reminder.reminder_core import list_items
+from reminder.reminder_records import MarketReminder, TradeType
+from reminder.reminder_store import store
+from reminder.reminder_quota import check_admission
+
+COLOR_MARKET_GREEN = 0x2ECC71
+COLOR_ERR = 0xE74C3C
+
+# 单次导入的限制
+MAX_FILE_BYTES = 256 * 1024
+MAX_ROWS = 200
+
+# 表头/取值的中英文别名
+_HEADER_ALIASES = {
+    "item": "item", "物品": "item", "name": "item",
+    "slug": "slug",
+    "type": "type", "类型": "type",
+    "price": "price", "价格": "price",
+    "rank": "rank", "等级": "rank",
+}
+_TYPE_ALIASES = {"sell": "sell", "买入": "sell", "buy": "buy", "卖出": "buy", "listing": "listing", "新挂单": "listing"}
+
+def parse_watchlist(data: bytes, filename: str) -> Tuple[List[dict], List[str]]:
+    """
+    解析上传的清单 (CSV 或 JSON)，返回 (行列表, 错误列表)
+    每行：{"item": 名称或 None, "slug": slug 或 None, "type": sell/buy/listing, "price": int, "rank": int 或 None}
+    """
+    text = data.decode("utf-8-sig")
+    if filename.lower().endswith(".json"):
+        raw = json.loads(text)
+        if isinstance(raw, dict): raw = raw.get("watchlist", [])
+    else:
+        raw = list(csv.DictReader(io.StringIO(text)))
+
+    rows, errors = [], []
+    for n, r in enumerate(raw, 1):
+        r = {_HEADER_ALIASES.get(str(k).strip().lower(), k): v for k, v in (r or {}).items()}
+        item = str(r.get("item") or "").strip() or None
+        slug = str(r.get("slug") or "").strip().lower() or None
+        trade = _TYPE_ALIASES.get(str(r.get("type") or "").strip().lower())
+        try:
+            price = int(r.get("price"))
+            rank = None if r.get("rank") in (None, "") else int(r.get("rank"))
+        except (TypeError, ValueError):
+            errors.append(f"第 {n} 行：价格/等级不是整数")
+            continue
+        if not (item or slug):
+            errors.append(f"第 {n} 行：缺少物品")
+        elif not trade:
+            errors.append(f"第 {n} 行：类型需为 买入/卖出/新挂单 (sell/buy/listing)")
+        elif price <= 0:
+            errors.append(f"第 {n} 行：价格必须大于 0")
+        else:
+            rows.append({"item": item, "slug": slug, "type": trade, "price": price, "rank": rank})
+    return rows, errors
+
+def export_watchlist(items: List[MarketReminder], fmt: str) -> bytes:
+    rows = [
+        {"item": x.item_name, "slug": x.slug, "type": "listing" if x.listing else x.trade_type, "price": x.target_price,
+         "rank": "" if x.rank is None else x.rank}
+        for x in items
+    ]
+    if fmt == "json":
+        for r in rows:
+            if r["rank"] == "": r["rank"] = None
+        return json.dumps(rows, ensure_ascii=False, indent=2).encode("utf-8")
+    buf = io.StringIO()
+    w = csv.DictWriter(buf, fieldnames=["item", "slug", "type", "price", "rank"])
+    w.writeheader()
+    w.writerows(rows)
+    # 带 BOM，方便 Excel 直接打开中文
+    return buf.getvalue().encode("utf-8-sig")
+
+def resolve_rows(rows: List[dict]) -> Tuple[List[Tuple[dict, dict]], List[str]]:
+    """一次性批量解析所有物品，返回 ((行, 物品信息) 列表, 错误列表)"""
+    queries = [r["slug"] or r["item"] for r in rows]
+    found = client_v2.find_item_slugs(queries)
+    ok, errors = [], []
+    for r, q in zip(rows, queries):
+        info = found.get(q)
+        if not info:
+            errors.append(f"查不到物品 “{q}”")
+            continue
+        if r["rank"] is not None and not info.get("is_rankable"):
+            errors.append(f"**{info['name']}** 没有等级概念，已忽略该行")
+            continue
+        ok.append((r, info))
+    return ok, errors
+
+def setup(tree: app_commands.CommandTree):
+    @tree.command(name="提醒_导入", description="上传 CSV/JSON 清单，批量创建市场价格预警")
+    @app_commands.describe(清单="包含 item(物品), type(买入/卖出/新挂单), price(价格), rank(等级, 可选) 列的 CSV 或 JSON 文件")
+    async def import_watchlist(interaction: discord.Interaction, 清单: discord.Attachment):
+        await interaction.response.defer(thinking=True)
+
+        if 清单.size > MAX_FILE_BYTES:
+            await interaction.followup.send(f"❌ 文件过大，最多 {MAX_FILE_BYTES // 1024} KB。")
+            return
+
+        try:
+            rows, errors = parse_watchlist(await 清单.read(), 清单.filename)
+        except Exception as e:
+            await interaction.followup.send(f"❌ 无法解析清单：{e}")
+            return
+
+        if len(rows) > MAX_ROWS:
+            await interaction.followup.send(f"❌ 单次最多导入 {MAX_ROWS} 条，当前 {len(rows)} 条。")
+            return
+        if not rows:
+            await interaction.followup.send("❌ 清单中没有有效的行。\n" + "\n".join(errors[:10]))
+            return
+
+        # 1. 批量解析物品 (目录只加载/扫描一次)
+        resolved, resolve_errors = await asyncio.to_thread(resolve_rows, rows)
+        errors += resolve_errors
+        if not resolved:
+            shown = "\n".join(errors[:10])
+            if len(errors) > 10: shown += f"\n…… 另有 {len(errors) - 10} 条"
+            await interaction.followup.send("❌ 清单中没有可识别的物品，未创建任何预警。\n" + shown)
+            return
+
+        # 2. 按总数做一次配额检查
+        admission = check_admission(2, interaction.user.id, interaction.guild_id, count=len(resolved))
+        if not admission.ok:
+            await interaction.followup.send(f"🚫 {admission.reason}")
+            return
+
+        # 3. 构造提醒并一次性提交 (同一次存储提交)
+        new_items = []
+        for r, info in resolved:
+            rank = r["rank"]
+            if info.get("is_rankable") and rank is None:
+                rank = 0
+            new_items.append(MarketReminder(
+                user_id=interaction.user.id,
+                channel_id=interaction.channel_id,
+                guild_id=interaction.guild_id,
+                item_name=info["name"],
+                slug=info["slug"],
+                trade=TradeType.SELL if r["type"] == "listing" else TradeType[r["type"].upper()],
+                target_price=r["price"],
+                rank=rank,
+                listing=r["type"] == "listing"
+            ))
+        try:
+            await store.add_many(new_items)
+        except Exception as e:
+            await interaction.followup.send(f"❌ 数据库写入失败: {e}")
+            return
+
+        embed = discord.Embed(
+            title="✅ 清单导入完成",
+            description=f"成功创建 **{len(new_items)}** 个市场价格预警。",
+            color=COLOR_MARKET_GREEN if not errors else COLOR_ERR
+        )
+        if errors:
+            shown = "\n".join(errors[:10])
+            if len(errors) > 10: shown += f"\n…… 另有 {len(errors) - 10} 条"
+            embed.add_field(name=f"⚠️ 跳过 {len(errors)} 行", value=shown[:1024], inline=False)
+        embed.set_footer(text="提示：可用 /提醒_导出 备份当前清单。")
+        await interaction.followup.send(embed=embed)
+
+    @tree.command(name="提醒_导出", description="导出我当前的市场价格预警清单")
+    @app_commands.describe(格式="导出文件格式")
+    @app_commands.choices(格式=[
+        app_commands.Choice(name="CSV (可用 Excel 打开)", value="csv"),
+        app_commands.Choice(name="JSON", value="json"),
+    ])
+    async def export_cmd(interaction: discord.Interaction, 格式: str = "csv"):
+        items = [x for x in list_items(interaction.user.id, only_enabled=True) if x.reminder_type == 2]
+        if not items:
+            await interaction.response.send_message("💡 你目前没有任何市场价格预警。", ephemeral=True)
+            return
+
+        data = export_watchlist(items, 格式)
+        file = discord.File(io.BytesIO(data), filename=f"watchlist.{格式}")
+        await interaction.response.send_message(
+            f"📄 共 {len(items)} 条市场预警，可修改后通过 /提醒_导入 重新导入。",
+            file=file, ephemeral=True
+        )
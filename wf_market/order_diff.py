@@ -0,0 +1,116 @@
+from bisect import bisect_left
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+# 阈值阶梯里“新挂单订阅”单独成一侧，不参与普通的一次性触发
+LISTING_SIDE = "listing"
+
+class Listing(NamedTuple):
+    order_id: str
+    price: int
+    player: str
+    prev_price: Optional[int]     # 降价时为原价，新挂单为 None
+
+class OrderDiff(NamedTuple):
+    new: List[Listing]            # 新出现的卖家 (之前快照里没有这个玩家的卖单)
+    drops: List[Listing]          # 同一订单降价
+    offline: List[Listing]        # 下线/撤单的卖家 (按其原来的最低挂单)
+
+    def __bool__(self):
+        return bool(self.new or self.drops or self.offline)
+
+# 快照：order_id -> (价格, 玩家)；只记在线/游戏中的卖单
+Snapshot = Dict[str, Tuple[int, str]]
+
+def _sell_orders(data: dict) -> Snapshot:
+    out = {}
+    for o in (data or {}).get('sell', []):
+        user = o.get('user') or {}
+        if o.get('platinum') is None or user.get('status') == 'offline': continue
+        out[o.get('id', '')] = (int(o['platinum']), user.get('ingameName') or user.get('ingame_name') or "WFM_User")
+    return out
+
+def diff_snapshots(prev: Snapshot, cur: Snapshot) -> OrderDiff:
+    """
+    两次快照按订单 id 对比：只有新增、改价、消失的订单会产生事件，
+    未变化的订单只做一次字典查找
+    """
+    prev_players = {p for _, p in prev.values()}
+    new, drops = [], []
+    for oid, (price, player) in cur.items():
+        old = prev.get(oid)
+        if old is None:
+            if player not in prev_players:
+                new.append(Listing(oid, price, player, None))
+        elif price < old[0]:
+            drops.append(Listing(oid, price, player, old[0]))
+    # /top 只返回前几名，被更便宜的挂单挤出去不算下线：只认价格还在当前列表范围内却消失的
+    cur_players = {p for _, p in cur.values()}
+    cutoff = max((price for price, _ in cur.values()), default=float("inf"))
+    gone = {}
+    for oid, (price, player) in prev.items():
+        if oid in cur or player in cur_players or price > cutoff: continue
+        if player not in gone or price < gone[player].price:
+            gone[player] = Listing(oid, price, player, None)
+    return OrderDiff(new, drops, sorted(gone.values(), key=lambda x: x.price))
+
+def matched_subscribers(prices: List[int], members: list, ev: Listing) -> list:
+    """
+    新挂单：所有目标价 >= 挂单价的订阅；
+    降价：只通知这次才跨过阈值的 (原价 > 目标价 >= 新价)，已经通知过的不重复
+    """
+    lo = bisect_left(prices, ev.price)
+    hi = len(prices) if ev.prev_price is None else bisect_left(prices, ev.prev_price)
+    return members[lo:hi]
+
+class OrderSnapshots:
+    """
+    每个被关注的 (slug, rank) 保存上一次看到的卖单快照，轮询结果与推送的新订单都在这里做增量对比。
+    第一次看到某个物品时只建立基线，不产生事件 (订阅只通知设置之后出现的新挂单)。
+    """
+
+    def __init__(self):
+        self._books: Dict[tuple, Snapshot] = {}
+        # 统计：对比次数 / 新卖家 / 降价 / 下线
+        self.diffs = 0
+        self.new = 0
+        self.drops = 0
+        self.offline = 0
+
+    def _count(self, d: OrderDiff) -> OrderDiff:
+        self.diffs += 1
+        self.new += len(d.new)
+        self.drops += len(d.drops)
+        self.offline += len(d.offline)
+        return d
+
+    def update(self, key: tuple, data: dict) -> OrderDiff:
+        """用一次 REST /top 结果替换快照，返回与上次的差异"""
+        cur = _sell_orders(data)
+        prev = self._books.get(key)
+        self._books[key] = cur
+        if prev is None:
+            return OrderDiff([], [], [])
+        return self._count(diff_snapshots(prev, cur))
+
+    def add(self, key: tuple, order_id: str, price: int, player: str) -> OrderDiff:
+        """推送来的单个新卖单：只更新这一条，不重建整个快照"""
+        book = self._books.get(key)
+        if book is None:
+            return OrderDiff([], [], [])
+        old = book.get(order_id)
+        known = old is not None or any(p == player for _, p in book.values())
+        book[order_id] = (price, player)
+        if old is not None and price < old[0]:
+            return self._count(OrderDiff([], [Listing(order_id, price, player, old[0])], []))
+        if not known:
+            return self._count(OrderDiff([Listing(order_id, price, player, None)], [], []))
+        return OrderDiff([], [], [])
+
+    def retain(self, keys) -> None:
+        """丢掉不再被关注的物品"""
+        for key in [k for k in self._books if k not in keys]:
+            del self._books[key]
+
+    def stats(self) -> dict:
+        return {"tracked": len(self._books), "diffs": self.diffs, "new": self.new,
+                "drops": self.drops, "offline": self.offline}
@@ -0,0 +1,77 @@
+from dataclasses import dataclass
+from typing import Optional
+import numpy as np
+
+PERCENTILES = (10, 25, 50, 75, 90)
+# 用户状态编码：0 游戏中 / 1 在线 / 2 离线
+STATUS_CODES = {"ingame": 0, "online": 1}
+STATUS_NAMES = ("ingame", "online", "offline")
+
+@dataclass(frozen=True)
+class BookStats:
+    """
+    一个物品 (某等级) 全部订单的汇总，价格统计只看在线/游戏中用户的订单
+    sell_prices / buy_prices 已排序 (卖单升序、买单降序)，配合累计数量可以 O(log n) 算任意范围的深度
+    """
+    orders: int
+    sell_status: tuple                 # 卖单按 (游戏中, 在线, 离线) 计数
+    buy_status: tuple
+    sell_percentiles: Optional[tuple]  # 对应 PERCENTILES
+    buy_median: Optional[float]
+    best_sell: Optional[float]
+    best_buy: Optional[float]
+    sell_prices: np.ndarray
+    sell_cum_qty: np.ndarray
+    buy_prices: np.ndarray
+    buy_cum_qty: np.ndarray
+
+    @property
+    def spread(self) -> Optional[float]:
+        if self.best_sell is None or self.best_buy is None: return None
+        return self.best_sell - self.best_buy
+
+    def sell_depth(self, pct: float) -> tuple:
+        """最低卖价上浮 pct% 以内的 (订单数, 总数量)"""
+        if self.best_sell is None: return 0, 0
+        n = int(np.searchsorted(self.sell_prices, self.best_sell * (1 + pct / 100), side="right"))
+        return n, int(self.sell_cum_qty[n - 1])
+
+    def buy_depth(self, pct: float) -> tuple:
+        """最高买价下浮 pct% 以内的 (订单数, 总数量)"""
+        if self.best_buy is None: return 0, 0
+        # 买价降序，取负后变升序再二分
+        n = int(np.searchsorted(-self.buy_prices, -self.best_buy * (1 - pct / 100), side="right"))
+        return n, int(self.buy_cum_qty[n - 1])
+
+def summarize(orders: list, rank=None) -> BookStats:
+    """
+    /orders/item/{slug} 的完整订单列表 -> BookStats
+    先一次性把需要的字段拆成几列数组，之后的筛选、排序、分位数都是数组运算
+    """
+    cols = [
+        (o.get("type") == "sell", o.get("platinum") or 0, o.get("quantity") or 1,
+         STATUS_CODES.get((o.get("user") or {}).get("status"), 2))
+        for o in orders
+        if o.get("visible", True) and (rank is None or o.get("rank") == rank)
+    ]
+    arr = np.array(cols, dtype=np.float64).reshape(-1, 4)
+    is_sell, price, qty, status = arr[:, 0] == 1, arr[:, 1], arr[:, 2], arr[:, 3].astype(np.int8)
+    active = status < 2
+
+    def side(mask, descending):
+        p, q = price[mask], qty[mask]
+        order = np.argsort(-p if descending else p, kind="stable")
+        return p[order], np.cumsum(q[order])
+
+    sell_p, sell_q = side(is_sell & active, False)
+    buy_p, buy_q = side(~is_sell & active, True)
+    return BookStats(
+        orders=len(arr),
+        sell_status=tuple(int(x) for x in np.bincount(status[is_sell], minlength=3)),
+        buy_status=tuple(int(x) for x in np.bincount(status[~is_sell], minlength=3)),
+        sell_percentiles=tuple(float(x) for x in np.percentile(sell_p, PERCENTILES)) if len(sell_p) else None,
+        buy_median=float(np.median(buy_p)) if len(buy_p) else None,
+        best_sell=float(sell_p[0]) if len(sell_p) else None,
+        best_buy=float(buy_p[0]) if len(buy_p) else None,
+        sell_prices=sell_p, sell_cum_qty=sell_q, buy_prices=buy_p, buy_cum_qty=buy_q,
+    )
@@ -0,0 +1,107 @@
+import os
+from typing import Dict, List, Optional, Tuple
+from wf_market.order_diff import LISTING_SIDE
+
+# 固定间隔基线 (原来每分钟一轮)，以及自适应间隔的上下限 (秒)
+BASELINE_INTERVAL = 60
+MIN_INTERVAL = int(os.getenv("MARKET_POLL_MIN", "30"))
+MAX_INTERVAL = int(os.getenv("MARKET_POLL_MAX", "900"))
+# 价格波动率 (每分钟相对变化) 的平滑系数与下限，下限避免长期不动的物品间隔无限变长
+VOL_ALPHA = 0.3
+VOL_FLOOR = 0.005
+# 预计还要多久触发 × SAFETY = 下次轮询间隔，留出余量不错过触发
+SAFETY = 0.5
+# 最优价距离阈值不到这个比例时，直接按最短间隔盯着
+NEAR_GAP = float(os.getenv("MARKET_POLL_NEAR_GAP", "0.03"))
+
+class _KeyState:
+    __slots__ = ("next_at", "last_at", "price", "vol", "nearest")
+
+    def __init__(self):
+        self.next_at = 0.0
+        self.last_at = 0.0
+        self.price: Dict[str, int] = {}
+        self.vol: Dict[str, float] = {}
+        self.nearest: Tuple = ()
+
+def nearest_thresholds(sides: dict) -> Tuple:
+    """每一侧最容易触发的阈值：卖单看最高目标价，买单看最低目标价"""
+    return tuple(sorted(
+        (trade_type, prices[-1] if trade_type == "sell" else prices[0])
+        for trade_type, (prices, _) in sides.items() if prices and trade_type != LISTING_SIDE
+    ))
+
+class PollScheduler:
+    """
+    给每个 (slug, rank) 单独安排下次轮询时间 (一次 /top 请求同时覆盖买卖两侧)：
+    - 每侧按 最优价 与 最近阈值 的相对距离，除以近期波动率，估算“多久后可能触发”
+    - 间隔取两侧里较短的那个，夹在 [MIN_INTERVAL, MAX_INTERVAL] 之间
+    - 新物品、最近阈值变了 (有人新设了更近的提醒)、上次请求失败：尽快重查
+    - 有新挂单订阅的物品至少按基线间隔查一次
+    同时按“每个关注物品每 BASELINE_INTERVAL 秒查一次”累计基线请求数，用来统计节省了多少请求。
+    """
+
+    def __init__(self):
+        self._state: Dict[tuple, _KeyState] = {}
+        self._last_tick: Optional[float] = None
+        self.polls = 0
+        self.baseline = 0.0
+
+    def due(self, ladders: dict, now: float) -> List[tuple]:
+        # 固定间隔的做法：启动时全部查一遍，之后每个物品每 BASELINE_INTERVAL 秒一次
+        if self._last_tick is None:
+            self.baseline += len(ladders)
+        else:
+            self.baseline += len(ladders) * (now - self._last_tick) / BASELINE_INTERVAL
+        self._last_tick = now
+
+        for key in [k for k in self._state if k not in ladders]:
+            del self._state[key]
+
+        out = []
+        for key, sides in ladders.items():
+            st = self._state.get(key)
+            if st is None or now >= st.next_at or st.nearest != nearest_thresholds(sides):
+                out.append(key)
+        self.polls += len(out)
+        return out
+
+    def observe(self, key: tuple, sides: dict, data: Optional[dict], now: float):
+        """记录一次轮询结果并安排下次时间；data 为 /top 的结果，失败时为 None"""
+        st = self._state.get(key)
+        if st is None:
+            st = self._state[key] = _KeyState()
+        st.nearest = nearest_thresholds(sides)
+        if not data:
+            st.next_at = now + BASELINE_INTERVAL
+            return
+
+        # 新挂单订阅关心的是“有没有新卖家”，与价格距离无关，固定按基线间隔查
+        interval = BASELINE_INTERVAL if LISTING_SIDE in sides else MAX_INTERVAL
+        minutes = (now - st.last_at) / 60 if st.last_at else 0
+        for trade_type, target in st.nearest:
+            orders = [o.get('platinum') for o in data.get(trade_type, []) if o.get('platinum') is not None]
+            if not orders:
+                interval = min(interval, BASELINE_INTERVAL)
+                continue
+            price = min(orders) if trade_type == "sell" else max(orders)
+
+            prev = st.price.get(trade_type)
+            vol = st.vol.get(trade_type, VOL_FLOOR)
+            if prev and minutes > 0:
+                change = abs(price - prev) / prev / minutes
+                vol = VOL_ALPHA * change + (1 - VOL_ALPHA) * vol
+            st.price[trade_type], st.vol[trade_type] = price, vol
+
+            gap = (price - target if trade_type == "sell" else target - price) / max(price, 1)
+            if gap <= NEAR_GAP:
+                interval = MIN_INTERVAL
+            else:
+                interval = min(interval, SAFETY * gap / max(vol, VOL_FLOOR) * 60)
+
+        st.last_at = now
+        st.next_at = now + max(MIN_INTERVAL, min(MAX_INTERVAL, interval))
+
+    def stats(self) -> dict:
+        saved = 1 - self.polls / self.baseline if self.baseline else 0.0
+        return {"tracked": len(self._state), "polls": self.polls, "baseline": self.baseline, "saved": saved}
@@ -0,0 +1,226 @@
+import asyncio
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import List, Optional, Tuple
+from discord.ext import tasks
+
+DB_PATH = Path("wf_market/price_history.db")
+
+# 降采样层级：(桶宽秒数, 保留秒数)。原始样本 -> 5 分钟 -> 1 小时 -> 1 天
+RAW_KEEP = 2 * 86400
+TIERS = [
+    (300, 14 * 86400),
+    (3600, 180 * 86400),
+    (86400, None),
+]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS price_raw (
+    slug TEXT NOT NULL,
+    rank INTEGER NOT NULL,     -- 无等级的物品记为 -1
+    ts INTEGER NOT NULL,
+    sell INTEGER,              -- 最低卖价
+    buy INTEGER                -- 最高收购价
+);
+CREATE INDEX IF NOT EXISTS idx_price_raw ON price_raw(slug, rank, ts);
+CREATE INDEX IF NOT EXISTS idx_price_raw_ts ON price_raw(ts);
+CREATE TABLE IF NOT EXISTS price_rollup (
+    tier INTEGER NOT NULL,     -- 桶宽 (秒)
+    slug TEXT NOT NULL,
+    rank INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,   -- 桶起始时间
+    sell_n INTEGER NOT NULL, sell_min INTEGER, sell_med REAL, sell_max INTEGER,
+    buy_n INTEGER NOT NULL, buy_min INTEGER, buy_med REAL, buy_max INTEGER,
+    PRIMARY KEY (tier, slug, rank, bucket)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_price_rollup_bucket ON price_rollup(tier, bucket);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# 一侧价格在一个时间段内的汇总：(样本数, 最低, 中位数, 最高)
+Side = Tuple[int, Optional[int], Optional[float], Optional[int]]
+EMPTY: Side = (0, None, None, None)
+
+def _rank_key(rank) -> int:
+    return -1 if rank is None else int(rank)
+
+def _from_values(values: List[int]) -> Side:
+    if not values: return EMPTY
+    values.sort()
+    mid = len(values) // 2
+    med = values[mid] if len(values) % 2 else (values[mid - 1] + values[mid]) / 2
+    return (len(values), values[0], med, values[-1])
+
+def combine(parts: List[Side]) -> Side:
+    """合并多个时间段：最低/最高精确，中位数取各段中位数按样本数加权的中位数 (近似)"""
+    parts = [p for p in parts if p[0]]
+    if not parts: return EMPTY
+    total = sum(p[0] for p in parts)
+    acc, med = 0, None
+    for p in sorted(parts, key=lambda p: p[2]):
+        acc += p[0]
+        if acc * 2 >= total:
+            med = p[2]
+            break
+    return (total, min(p[1] for p in parts), med, max(p[3] for p in parts))
+
+class PriceHistory:
+    """
+    (slug, rank) 的最优买卖价时间序列
+    - record() 只在内存里攒样本 (请求线程里调用，开销可忽略)
+    - flush() 定期把样本写库，并把已结束的时间桶逐级汇总到 5 分钟 / 1 小时 / 1 天
+    - 查询从能覆盖窗口的最粗层级读，尚未汇总的尾部再往细一级补齐，不扫描整段原始样本
+    """
+
+    def __init__(self, path: Path = DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._buffer: List[tuple] = []
+        self._db: Optional[sqlite3.Connection] = None
+        self.samples = 0
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        # 首次落盘/查询时才建库，导入模块不产生文件
+        if self._db is None:
+            self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript(_SCHEMA)
+        return self._db
+
+    # --- 写入 ---
+    def record(self, slug: str, rank, sell: Optional[int], buy: Optional[int], ts: Optional[int] = None):
+        if sell is None and buy is None: return
+        with self._lock:
+            self._buffer.append((slug, _rank_key(rank), int(ts or time.time()), sell, buy))
+
+    def record_orders(self, slug: str, rank, data: dict):
+        """从 /top 的结果里取两侧最优价记录一条样本"""
+        sells = [o.get('platinum') for o in data.get('sell', []) if o.get('platinum') is not None]
+        buys = [o.get('platinum') for o in data.get('buy', []) if o.get('platinum') is not None]
+        self.record(slug, rank, min(sells) if sells else None, max(buys) if buys else None)
+
+    def _meta_get(self, key: str, default: int = 0) -> int:
+        row = self._conn.execute("SELECT value FROM meta WHERE key=?", (key,)).fetchone()
+        return int(row[0]) if row else default
+
+    def _meta_set(self, key: str, value: int):
+        self._conn.execute("INSERT OR REPLACE INTO meta(key, value) VALUES (?, ?)", (key, str(value)))
+
+    def _rollup_raw(self, size: int, start: int, end: int):
+        groups = defaultdict(lambda: ([], []))
+        for slug, rank, ts, sell, buy in self._conn.execute(
+            "SELECT slug, rank, ts, sell, buy FROM price_raw WHERE ts >= ? AND ts < ?", (start, end)
+        ):
+            g = groups[(slug, rank, ts - ts % size)]
+            if sell is not None: g[0].append(sell)
+            if buy is not None: g[1].append(buy)
+        return {k: (_from_values(s), _from_values(b)) for k, (s, b) in groups.items()}
+
+    def _rollup_tier(self, finer: int, size: int, start: int, end: int):
+        groups = defaultdict(lambda: ([], []))
+        for row in self._conn.execute(
+            "SELECT slug, rank, bucket, sell_n, sell_min, sell_med, sell_max, buy_n, buy_min, buy_med, buy_max "
+            "FROM price_rollup WHERE tier=? AND bucket >= ? AND bucket < ?", (finer, start, end)
+        ):
+            g = groups[(row[0], row[1], row[2] - row[2] % size)]
+            g[0].append(row[3:7])
+            g[1].append(row[7:11])
+        return {k: (combine(s), combine(b)) for k, (s, b) in groups.items()}
+
+    def flush(self, now: Optional[int] = None) -> int:
+        """写入缓冲样本，汇总已结束的桶并清理过期数据；返回写入的样本数"""
+        now = int(now or time.time())
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+            conn = self._conn
+            conn.execute("BEGIN")
+            try:
+                conn.executemany("INSERT INTO price_raw(slug, rank, ts, sell, buy) VALUES (?,?,?,?,?)", batch)
+
+                finer = None
+                for size, keep in TIERS:
+                    wm = self._meta_get(f"wm_{size}")
+                    end = now - now % size
+                    if end > wm:
+                        start = wm - wm % size
+                        rows = (self._rollup_raw(size, start, end) if finer is None
+                                else self._rollup_tier(finer, size, start, end))
+                        conn.executemany(
+                            "INSERT OR REPLACE INTO price_rollup VALUES (?,?,?,?,?,?,?,?,?,?,?,?)",
+                            [(size, slug, rank, bucket) + s + b for (slug, rank, bucket), (s, b) in rows.items()]
+                        )
+                        self._meta_set(f"wm_{size}", end)
+                    finer = size
+
+                # 只删除已经汇总进上一级的数据
+                conn.execute("DELETE FROM price_raw WHERE ts < ?",
+                             (min(now - RAW_KEEP, self._meta_get(f"wm_{TIERS[0][0]}")),))
+                for (size, keep), (parent, _) in zip(TIERS, TIERS[1:]):
+                    conn.execute("DELETE FROM price_rollup WHERE tier=? AND bucket < ?",
+                                 (size, min(now - keep, self._meta_get(f"wm_{parent}"))))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                self._buffer[:0] = batch
+                raise
+            self.samples += len(batch)
+            return len(batch)
+
+    # --- 查询 ---
+    def _points(self, slug: str, rank: int, since: int, level: int) -> List[Tuple[int, Side, Side]]:
+        """level 为 TIERS 下标，-1 表示原始样本；本层未汇总的尾部递归向细一级取"""
+        if level < 0:
+            return [(ts, _from_values([s] if s is not None else []), _from_values([b] if b is not None else []))
+                    for ts, s, b in self._conn.execute(
+                        "SELECT ts, sell, buy FROM price_raw WHERE slug=? AND rank=? AND ts >= ? ORDER BY ts",
+                        (slug, rank, since))]
+        size = TIERS[level][0]
+        wm = self._meta_get(f"wm_{size}")
+        pts = [(r[0], tuple(r[1:5]), tuple(r[5:9])) for r in self._conn.execute(
+            "SELECT bucket, sell_n, sell_min, sell_med, sell_max, buy_n, buy_min, buy_med, buy_max "
+            "FROM price_rollup WHERE tier=? AND slug=? AND rank=? AND bucket >= ? AND bucket < ? ORDER BY bucket",
+            (size, slug, rank, since, wm))]
+        return pts + self._points(slug, rank, max(since, wm), level - 1)
+
+    def query(self, slug: str, rank, window: int, now: Optional[int] = None) -> dict:
+        """
+        返回窗口内的汇总与走势点：
+        {"sell": Side, "buy": Side, "tier": 桶宽, "points": [(ts, sell Side, buy Side), ...]}
+        层级选择：窗口内至少有 12 个桶的最粗层级
+        """
+        now = int(now or time.time())
+        level = max([i for i, (size, _) in enumerate(TIERS) if window // size >= 12] or [0])
+        with self._lock:
+            pts = self._points(slug, _rank_key(rank), now - window, level)
+        return {
+            "sell": combine([p[1] for p in pts]),
+            "buy": combine([p[2] for p in pts]),
+            "tier": TIERS[level][0],
+            "points": pts,
+        }
+
+history = PriceHistory()
+
+class PriceHistoryFlusher:
+    """每分钟把样本落盘并做降采样 (SQLite 操作放在线程里)"""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.flush.start()
+
+    @tasks.loop(minutes=1)
+    async def flush(self):
+        try:
+            await asyncio.to_thread(history.flush)
+        except Exception as e:
+            print(f"价格历史写入失败: {e}")
+
+def setup_price_history(bot):
+    return PriceHistoryFlusher(bot)
@@ -0,0 +1,81 @@
+import asyncio
+import discord
+from discord import app_commands
+from wf_market.market_api import client_v2
+from wf_market.market_commands import item_autocomplete
+from wf_market.price_history import history
+
+COLOR_MARKET_GREEN = 0x2ECC71
+
+SPARK = "▁▂▃▄▅▆▇█"
+TIER_NAMES = {300: "5 分钟", 3600: "1 小时", 86400: "1 天"}
+
+def sparkline(values, width: int = 30) -> str:
+    """用文字方块画出中位数走势，点太多时按段取平均压缩到 width 个字符"""
+    values = [v for v in values if v is not None]
+    if len(values) < 2: return ""
+    if len(values) > width:
+        step = len(values) / width
+        values = [sum(chunk) / len(chunk) for chunk in
+                  (values[int(i * step):int((i + 1) * step)] for i in range(width)) if chunk]
+    lo, hi = min(values), max(values)
+    if hi == lo: return SPARK[3] * len(values)
+    return "".join(SPARK[int((v - lo) / (hi - lo) * (len(SPARK) - 1))] for v in values)
+
+def fmt_side(side) -> str:
+    n, lo, med, hi = side
+    if not n: return "暂无数据"
+    return f"最低 **{lo}** / 中位 **{med:g}** / 最高 **{hi}** Pt\n样本 {n} 个"
+
+def setup(tree: app_commands.CommandTree):
+    @tree.command(name="价格走势", description="查看物品在一段时间内的最低/中位/最高价格")
+    @app_commands.describe(
+        物品="输入中文或英文物品名称",
+        窗口="统计的时间范围",
+        等级="如果是MOD或赋能可选填等级 (0-max)"
+    )
+    @app_commands.choices(窗口=[
+        app_commands.Choice(name="1 小时", value=3600),
+        app_commands.Choice(name="6 小时", value=6 * 3600),
+        app_commands.Choice(name="24 小时", value=86400),
+        app_commands.Choice(name="7 天", value=7 * 86400),
+        app_commands.Choice(name="30 天", value=30 * 86400),
+        app_commands.Choice(name="90 天", value=90 * 86400),
+    ])
+    @app_commands.autocomplete(物品=item_autocomplete)
+    async def price_trend(interaction: discord.Interaction, 物品: str, 窗口: int = 86400, 等级: int = None):
+        await interaction.response.defer(thinking=True)
+
+        item_info = await asyncio.to_thread(client_v2.find_item_slug, 物品)
+        if not item_info:
+            await interaction.followup.send(f"❌ 查不到 “{物品}”，请尝试输入更准确的名称。")
+            return
+        if 等级 is not None and not item_info.get('is_rankable'):
+            await interaction.followup.send(f"⚠️ **{item_info['name']}** 没有等级概念，无法指定等级查询。")
+            return
+        target_rank = 等级
+        if item_info.get('is_rankable') and 等级 is None:
+            target_rank = 0
+
+        res = await asyncio.to_thread(history.query, item_info['slug'], target_rank, 窗口)
+        if not res["sell"][0] and not res["buy"][0]:
+            await interaction.followup.send(
+                f"💡 **{item_info['name']}** 在这段时间内还没有价格记录。\n"
+                f"只有被 /市场 查询过或有人设置了市场预警的物品才会被记录。"
+            )
+            return
+
+        title_rank = f" (Rank {target_rank})" if target_rank is not None else ""
+        embed = discord.Embed(
+            title=f"📈 {item_info['name']}{title_rank} 价格走势",
+            url=f"https://warframe.market/zh-hant/items/{item_info['slug']}",
+            color=COLOR_MARKET_GREEN
+        )
+        embed.add_field(name="💰 卖家最低价", value=fmt_side(res["sell"]), inline=True)
+        embed.add_field(name="🛒 买家最高价", value=fmt_side(res["buy"]), inline=True)
+
+        trend = sparkline([p[1][2] for p in res["points"]])
+        if trend:
+            embed.add_field(name="卖价中位数走势", value=f"`{trend}`", inline=False)
+        embed.set_footer(text=f"按 {TIER_NAMES[res['tier']]} 汇总 · 中位数为分段中位数的加权近似")
+        await interaction.followup.send(embed=embed)